@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.codec import get_codec
+
+pytest.importorskip('pytest_benchmark')
+
+APP_ID = '8250eaf6-1a58-489e-b136-7c74a864b434'
+PLAYER_ID = '2ada581e-1380-4967-bcd2-2bb4457d6171'
+
+_load_reports = []
+
+
+@pytest.fixture
+def client_options():
+    """Options of the `client` fixture, overridden by benchmarks which need a transport."""
+    return {}
+
+
+@pytest.fixture
+def async_client_options():
+    """Options of the `async_client` fixture, overridden by benchmarks which need a transport."""
+    return {}
+
+
+@pytest.fixture
+def client(client_options):
+    with Client(APP_ID, 'rest-api-key', 'user-auth-key', options=client_options) as client:
+        yield client
+
+
+@pytest.fixture
+def async_client(async_client_options):
+    client = AsyncClient(APP_ID, 'rest-api-key', 'user-auth-key', options=async_client_options)
+    yield client
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(client.aclose())
+    loop.close()
+
+
+@pytest.fixture
+def codec(request):
+    """JSON codec named by the indirect `codec` parameter, `None` for the default. Skips codecs not installed."""
+    if request.param is None:
+        return None
+    try:
+        return get_codec(request.param)
+    except ValueError:
+        pytest.skip(f'{request.param} is not installed')
+
+
+@pytest.fixture
+def record_load(request, benchmark):
+    """Record a `LoadReport` in the benchmark results and in the load summary printed at the end of the run."""
+    def record(report):
+        benchmark.extra_info.update(report.as_dict())
+        _load_reports.append((request.node.name, report))
+    return record
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _load_reports:
+        return
+    terminalreporter.section('load summary')
+    terminalreporter.write_line(f'{"Name":<45} {"req/s":>10} {"p50 ms":>8} {"p99 ms":>8} {"peak KiB":>10}')
+    for name, report in _load_reports:
+        peak = f'{report.peak_kib:.1f}' if report.peak_kib is not None else '-'
+        terminalreporter.write_line(f'{name:<45} {report.requests_per_second:>10.0f} {report.p50_ms:>8.3f} '
+                                    f'{report.p99_ms:>8.3f} {peak:>10}')
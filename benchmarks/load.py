@@ -0,0 +1,77 @@
+"""Helpers measuring throughput, latency percentiles and memory of a batch of requests."""
+import asyncio
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of given values, `q` between 0 and 100."""
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(q / 100 * len(values))) - 1))]
+
+
+class LoadReport:
+    """Summary of a load run, reported in the `extra_info` of a benchmark."""
+
+    def __init__(self, latencies: List[float], elapsed: float):
+        self.requests = len(latencies)
+        self.requests_per_second = self.requests / elapsed
+        self.p50_ms = percentile(latencies, 50) * 1000
+        self.p99_ms = percentile(latencies, 99) * 1000
+        self.peak_kib = None
+        self.retained_kib = None
+
+    def trace_memory(self, run: Callable[[], Any]) -> None:
+        """Run once more under tracemalloc, recording peak and retained memory of the run."""
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            run()
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.peak_kib = (peak - before) / 1024
+        self.retained_kib = (after - before) / 1024
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: round(value, 3) if isinstance(value, float) else value for name, value in vars(self).items()}
+
+
+def run_sync(send: Callable[[], Any], requests: int, max_workers: int = 1) -> LoadReport:
+    """Call `send` `requests` times on `max_workers` threads."""
+    def timed(_):
+        start = time.perf_counter()
+        send()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if max_workers == 1:
+        latencies = [timed(None) for _ in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers) as executor:
+            latencies = list(executor.map(timed, range(requests)))
+    return LoadReport(latencies, time.perf_counter() - start)
+
+
+def run_async(send: Callable[[], Awaitable[Any]], requests: int, concurrency: int = 1) -> LoadReport:
+    """Await `send()` `requests` times with at most `concurrency` calls in flight, on a new event loop."""
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with semaphore:
+                start = time.perf_counter()
+                await send()
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*[timed() for _ in range(requests)])
+        return LoadReport(list(latencies), time.perf_counter() - start)
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run())
+    finally:
+        loop.close()
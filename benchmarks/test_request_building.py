@@ -0,0 +1,49 @@
+"""Micro-benchmarks of building request kwargs, the per-request work done before anything is sent."""
+import pytest
+
+from onesignal_sdk.constants import API_ROOT, DEVICE_PATH
+from onesignal_sdk.request import _build_request_kwargs
+
+from .conftest import PLAYER_ID
+
+BUILDER_ARGS = {
+    'send_notification': ({'contents': {'en': 'Hello'}, 'included_segments': ['Active Users']},),
+    'cancel_notification': (PLAYER_ID,),
+    'view_notification': (PLAYER_ID,),
+    'view_notifications': ({'limit': 50, 'offset': 0},),
+    'view_device': (PLAYER_ID,),
+    'view_devices': ({'limit': 300, 'offset': 0},),
+    'edit_device': (PLAYER_ID, {'language': 'en'}),
+    'edit_tags': ('user-1', {'tags': {'level': '10'}}),
+    'new_session': (PLAYER_ID, {'game_version': '1.0'}),
+    'view_outcomes': (['os__click.count'], {'outcome_time_range': '1d'}),
+    'view_app': (PLAYER_ID,),
+}
+
+
+@pytest.mark.benchmark(group='kwargs-builders')
+@pytest.mark.parametrize('endpoint', BUILDER_ARGS)
+def test_kwargs_builder(benchmark, client, endpoint):
+    benchmark(getattr(client, f'_kwargs_{endpoint}'), *BUILDER_ARGS[endpoint])
+
+
+@pytest.mark.benchmark(group='build-request-kwargs')
+@pytest.mark.parametrize('codec', ['json', 'orjson', None], indirect=True)
+@pytest.mark.parametrize('endpoint', ['view_device', 'edit_tags', 'send_notification'])
+def test_build_request_kwargs(benchmark, client, endpoint, codec):
+
+    def build():
+        kwargs = getattr(client, f'_kwargs_{endpoint}')(*BUILDER_ARGS[endpoint])
+        return _build_request_kwargs(kwargs['token'], kwargs.get('payload'), kwargs.get('params'), codec)
+
+    benchmark(build)
+
+
+@pytest.mark.benchmark(group='url')
+def test_url_str_format(benchmark, client):
+    benchmark((API_ROOT + DEVICE_PATH).format, id=PLAYER_ID)
+
+
+@pytest.mark.benchmark(group='url')
+def test_url_compiled(benchmark, client):
+    benchmark(client._urls[DEVICE_PATH], PLAYER_ID)
@@ -0,0 +1,46 @@
+"""Micro-benchmarks of handling responses: status checks, `OneSignalResponse` construction and body decoding."""
+import json
+
+import httpx
+import pytest
+
+from onesignal_sdk.request import _handle_response
+from onesignal_sdk.response import OneSignalResponse
+
+from .conftest import PLAYER_ID
+
+NOTIFICATION = {'id': PLAYER_ID, 'recipients': 1500, 'external_id': None}
+DEVICES_PAGE = {
+    'total_count': 100000,
+    'offset': 0,
+    'limit': 300,
+    'players': [
+        {'id': PLAYER_ID, 'device_type': 1, 'language': 'en', 'session_count': 12, 'tags': {'level': '10'}}
+        for _ in range(300)
+    ],
+}
+BODIES = {'notification': NOTIFICATION, 'devices-page': DEVICES_PAGE}
+
+
+def make_response(body):
+    return httpx.Response(200, content=json.dumps(body).encode(), headers={'Content-Type': 'application/json'})
+
+
+@pytest.mark.benchmark(group='handle-response')
+def test_handle_response(benchmark):
+    response = make_response(NOTIFICATION)
+    benchmark(_handle_response, response)
+
+
+@pytest.mark.benchmark(group='handle-response')
+def test_response_construction(benchmark):
+    response = make_response(NOTIFICATION)
+    benchmark(OneSignalResponse, response)
+
+
+@pytest.mark.benchmark(group='decode-body')
+@pytest.mark.parametrize('codec', ['json', 'orjson', 'ujson'], indirect=True)
+@pytest.mark.parametrize('body', BODIES)
+def test_decode_body(benchmark, body, codec):
+    response = make_response(BODIES[body])
+    benchmark(lambda: OneSignalResponse(response, codec=codec).body)
@@ -0,0 +1,62 @@
+"""
+End-to-end throughput of the clients, through the whole request path down to the in-process stand-in server.
+Each benchmark reports requests per second, p50/p99 latency and memory in its `extra_info`, and in the load summary
+printed at the end of the run.
+"""
+import pytest
+
+from onesignal_sdk.testing import StandInServer, player_id
+
+from .load import run_async, run_sync
+
+REQUESTS = 500
+PLAYER_ID = player_id(1)
+
+
+@pytest.fixture
+def server():
+    return StandInServer(players=100)
+
+
+@pytest.fixture
+def client_options(server):
+    return {'TRANSPORT': server.transport()}
+
+
+@pytest.fixture
+def async_client_options(server):
+    return {'TRANSPORT': server.async_transport()}
+
+
+@pytest.mark.benchmark(group='throughput-sync')
+@pytest.mark.parametrize('max_workers', [1, 8])
+def test_sync_view_device(benchmark, record_load, client, max_workers):
+    def send():
+        return client.view_device(PLAYER_ID).body
+
+    report = benchmark.pedantic(run_sync, (send, REQUESTS, max_workers), rounds=3)
+    report.trace_memory(lambda: run_sync(send, REQUESTS, max_workers))
+    record_load(report)
+
+
+@pytest.mark.benchmark(group='throughput-sync')
+def test_sync_send_notification(benchmark, record_load, client):
+    body = {'contents': {'en': 'Hello'}, 'included_segments': ['Active Users']}
+
+    def send():
+        return client.send_notification(body).body
+
+    report = benchmark.pedantic(run_sync, (send, REQUESTS), rounds=3)
+    report.trace_memory(lambda: run_sync(send, REQUESTS))
+    record_load(report)
+
+
+@pytest.mark.benchmark(group='throughput-async')
+@pytest.mark.parametrize('concurrency', [1, 32])
+def test_async_view_device(benchmark, record_load, async_client, concurrency):
+    async def send():
+        return (await async_client.view_device(PLAYER_ID)).body
+
+    report = benchmark.pedantic(run_async, (send, REQUESTS, concurrency), rounds=3)
+    report.trace_memory(lambda: run_async(send, REQUESTS, concurrency))
+    record_load(report)
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .concurrency import gather_bounded, map_bounded
+from .constants import BATCH_FLUSH_INTERVAL, BATCH_MAX_PENDING, DEFAULT_CONCURRENCY
+from .error import OneSignalHTTPError
+
+# Errors of buffered updates expected from requests. Any other error of an update is reported the same way, and logged.
+BATCH_ERRORS = (OneSignalHTTPError, httpx.HTTPError)
+
+logger = logging.getLogger(__name__)
+
+Update = Tuple[str, str, Dict[str, Any]]
+ErrorHandler = Callable[[str, str, Dict[str, Any], Exception], None]
+
+
+def merge_update(pending: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a later update body into a pending one. Later values win, per tag for `tags`."""
+    merged = {**pending, **body}
+    if isinstance(pending.get('tags'), dict) and isinstance(body.get('tags'), dict):
+        merged['tags'] = {**pending['tags'], **body['tags']}
+    return merged
+
+
+class _UpdateBuffer:
+    """Pending `edit_tags`/`edit_device` updates, merged per user or device. Shared by the sync and async batchers."""
+
+    def __init__(self, max_pending: int, flush_interval: float, on_error: Optional[ErrorHandler]):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.errors: List[Tuple[str, str, Dict[str, Any], Exception]] = []
+        self.updates = 0
+        self.sent = 0
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _add(self, method: str, target_id: str, body: Dict[str, Any]) -> bool:
+        """Buffer an update and return True if the buffer is full and should be flushed."""
+        with self._lock:
+            key = (method, target_id)
+            pending = self._pending.get(key)
+            self._pending[key] = dict(body) if pending is None else merge_update(pending, body)
+            self.updates += 1
+            return len(self._pending) >= self.max_pending
+
+    def _take(self) -> List[Update]:
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+        return [(method, target_id, body) for (method, target_id), body in pending.items()]
+
+    def _restore(self, updates: List[Update]) -> None:
+        """Put back updates taken by a flush which failed, with updates buffered since merged into them."""
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict(
+                ((method, target_id), body) for method, target_id, body in updates)
+            for key, body in pending.items():
+                restored = self._pending.get(key)
+                self._pending[key] = body if restored is None else merge_update(restored, body)
+
+    def _report(self, updates: List[Update], results: List[Any]) -> None:
+        self.sent += len(updates)
+        for (method, target_id, body), result in zip(updates, results):
+            if not isinstance(result, Exception):
+                continue
+            if not isinstance(result, BATCH_ERRORS):
+                logger.error('Unexpected error sending %s of %s.', method, target_id, exc_info=result)
+            if self.on_error is None:
+                self.errors.append((method, target_id, body, result))
+                continue
+            try:
+                self.on_error(method, target_id, body, result)
+            except Exception:
+                logger.exception('Error handler %r failed.', self.on_error)
+
+
+class UpdateBatcher(_UpdateBuffer):
+    """
+    Write-behind buffer for `edit_tags` and `edit_device` of a `Client`.
+    Successive updates of the same user or device are merged, with later values winning per field and per tag, and sent
+    as a single request. Pending updates are flushed by a background thread every `flush_interval` seconds, or as soon
+    as `max_pending` users and devices have updates, on a pool of `max_workers` threads.
+    Failed updates are passed to `on_error(method, id, body, error)` if given, or collected in `.errors`, whatever the
+    error, so a failing update never stops the background thread.
+    Call `close()`, or use the batcher as a context manager, to send the remaining updates on shutdown.
+    """
+
+    def __init__(self,
+                 client: Any,
+                 max_pending: int = BATCH_MAX_PENDING,
+                 flush_interval: float = BATCH_FLUSH_INTERVAL,
+                 max_workers: int = DEFAULT_CONCURRENCY,
+                 on_error: ErrorHandler = None):
+        super().__init__(max_pending, flush_interval, on_error)
+        self.client = client
+        self.max_workers = max_workers
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='onesignal-update-batcher', daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'UpdateBatcher':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def edit_tags(self, external_user_id: str, body: Dict[str, Any]) -> None:
+        """Buffer an `edit_tags` update."""
+        self._submit('edit_tags', external_user_id, body)
+
+    def edit_device(self, device_id: str, body: Dict[str, Any]) -> None:
+        """Buffer an `edit_device` update."""
+        self._submit('edit_device', device_id, body)
+
+    def flush(self) -> None:
+        """Send all pending updates and wait for them to complete."""
+        with self._flush_lock:
+            updates = self._take()
+            if not updates:
+                return
+            try:
+                results = list(map_bounded(self._send, updates, self.max_workers, catch=(Exception,)))
+            except BaseException:
+                self._restore(updates)
+                raise
+            self._report(updates, results)
+
+    def close(self) -> None:
+        """Stop the background thread and send the remaining updates. The batcher can not be used afterwards."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def _submit(self, method: str, target_id: str, body: Dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError('Batcher is closed.')
+        if self._add(method, target_id, body):
+            self._wakeup.set()
+
+    def _send(self, update: Update) -> Any:
+        method, target_id, body = update
+        return getattr(self.client, method)(target_id, body)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing updates failed.')
+
+
+class AsyncUpdateBatcher(_UpdateBuffer):
+    """
+    Async version of `UpdateBatcher` for an `AsyncClient`, flushing from a background task with at most `concurrency`
+    requests in flight. Updates are buffered without awaiting, the task is started with the first update.
+    Call `await aclose()`, or use the batcher as an async context manager, to send the remaining updates on shutdown.
+    """
+
+    def __init__(self,
+                 client: Any,
+                 max_pending: int = BATCH_MAX_PENDING,
+                 flush_interval: float = BATCH_FLUSH_INTERVAL,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 on_error: ErrorHandler = None):
+        super().__init__(max_pending, flush_interval, on_error)
+        self.client = client
+        self.concurrency = concurrency
+        self._closed = False
+        # Created on first use, so they belong to the running event loop.
+        self._task = None
+        self._wakeup = None
+        self._flush_lock = None
+
+    async def __aenter__(self) -> 'AsyncUpdateBatcher':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def edit_tags(self, external_user_id: str, body: Dict[str, Any]) -> None:
+        """Buffer an `edit_tags` update."""
+        self._submit('edit_tags', external_user_id, body)
+
+    def edit_device(self, device_id: str, body: Dict[str, Any]) -> None:
+        """Buffer an `edit_device` update."""
+        self._submit('edit_device', device_id, body)
+
+    async def flush(self) -> None:
+        """Send all pending updates and wait for them to complete."""
+        self._start()
+        async with self._flush_lock:
+            updates = self._take()
+            if not updates:
+                return
+            try:
+                results = await gather_bounded(self._send, updates, self.concurrency, catch=(Exception,))
+            except BaseException:
+                self._restore(updates)
+                raise
+            self._report(updates, results)
+
+    async def aclose(self) -> None:
+        """Stop the background task and send the remaining updates. The batcher can not be used afterwards."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+        await self.flush()
+
+    def _submit(self, method: str, target_id: str, body: Dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError('Batcher is closed.')
+        self._start()
+        if self._add(method, target_id, body):
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        if self._flush_lock is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+        if self._task is None and not self._closed:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _send(self, update: Update) -> Any:
+        method, target_id, body = update
+        return await getattr(self.client, method)(target_id, body)
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Flushing updates failed.')
@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import httpx
+
+from .constants import (
+    CACHE_ENTRY_OVERHEAD, CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, CACHE_TTLS,
+)
+
+
+class ResponseCache:
+    """
+    In-memory cache of successful responses of read-only endpoints, for the `RESPONSE_CACHE` client option.
+
+    Only GET requests of endpoints with a TTL in `ttls` are cached. Entries are keyed by url, params and a fingerprint
+    of the auth token, and expire after the TTL of their endpoint. Least recently used entries are evicted once the
+    cache holds more than `max_entries` responses or more than `max_bytes` of response bodies.
+    A write request through the client invalidates cached responses of its url and of its parent url, so `edit_device`
+    invalidates `view_device` of the same device and `update_app` invalidates both `view_app` and `view_apps`.
+    Thread-safe, a cache can be shared between clients.
+    """
+
+    def __init__(self,
+                 ttls: Dict[str, float] = None,
+                 max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Approximate number of bytes held by the cache."""
+        return self._size
+
+    def key(self, endpoint: str, request_kwargs: Dict[str, Any]) -> Optional[Hashable]:
+        """Cache key of a request built by an endpoint, or None if the request is not cacheable."""
+        if endpoint not in self.ttls or request_kwargs['method'] != 'GET':
+            return None
+        return request_key(request_kwargs)
+
+    def get(self, key: Hashable) -> Optional[httpx.Response]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, endpoint: str, key: Hashable, response: httpx.Response) -> None:
+        size = len(response.content) + CACHE_ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttls[endpoint], response, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, url: str) -> None:
+        """Drop cached responses of given url and of its parent url."""
+        urls = {url, url.rsplit('/', 1)[0]}
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in urls]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+
+def request_key(request_kwargs: Dict[str, Any]) -> Hashable:
+    """Key identifying a request without payload by its url, params and a fingerprint of its auth token."""
+    params = request_kwargs.get('params') or {}
+    token = request_kwargs.get('token') or ''
+    return (
+        request_kwargs['url'],
+        tuple(sorted((name, str(value)) for name, value in params.items())),
+        hashlib.sha256(token.encode('utf-8')).hexdigest(),
+    )
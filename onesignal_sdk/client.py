@@ -1,36 +1,233 @@
-from typing import Any, Dict, List
+import asyncio
+import logging
+import string
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from os import PathLike
+from types import MappingProxyType
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List,
+    Optional, Tuple, Union,
+)
+
+import httpx
 
+from .cache import request_key
+from .codec import get_codec
+from .columnar import ColumnBuilder, check_output
+from .concurrency import gather_bounded, map_bounded
 from .constants import (
-    API_ROOT, APP_PATH, APPS_PATH, CSV_EXPORT_PATH, DEVICE_PATH, DEVICES_PATH,
-    EDIT_TAGS_PATH, NEW_PURCHASE_PATH, NEW_SESSION_PATH, NOTIFICATION_HISTORY_PATH,
-    NOTIFICATION_PATH, NOTIFICATIONS_PATH, SEGMENT_PATH, SEGMENTS_PATH,
-    VIEW_OUTCOMES_PATH,
+    API_ROOT, APP_PATH, APP_SCOPED_PATHS, APPS_PATH, CSV_EXPORT_PATH,
+    DEFAULT_CONCURRENCY, DEFAULT_KEEPALIVE_EXPIRY, DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_KEEPALIVE_CONNECTIONS, DEVICE_PATH, DEVICES_PAGE_SIZE, DEVICES_PATH,
+    EDIT_TAGS_PATH, ENDPOINT_METHODS, ENDPOINT_PATHS, EXPORT_POLL_INTERVAL,
+    EXPORT_POLL_MAX_INTERVAL, EXPORT_TIMEOUT, IDEMPOTENCY_KEY_FIELDS,
+    MAX_NOTIFICATION_TARGETS, NEW_PURCHASE_PATH, NEW_SESSION_PATH,
+    NOTIFICATION_HISTORY_COLUMN, NOTIFICATION_HISTORY_PATH, NOTIFICATION_PATH,
+    NOTIFICATION_TARGET_FIELDS, NOTIFICATIONS_PAGE_SIZE, NOTIFICATIONS_PATH,
+    SEGMENT_PATH, SEGMENTS_PATH, VIEW_OUTCOMES_PATH,
+)
+from .delivery import DeliveryTracker
+from .export import (
+    Destination, aiter_column, aiter_records, aiter_remote_csv, awrite_values,
+    iter_column, iter_records, iter_remote_csv, write_values,
 )
+from .metrics import RequestMetrics
+from .pool import PoolMonitor, PoolStats
 from .request import async_basic_auth_request, basic_auth_request
-from .response import OneSignalResponse
+from .response import OneSignalChunkedResponse, OneSignalResponse
+
+logger = logging.getLogger(__name__)
+
+
+def _compile_url(template: str, **known: str) -> Callable[..., str]:
+    """
+    Compile an endpoint url template, substituting the fields known up front such as the app id.
+    The returned function takes the remaining fields positionally, in template order, and only concatenates strings.
+    """
+    parts = ['']
+    for text, field, _, _ in string.Formatter().parse(template):
+        parts[-1] += text
+        if field is None:
+            continue
+        if field in known:
+            parts[-1] += str(known[field])
+        else:
+            parts.append('')
+
+    if len(parts) == 1:
+        url = parts[0]
+        return lambda: url
+    if len(parts) == 2:
+        prefix, suffix = parts
+        return lambda value: f'{prefix}{value}{suffix}'
+    return lambda *values: ''.join(f'{part}{value}' for part, value in zip(parts, values)) + parts[-1]
+
+
+# Client options and their defaults.
+DEFAULT_OPTIONS = MappingProxyType({
+    'API_ROOT': API_ROOT,
+    'MAX_CONNECTIONS': DEFAULT_MAX_CONNECTIONS,
+    'MAX_KEEPALIVE_CONNECTIONS': DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    'KEEPALIVE_EXPIRY': DEFAULT_KEEPALIVE_EXPIRY,
+    'HTTP2': False,
+    'MAX_NOTIFICATION_TARGETS': MAX_NOTIFICATION_TARGETS,
+    'RATE_LIMITER': None,
+    'RETRY_POLICY': None,
+    'JSON_CODEC': None,
+    'RESPONSE_CACHE': None,
+    'COALESCE_REQUESTS': False,
+    'TRANSPORT': None,
+    'METRICS_HOOKS': (),
+})
+
+
+def http_client_kwargs(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments for an httpx client, built from the pool options among given client options."""
+    options = {**DEFAULT_OPTIONS, **options}
+    limits = httpx.Limits(
+        max_connections=options['MAX_CONNECTIONS'],
+        max_keepalive_connections=options['MAX_KEEPALIVE_CONNECTIONS'],
+        keepalive_expiry=options['KEEPALIVE_EXPIRY'],
+    )
+    kwargs = {'limits': limits, 'http2': options['HTTP2']}
+    if options['TRANSPORT'] is not None:
+        # A custom transport, such as the stand-in of `onesignal_sdk.testing`, manages its own connections.
+        kwargs['transport'] = options['TRANSPORT']
+    return kwargs
+
+
+def _endpoint_name(build_kwargs: Callable[..., Dict[str, Any]]) -> str:
+    """Name of the endpoint method a `_kwargs_*` builder is for."""
+    return build_kwargs.__name__[len('_kwargs_'):]
 
 
 class BaseClient:
-    def __init__(self, app_id: str, rest_api_key: str, user_auth_key: str = None, options: Dict[str, str] = None):
-        self.app_id = app_id
+    def __init__(self, app_id: str, rest_api_key: str, user_auth_key: str = None, options: Dict[str, Any] = None):
         self.rest_api_key = rest_api_key
         self.user_auth_key = user_auth_key or ""
-        default_options = {
-            'API_ROOT': API_ROOT,
-        }
         options = options or {}
-        self._options = {**default_options, **options}
+        self._options = {**DEFAULT_OPTIONS, **options}
+        self._codec = get_codec(self._options['JSON_CODEC'])
+        self.app_id = app_id
 
-    def _get_path(self, path: str, **kwargs) -> str:
-        """Get full endpoint for a specific path, formatted with given kwargs."""
-        return self._options['API_ROOT'] + path.format(**kwargs)
+    @property
+    def app_id(self) -> str:
+        return self._app_id
+
+    @app_id.setter
+    def app_id(self, app_id: str) -> None:
+        self._app_id = app_id
+        # Endpoint urls are compiled once per app id, building a request only substitutes ids.
+        self._urls = {
+            path: _compile_url(self._options['API_ROOT'] + path, app_id=app_id)
+            if path in APP_SCOPED_PATHS else _compile_url(self._options['API_ROOT'] + path)
+            for path in ENDPOINT_PATHS
+        }
+        # Shared by requests, read-only so no request can change it for the others.
+        self._app_params = MappingProxyType({'app_id': app_id})
+
+    def _http_client_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for the underlying httpx client, built from client options."""
+        return http_client_kwargs(self._options)
+
+    def _from_cache(self,
+                    build_kwargs: Callable[..., Dict[str, Any]],
+                    request_kwargs: Dict[str, Any]) -> Tuple[Optional[Hashable], Optional[OneSignalResponse]]:
+        """Cache key of a request and its cached response, if the `RESPONSE_CACHE` option is set."""
+        cache = self._options['RESPONSE_CACHE']
+        if cache is None:
+            return None, None
+        key = cache.key(_endpoint_name(build_kwargs), request_kwargs)
+        cached = cache.get(key) if key is not None else None
+        # Each caller gets its own response object, so a decoded body is never shared.
+        return key, OneSignalResponse(cached, codec=self._codec) if cached is not None else None
+
+    def _to_cache(self,
+                  build_kwargs: Callable[..., Dict[str, Any]],
+                  request_kwargs: Dict[str, Any],
+                  key: Optional[Hashable],
+                  response: Optional[OneSignalResponse]) -> None:
+        """Cache the response of a cacheable request, or invalidate responses affected by a write request."""
+        cache = self._options['RESPONSE_CACHE']
+        if cache is None:
+            return
+        if request_kwargs['method'] != 'GET':
+            cache.invalidate(request_kwargs['url'])
+        elif key is not None and response is not None:
+            cache.set(_endpoint_name(build_kwargs), key, response.http_response)
+
+    def pool_stats(self) -> PoolStats:
+        """
+        Snapshot of the connection pool: active, idle and queued connections, and if a `PoolMonitor` is one of the
+        `METRICS_HOOKS`, percentiles of the time requests waited for a connection and connection churn.
+        """
+        monitor = next((hook for hook in self._options['METRICS_HOOKS'] if isinstance(hook, PoolMonitor)), None)
+        return PoolStats(self.http_client, monitor)
+
+    def _new_metrics(self, endpoint: str, request_kwargs: Dict[str, Any]) -> Optional[RequestMetrics]:
+        """Metrics to measure a request into, if the `METRICS_HOOKS` option is set."""
+        if not self._options['METRICS_HOOKS']:
+            return None
+        return RequestMetrics(endpoint, request_kwargs['method'], request_kwargs['url'])
+
+    def _emit_metrics(self, metrics: Optional[RequestMetrics], error: Optional[BaseException]) -> None:
+        """Finish the metrics of a request and pass them to each of the `METRICS_HOOKS`."""
+        if metrics is None:
+            return
+        metrics.finish(error)
+        for hook in self._options['METRICS_HOOKS']:
+            try:
+                hook(metrics)
+            except Exception:
+                # Measuring a request must not change its outcome, a sent notification would look failed.
+                logger.exception('Metrics hook %r failed.', hook)
+
+    def _chunk_notification_body(self, notification_body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Split a notification body targeting more players than OneSignal accepts in a single request.
+        Each chunk gets its own idempotency key derived from the original one, so chunks are not deduplicated
+        against each other while retrying the whole notification stays idempotent.
+        """
+        chunk_size = self._options['MAX_NOTIFICATION_TARGETS']
+        for field in NOTIFICATION_TARGET_FIELDS:
+            targets = notification_body.get(field)
+            if targets is None or len(targets) <= chunk_size:
+                continue
+
+            chunks = []
+            for index, start in enumerate(range(0, len(targets), chunk_size)):
+                chunk = dict(notification_body)
+                chunk[field] = targets[start:start + chunk_size]
+                for key_field in IDEMPOTENCY_KEY_FIELDS:
+                    if index > 0 and chunk.get(key_field):
+                        chunk[key_field] = str(uuid.uuid5(uuid.NAMESPACE_URL, f'{chunk[key_field]}/{index}'))
+                chunks.append(chunk)
+            return chunks
+        return [notification_body]
+
+    @staticmethod
+    def _page_query(query: Dict[str, Any], page_size: int) -> Dict[str, Any]:
+        """Query of the first page of a paginated endpoint, starting from the offset in `query` if any."""
+        page_query = dict(query or {})
+        page_query.setdefault('offset', 0)
+        page_query['limit'] = page_size
+        return page_query
+
+    @staticmethod
+    def _next_page_offsets(first_page: Dict[str, Any], first_query: Dict[str, Any]) -> range:
+        """Offsets of the pages following the first one, based on the `total_count` reported by OneSignal."""
+        page_size = first_query['limit']
+        return range(first_query['offset'] + page_size, first_page.get('total_count', 0), page_size)
 
     def _kwargs_send_notification(self, notification_body: Dict[str, Any]) -> Dict[str, Any]:
         post_body = dict(notification_body)
         post_body['app_id'] = self.app_id
         return {
             'method': 'POST',
-            'url': self._get_path(NOTIFICATIONS_PATH),
+            'url': self._urls[NOTIFICATIONS_PATH](),
             'token': self.rest_api_key,
             'payload': post_body,
         }
@@ -38,17 +235,17 @@ class BaseClient:
     def _kwargs_cancel_notification(self, notification_id: str) -> Dict[str, Any]:
         return {
             'method': 'DELETE',
-            'url': self._get_path(NOTIFICATION_PATH, id=notification_id),
+            'url': self._urls[NOTIFICATION_PATH](notification_id),
             'token': self.rest_api_key,
-            'params': {'app_id': self.app_id},
+            'params': self._app_params,
         }
 
     def _kwargs_view_notification(self, notification_id: str) -> Dict[str, Any]:
         return {
             'method': 'GET',
-            'url': self._get_path(NOTIFICATION_PATH, id=notification_id),
+            'url': self._urls[NOTIFICATION_PATH](notification_id),
             'token': self.rest_api_key,
-            'params': {'app_id': self.app_id},
+            'params': self._app_params,
         }
 
     def _kwargs_view_notifications(self, query: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -57,7 +254,7 @@ class BaseClient:
             params.update(query)
         return {
             'method': 'GET',
-            'url': self._get_path(NOTIFICATIONS_PATH),
+            'url': self._urls[NOTIFICATIONS_PATH](),
             'token': self.rest_api_key,
             'params': params,
         }
@@ -67,7 +264,7 @@ class BaseClient:
         post_body['app_id'] = self.app_id
         return {
             'method': 'POST',
-            'url': self._get_path(NOTIFICATION_HISTORY_PATH, id=notification_id),
+            'url': self._urls[NOTIFICATION_HISTORY_PATH](notification_id),
             'token': self.rest_api_key,
             'payload': post_body,
         }
@@ -75,9 +272,9 @@ class BaseClient:
     def _kwargs_view_device(self, device_id: str) -> Dict[str, Any]:
         return {
             'method': 'GET',
-            'url': self._get_path(DEVICE_PATH, id=device_id),
+            'url': self._urls[DEVICE_PATH](device_id),
             'token': self.rest_api_key,
-            'params': {'app_id': self.app_id},
+            'params': self._app_params,
         }
 
     def _kwargs_view_devices(self, query: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -86,7 +283,7 @@ class BaseClient:
             params.update(query)
         return {
             'method': 'GET',
-            'url': self._get_path(DEVICES_PATH),
+            'url': self._urls[DEVICES_PATH](),
             'token': self.rest_api_key,
             'params': params,
         }
@@ -96,7 +293,7 @@ class BaseClient:
         post_body['app_id'] = self.app_id
         return {
             'method': 'POST',
-            'url': self._get_path(DEVICES_PATH),
+            'url': self._urls[DEVICES_PATH](),
             'token': self.rest_api_key,
             'payload': post_body,
         }
@@ -106,7 +303,7 @@ class BaseClient:
         post_body['app_id'] = self.app_id
         return {
             'method': 'PUT',
-            'url': self._get_path(DEVICE_PATH, id=device_id),
+            'url': self._urls[DEVICE_PATH](device_id),
             'token': self.rest_api_key,
             'payload': post_body,
         }
@@ -114,7 +311,7 @@ class BaseClient:
     def _kwargs_edit_tags(self, user_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'method': 'PUT',
-            'url': self._get_path(EDIT_TAGS_PATH, app_id=self.app_id, user_id=user_id),
+            'url': self._urls[EDIT_TAGS_PATH](user_id),
             'token': self.rest_api_key,
             'payload': body,
         }
@@ -124,7 +321,7 @@ class BaseClient:
         post_body['app_id'] = self.app_id
         return {
             'method': 'POST',
-            'url': self._get_path(NEW_SESSION_PATH, id=device_id),
+            'url': self._urls[NEW_SESSION_PATH](device_id),
             'token': self.rest_api_key,
             'payload': post_body,
         }
@@ -134,7 +331,7 @@ class BaseClient:
         post_body['app_id'] = self.app_id
         return {
             'method': 'POST',
-            'url': self._get_path(NEW_PURCHASE_PATH, id=device_id),
+            'url': self._urls[NEW_PURCHASE_PATH](device_id),
             'token': self.rest_api_key,
             'payload': post_body,
         }
@@ -143,7 +340,7 @@ class BaseClient:
         params = {'app_id': self.app_id}
         return {
             'method': 'POST',
-            'url': self._get_path(CSV_EXPORT_PATH),
+            'url': self._urls[CSV_EXPORT_PATH](),
             'token': self.rest_api_key,
             'params': params,
             'payload': body,
@@ -152,7 +349,7 @@ class BaseClient:
     def _kwargs_create_segments(self, body: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'method': 'POST',
-            'url': self._get_path(SEGMENTS_PATH, app_id=self.app_id),
+            'url': self._urls[SEGMENTS_PATH](),
             'token': self.rest_api_key,
             'payload': body,
         }
@@ -160,7 +357,7 @@ class BaseClient:
     def _kwargs_delete_segments(self, segment_id: str) -> Dict[str, Any]:
         return {
             'method': 'DELETE',
-            'url': self._get_path(SEGMENT_PATH, app_id=self.app_id, segment_id=segment_id),
+            'url': self._urls[SEGMENT_PATH](segment_id),
             'token': self.rest_api_key,
         }
 
@@ -170,7 +367,7 @@ class BaseClient:
             params.update(extra_params)
         return {
             'method': 'GET',
-            'url': self._get_path(VIEW_OUTCOMES_PATH, app_id=self.app_id),
+            'url': self._urls[VIEW_OUTCOMES_PATH](),
             'token': self.rest_api_key,
             'params': params,
         }
@@ -178,21 +375,21 @@ class BaseClient:
     def _kwargs_view_apps(self) -> Dict[str, Any]:
         return {
             'method': 'GET',
-            'url': self._get_path(APPS_PATH),
+            'url': self._urls[APPS_PATH](),
             'token': self.user_auth_key,
         }
 
     def _kwargs_view_app(self, app_id: str) -> Dict[str, Any]:
         return {
             'method': 'GET',
-            'url': self._get_path(APP_PATH, app_id=app_id),
+            'url': self._urls[APP_PATH](app_id),
             'token': self.user_auth_key,
         }
 
     def _kwargs_create_app(self, body: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'method': 'POST',
-            'url': self._get_path(APPS_PATH),
+            'url': self._urls[APPS_PATH](),
             'token': self.user_auth_key,
             'payload': body,
         }
@@ -200,22 +397,166 @@ class BaseClient:
     def _kwargs_update_app(self, app_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'method': 'PUT',
-            'url': self._get_path(APP_PATH, app_id=app_id),
+            'url': self._urls[APP_PATH](app_id),
             'token': self.user_auth_key,
             'payload': body,
         }
 
 
 class AsyncClient(BaseClient):
-    async def send_notification(self, notification_body: Dict[str, Any]) -> OneSignalResponse:
+    def __init__(self, *args, http_client: httpx.AsyncClient = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A given connection pool, such as the shared one of a `ClientRegistry`, is closed by its owner.
+        self._owns_http_client = http_client is None
+        self.http_client = http_client if http_client is not None else httpx.AsyncClient(**self._http_client_kwargs())
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool, unless it was given. The client can not be used afterwards."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def _request(self, build_kwargs: Callable[..., Dict[str, Any]], *args) -> OneSignalResponse:
+        """
+        Build request kwargs with given builder and make the request over the client's connection pool.
+        Responses of cacheable requests are served from the `RESPONSE_CACHE`, if set.
+        Identical concurrent GET requests share a single request if the `COALESCE_REQUESTS` option is set.
+        """
+        request_kwargs = build_kwargs(*args)
+        key, response = self._from_cache(build_kwargs, request_kwargs)
+        if response is not None:
+            return response
+        try:
+            if self._options['COALESCE_REQUESTS'] and request_kwargs['method'] == 'GET':
+                response = await self._coalesced_request(build_kwargs, request_kwargs)
+            else:
+                response = await self._send(build_kwargs, request_kwargs)
+            return response
+        finally:
+            self._to_cache(build_kwargs, request_kwargs, key, response)
+
+    async def _send(self,
+                    build_kwargs: Callable[..., Dict[str, Any]],
+                    request_kwargs: Dict[str, Any]) -> OneSignalResponse:
+        metrics = self._new_metrics(_endpoint_name(build_kwargs), request_kwargs)
+        error = None
+        try:
+            return await async_basic_auth_request(client=self.http_client,
+                                                  limiter=self._options['RATE_LIMITER'],
+                                                  retry=self._options['RETRY_POLICY'],
+                                                  codec=self._codec,
+                                                  metrics=metrics,
+                                                  **request_kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._emit_metrics(metrics, error)
+
+    async def _coalesced_request(self,
+                                 build_kwargs: Callable[..., Dict[str, Any]],
+                                 request_kwargs: Dict[str, Any]) -> OneSignalResponse:
+        """
+        Join the in-flight request identical to this one, or send it if there is none.
+        The request runs as a task of its own, so cancelling one of the callers does not cancel it for the others.
+        """
+        key = request_key(request_kwargs)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(self._send(build_kwargs, request_kwargs))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            # Retrieve the exception even if every caller is cancelled, so it is not reported as never retrieved.
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        response = await asyncio.shield(task)
+        # Each caller gets its own response object, so a decoded body is never shared.
+        return OneSignalResponse(response.http_response, codec=self._codec)
+
+    async def _iter_pages(self,
+                          view_page: Callable[[Dict[str, Any]], Awaitable[OneSignalResponse]],
+                          records_key: str,
+                          query: Dict[str, Any],
+                          page_size: int,
+                          concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield records of a paginated endpoint page by page. Up to `concurrency` following pages are fetched in the
+        background while the current one is consumed.
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1.')
+
+        async def fetch(offset):
+            response = await view_page({**first_query, 'offset': offset})
+            return response.body[records_key]
+
+        first_query = self._page_query(query, page_size)
+        first_page = (await view_page(first_query)).body
+        offsets = iter(self._next_page_offsets(first_page, first_query))
+        pending = deque(asyncio.ensure_future(fetch(offset)) for offset in islice(offsets, concurrency))
+        try:
+            for record in first_page[records_key]:
+                yield record
+            while pending:
+                records = await pending.popleft()
+                for offset in islice(offsets, 1):
+                    pending.append(asyncio.ensure_future(fetch(offset)))
+                for record in records:
+                    yield record
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def send_notification(self,
+                                notification_body: Dict[str, Any],
+                                ) -> Union[OneSignalResponse, OneSignalChunkedResponse]:
         """
         Sends notifications to your users
         Reference https://documentation.onesignal.com/reference/create-notification
 
+        If `include_player_ids` or `include_external_user_ids` has more targets than OneSignal accepts in a single
+        request, the notification is split into chunks which are sent concurrently.
+
         :param notification_body: Notification body
-        :return: Http response of One Signal server.
+        :return: Http response of One Signal server, or aggregated responses of all chunks.
+        """
+        chunks = self._chunk_notification_body(notification_body)
+        if len(chunks) == 1:
+            return await self._request(self._kwargs_send_notification, notification_body)
+
+        async def send_chunk(chunk):
+            return await self._request(self._kwargs_send_notification, chunk)
+
+        return OneSignalChunkedResponse(await gather_bounded(send_chunk, chunks, DEFAULT_CONCURRENCY))
+
+    async def send_notifications(self,
+                                 notification_bodies: Iterable[Dict[str, Any]],
+                                 concurrency: int = DEFAULT_CONCURRENCY,
+                                 ) -> List[Union[OneSignalResponse, OneSignalChunkedResponse, Exception]]:
+        """
+        Sends many notifications concurrently over the shared connection pool.
+        A failed notification does not abort the batch, its `OneSignalHTTPError` or transport error, such as a timeout,
+        is returned in place of the response.
+
+        :param notification_bodies: Notification bodies, each one is sent as a separate notification.
+        :param concurrency: Maximum number of requests in flight at the same time.
+        :return: Http responses or errors of One Signal server, in the order of given bodies.
+        """
+        return await gather_bounded(self.send_notification, notification_bodies, concurrency)
+
+    def delivery_tracker(self, **kwargs) -> DeliveryTracker:
         """
-        return await async_basic_auth_request(**self._kwargs_send_notification(notification_body))
+        Tracker watching the delivery of sent notifications until they complete, with a single polling schedule.
+        Usage: `future = tracker.track(response.body['id'])`
+
+        :param kwargs: Arguments of `DeliveryTracker`, such as `concurrency` and `max_interval`.
+        :return: A `DeliveryTracker` of the client.
+        """
+        return DeliveryTracker(self, **kwargs)
 
     async def cancel_notification(self, notification_id: str) -> OneSignalResponse:
         """
@@ -225,7 +566,7 @@ class AsyncClient(BaseClient):
         :param notification_id: Notification id.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_cancel_notification(notification_id))
+        return await self._request(self._kwargs_cancel_notification, notification_id)
 
     async def view_notification(self, notification_id: str) -> OneSignalResponse:
         """
@@ -235,7 +576,7 @@ class AsyncClient(BaseClient):
         :param notification_id: Notification id.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_view_notification(notification_id))
+        return await self._request(self._kwargs_view_notification, notification_id)
 
     async def view_notifications(self, query: Dict[str, Any] = None) -> OneSignalResponse:
         """
@@ -245,7 +586,22 @@ class AsyncClient(BaseClient):
         :param query: Query to apply to the request.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_view_notifications(query))
+        return await self._request(self._kwargs_view_notifications, query)
+
+    def iter_notifications(self,
+                           query: Dict[str, Any] = None,
+                           page_size: int = NOTIFICATIONS_PAGE_SIZE,
+                           concurrency: int = 1) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over all notifications, fetching pages lazily with `view_notifications`.
+        Usage: `async for notification in client.iter_notifications(): ...`
+
+        :param query: Query to apply to the requests. `offset` sets the starting point.
+        :param page_size: Number of notifications fetched per request.
+        :param concurrency: Number of following pages fetched concurrently while the current page is consumed.
+        :return: Async iterator of notifications.
+        """
+        return self._iter_pages(self.view_notifications, 'notifications', query, page_size, concurrency)
 
     async def notification_history(self, notification_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -256,7 +612,43 @@ class AsyncClient(BaseClient):
         :param body: Post body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_notification_history(notification_id, body))
+        return await self._request(self._kwargs_notification_history, notification_id, body)
+
+    async def notification_history_stream(self,
+                                          notification_id: str,
+                                          events: str = 'sent',
+                                          poll_interval: float = EXPORT_POLL_INTERVAL,
+                                          timeout: float = EXPORT_TIMEOUT,
+                                          spool: Union[bool, str, PathLike] = False) -> AsyncIterator[str]:
+        """
+        Start a `notification_history` job, wait until its file is ready and stream the ids of the players in it.
+        The file is parsed in a thread while the following chunks are downloaded, it is never held in memory.
+        Usage: `async for player_id in client.notification_history_stream(notification_id): ...`
+
+        :param notification_id: Notification id.
+        :param events: `sent` or `clicked`.
+        :param poll_interval: Seconds to wait before checking the file again, doubled after each check.
+        :param timeout: Seconds to wait for the file to be ready before raising TimeoutError.
+        :param spool: Download the whole file to disk before parsing it, to a temporary file or to the given path.
+        :return: Async iterator of player ids.
+        """
+        response = await self.notification_history(notification_id, {'events': events})
+        rows = aiter_remote_csv(self.http_client, response.body['destination_url'], poll_interval,
+                                EXPORT_POLL_MAX_INTERVAL, timeout, spool)
+        async for player_id in aiter_column(rows, NOTIFICATION_HISTORY_COLUMN):
+            yield player_id
+
+    async def notification_history_into(self, notification_id: str, destination: Destination, **kwargs) -> int:
+        """
+        Stream the player ids of `notification_history_stream` into a set, or one per line into a text file or a file
+        at given path.
+
+        :param notification_id: Notification id.
+        :param destination: A set, a text file or a path.
+        :param kwargs: Arguments of `notification_history_stream`, such as `events`.
+        :return: Number of player ids.
+        """
+        return await awrite_values(self.notification_history_stream(notification_id, **kwargs), destination)
 
     async def view_devices(self, query: Dict[str, Any] = None) -> OneSignalResponse:
         """
@@ -266,7 +658,43 @@ class AsyncClient(BaseClient):
         :param query: Query params such as limit and offset.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_view_devices(query))
+        return await self._request(self._kwargs_view_devices, query)
+
+    def iter_devices(self,
+                     query: Dict[str, Any] = None,
+                     page_size: int = DEVICES_PAGE_SIZE,
+                     concurrency: int = 1) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over all devices, fetching pages lazily with `view_devices`.
+        Usage: `async for device in client.iter_devices(): ...`
+
+        :param query: Query to apply to the requests. `offset` sets the starting point.
+        :param page_size: Number of devices fetched per request.
+        :param concurrency: Number of following pages fetched concurrently while the current page is consumed.
+        :return: Async iterator of devices.
+        """
+        return self._iter_pages(self.view_devices, 'players', query, page_size, concurrency)
+
+    async def device_columns(self,
+                             query: Dict[str, Any] = None,
+                             output: str = 'arrow',
+                             page_size: int = DEVICES_PAGE_SIZE,
+                             concurrency: int = 1) -> Any:
+        """
+        Fetch all devices with `iter_devices` into column oriented buffers, without keeping a list of device dicts.
+        Columns such as `device_type`, `language` and `tags` are dictionary encoded.
+
+        :param query: Query to apply to the requests. `offset` sets the starting point.
+        :param output: `arrow` for a pyarrow Table, `numpy` for NumPy arrays or `python` for a dict of lists.
+        :param page_size: Number of devices fetched per request.
+        :param concurrency: Number of following pages fetched concurrently while the current page is consumed.
+        :return: Devices in the requested output format, see `ColumnBuilder`.
+        """
+        check_output(output)
+        builder = ColumnBuilder()
+        async for device in self.iter_devices(query, page_size, concurrency):
+            builder.append_record(device)
+        return builder.to(output)
 
     async def view_device(self, device_id: str) -> OneSignalResponse:
         """
@@ -276,7 +704,7 @@ class AsyncClient(BaseClient):
         :param device_id: identifier Player's One Signal ID or email_auth_hash.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_view_device(device_id))
+        return await self._request(self._kwargs_view_device, device_id)
 
     async def add_device(self, device_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -286,7 +714,7 @@ class AsyncClient(BaseClient):
         :param device_body: Device create request body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_add_device(device_body))
+        return await self._request(self._kwargs_add_device, device_body)
 
     async def edit_device(self, device_id: str, device_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -297,7 +725,7 @@ class AsyncClient(BaseClient):
         :param device_body: Device edit request body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_edit_device(device_id, device_body))
+        return await self._request(self._kwargs_edit_device, device_id, device_body)
 
     async def edit_tags(self, external_user_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -308,7 +736,7 @@ class AsyncClient(BaseClient):
         :param body: {tags: {tag1: "new", tag2: ""}}
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_edit_tags(external_user_id, body))
+        return await self._request(self._kwargs_edit_tags, external_user_id, body)
 
     async def new_session(self, device_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -319,7 +747,7 @@ class AsyncClient(BaseClient):
         :param body: Update body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_new_session(device_id, body))
+        return await self._request(self._kwargs_new_session, device_id, body)
 
     async def new_purchase(self, device_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -330,7 +758,7 @@ class AsyncClient(BaseClient):
         :param body: Update body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_new_purchase(device_id, body))
+        return await self._request(self._kwargs_new_purchase, device_id, body)
 
     async def csv_export(self, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -340,7 +768,59 @@ class AsyncClient(BaseClient):
         :param body: Post body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_csv_export(body))
+        return await self._request(self._kwargs_csv_export, body)
+
+    async def csv_export_stream(self,
+                                body: Dict[str, Any],
+                                poll_interval: float = EXPORT_POLL_INTERVAL,
+                                timeout: float = EXPORT_TIMEOUT,
+                                spool: Union[bool, str, PathLike] = False) -> AsyncIterator[Dict[str, str]]:
+        """
+        Generate a CSV export with `csv_export`, wait until it is ready and stream its rows.
+        The gzipped file is decompressed and parsed while it is downloaded, so it is never held in memory.
+        Usage: `async for player in client.csv_export_stream(body): ...`
+
+        :param body: Post body of `csv_export`.
+        :param poll_interval: Seconds to wait before checking the file again, doubled after each check.
+        :param timeout: Seconds to wait for the file to be ready before raising TimeoutError.
+        :param spool: Download the whole file to disk before parsing it, to a temporary file or to the given path.
+        :return: Async iterator of players, as dicts keyed by CSV column names.
+        """
+        response = await self.csv_export(body)
+        rows = aiter_remote_csv(self.http_client, response.body['csv_file_url'], poll_interval,
+                                EXPORT_POLL_MAX_INTERVAL, timeout, spool)
+        async for record in aiter_records(rows):
+            yield record
+
+    async def csv_export_columns(self,
+                                 body: Dict[str, Any],
+                                 output: str = 'arrow',
+                                 poll_interval: float = EXPORT_POLL_INTERVAL,
+                                 timeout: float = EXPORT_TIMEOUT,
+                                 spool: Union[bool, str, PathLike] = False) -> Any:
+        """
+        Generate a CSV export with `csv_export` and load it into column oriented buffers as it is downloaded.
+        Rows go straight from the CSV parser into the columns, no dict is built per player.
+
+        :param body: Post body of `csv_export`.
+        :param output: `arrow` for a pyarrow Table, `numpy` for NumPy arrays or `python` for a dict of lists.
+        :param poll_interval: Seconds to wait before checking the file again, doubled after each check.
+        :param timeout: Seconds to wait for the file to be ready before raising TimeoutError.
+        :param spool: Download the whole file to disk before parsing it, to a temporary file or to the given path.
+        :return: Players in the requested output format, see `ColumnBuilder`.
+        """
+        check_output(output)
+        response = await self.csv_export(body)
+        builder = ColumnBuilder()
+        header = True
+        async for row in aiter_remote_csv(self.http_client, response.body['csv_file_url'], poll_interval,
+                                          EXPORT_POLL_MAX_INTERVAL, timeout, spool):
+            if header:
+                builder.extend_rows([row])
+                header = False
+            else:
+                builder.append_row(row)
+        return builder.to(output)
 
     async def create_segment(self, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -350,7 +830,7 @@ class AsyncClient(BaseClient):
         :param body: Post body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_create_segments(body))
+        return await self._request(self._kwargs_create_segments, body)
 
     async def delete_segment(self, segment_id: str) -> OneSignalResponse:
         """
@@ -360,7 +840,7 @@ class AsyncClient(BaseClient):
         :param segment_id: Id of segment to be deleted.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_delete_segments(segment_id))
+        return await self._request(self._kwargs_delete_segments, segment_id)
 
     async def view_outcomes(self, outcome_names: List[str], extra_params: Dict[str, Any] = None) -> OneSignalResponse:
         """
@@ -371,7 +851,7 @@ class AsyncClient(BaseClient):
         :param extra_params: Extra path/query parameters such as outcome_time_range, outcome_attribution...
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_view_outcomes(outcome_names, extra_params))
+        return await self._request(self._kwargs_view_outcomes, outcome_names, extra_params)
 
     async def view_apps(self) -> OneSignalResponse:
         """
@@ -381,7 +861,7 @@ class AsyncClient(BaseClient):
 
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_view_apps())
+        return await self._request(self._kwargs_view_apps)
 
     async def view_app(self, app_id: str) -> OneSignalResponse:
         """
@@ -392,7 +872,7 @@ class AsyncClient(BaseClient):
         :param app_id: Application id.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_view_app(app_id))
+        return await self._request(self._kwargs_view_app, app_id)
 
     async def create_app(self, app_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -402,7 +882,7 @@ class AsyncClient(BaseClient):
         :param app_body: App create body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_create_app(app_body))
+        return await self._request(self._kwargs_create_app, app_body)
 
     async def update_app(self, app_id: str, app_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -413,20 +893,137 @@ class AsyncClient(BaseClient):
         :param app_body: App update body.
         :return: Http response of One Signal server.
         """
-        return await async_basic_auth_request(**self._kwargs_update_app(app_id, app_body))
+        return await self._request(self._kwargs_update_app, app_id, app_body)
 
 
 class Client(BaseClient):
-
-    def send_notification(self, notification_body: Dict[str, Any]) -> OneSignalResponse:
+    def __init__(self, *args, http_client: httpx.Client = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A given connection pool, such as the shared one of a `ClientRegistry`, is closed by its owner.
+        self._owns_http_client = http_client is None
+        self.http_client = http_client if http_client is not None else httpx.Client(**self._http_client_kwargs())
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying connection pool, unless it was given. The client can not be used afterwards."""
+        if self._owns_http_client:
+            self.http_client.close()
+
+    def _request(self, build_kwargs: Callable[..., Dict[str, Any]], *args) -> OneSignalResponse:
+        """
+        Build request kwargs with given builder and make the request over the client's connection pool.
+        Responses of cacheable requests are served from the `RESPONSE_CACHE`, if set.
+        """
+        request_kwargs = build_kwargs(*args)
+        key, response = self._from_cache(build_kwargs, request_kwargs)
+        if response is not None:
+            return response
+        metrics = self._new_metrics(_endpoint_name(build_kwargs), request_kwargs)
+        error = None
+        try:
+            response = basic_auth_request(client=self.http_client,
+                                          limiter=self._options['RATE_LIMITER'],
+                                          retry=self._options['RETRY_POLICY'],
+                                          codec=self._codec,
+                                          metrics=metrics,
+                                          **request_kwargs)
+            return response
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._to_cache(build_kwargs, request_kwargs, key, response)
+            self._emit_metrics(metrics, error)
+
+    def _iter_pages(self,
+                    view_page: Callable[[Dict[str, Any]], OneSignalResponse],
+                    records_key: str,
+                    query: Dict[str, Any],
+                    page_size: int,
+                    max_workers: int) -> Iterator[Dict[str, Any]]:
+        """
+        Yield records of a paginated endpoint page by page. Up to `max_workers` following pages are fetched on
+        background threads while the current one is consumed.
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1.')
+
+        def fetch(offset):
+            return view_page({**first_query, 'offset': offset}).body[records_key]
+
+        first_query = self._page_query(query, page_size)
+        first_page = view_page(first_query).body
+        offsets = iter(self._next_page_offsets(first_page, first_query))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque(executor.submit(fetch, offset) for offset in islice(offsets, max_workers))
+            try:
+                yield from first_page[records_key]
+                while pending:
+                    records = pending.popleft().result()
+                    for offset in islice(offsets, 1):
+                        pending.append(executor.submit(fetch, offset))
+                    yield from records
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def map(self,
+            method_name: str,
+            iterable_of_args: Iterable[Any],
+            max_workers: int = DEFAULT_CONCURRENCY,
+            ordered: bool = True,
+            ) -> Iterator[Any]:
+        """
+        Call an endpoint method such as `edit_tags` for every item of `iterable_of_args` on a thread pool.
+        All threads share the client's connection pool. A failed call does not stop the iteration, its
+        `OneSignalHTTPError` or transport error is yielded in place of the response.
+
+        :param method_name: Name of the client method to call, e.g. `edit_device`. Only methods making a single request
+            are accepted, streaming methods such as `iter_devices` are not.
+        :param iterable_of_args: Arguments of each call. Tuples are unpacked as positional arguments.
+        :param max_workers: Number of threads making requests at the same time.
+        :param ordered: Yield results in input order. If False, `(index, result)` pairs are yielded as calls complete,
+            so a slow call does not hold back the results of the calls after it.
+        :return: Iterator of http responses or errors of One Signal server, lazily yielded. Arguments are checked
+            before it is returned.
+        """
+        if method_name not in ENDPOINT_METHODS:
+            raise ValueError(f'{method_name} is not an endpoint method of the client.')
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1.')
+        method = getattr(self, method_name)
+
+        def call(args):
+            return method(*args) if isinstance(args, tuple) else method(args)
+
+        return map_bounded(call, iterable_of_args, max_workers, ordered=ordered)
+
+    def send_notification(self,
+                          notification_body: Dict[str, Any],
+                          ) -> Union[OneSignalResponse, OneSignalChunkedResponse]:
         """
         Sends notifications to your users
         Reference https://documentation.onesignal.com/reference/create-notification
 
+        If `include_player_ids` or `include_external_user_ids` has more targets than OneSignal accepts in a single
+        request, the notification is split into chunks which are sent on a thread pool.
+
         :param notification_body: Notification body
-        :return: Http response of One Signal server.
+        :return: Http response of One Signal server, or aggregated responses of all chunks.
         """
-        return basic_auth_request(**self._kwargs_send_notification(notification_body))
+        chunks = self._chunk_notification_body(notification_body)
+        if len(chunks) == 1:
+            return self._request(self._kwargs_send_notification, notification_body)
+
+        def send_chunk(chunk):
+            return self._request(self._kwargs_send_notification, chunk)
+
+        return OneSignalChunkedResponse(list(map_bounded(send_chunk, chunks, DEFAULT_CONCURRENCY)))
 
     def cancel_notification(self, notification_id: str) -> OneSignalResponse:
         """
@@ -436,7 +1033,7 @@ class Client(BaseClient):
         :param notification_id: Notification id.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_cancel_notification(notification_id))
+        return self._request(self._kwargs_cancel_notification, notification_id)
 
     def view_notification(self, notification_id: str) -> OneSignalResponse:
         """
@@ -446,7 +1043,7 @@ class Client(BaseClient):
         :param notification_id: Notification id.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_view_notification(notification_id))
+        return self._request(self._kwargs_view_notification, notification_id)
 
     def view_notifications(self, query: Dict[str, Any] = None) -> OneSignalResponse:
         """
@@ -456,7 +1053,21 @@ class Client(BaseClient):
         :param query: Query to apply to the request.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_view_notifications(query))
+        return self._request(self._kwargs_view_notifications, query)
+
+    def iter_notifications(self,
+                           query: Dict[str, Any] = None,
+                           page_size: int = NOTIFICATIONS_PAGE_SIZE,
+                           max_workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over all notifications, fetching pages lazily with `view_notifications`.
+
+        :param query: Query to apply to the requests. `offset` sets the starting point.
+        :param page_size: Number of notifications fetched per request.
+        :param max_workers: Number of following pages fetched on threads while the current page is consumed.
+        :return: Iterator of notifications.
+        """
+        return self._iter_pages(self.view_notifications, 'notifications', query, page_size, max_workers)
 
     def notification_history(self, notification_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -467,7 +1078,41 @@ class Client(BaseClient):
         :param body: Post body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_notification_history(notification_id, body))
+        return self._request(self._kwargs_notification_history, notification_id, body)
+
+    def notification_history_stream(self,
+                                    notification_id: str,
+                                    events: str = 'sent',
+                                    poll_interval: float = EXPORT_POLL_INTERVAL,
+                                    timeout: float = EXPORT_TIMEOUT,
+                                    spool: Union[bool, str, PathLike] = False) -> Iterator[str]:
+        """
+        Start a `notification_history` job, wait until its file is ready and stream the ids of the players in it.
+        The file is parsed while it is downloaded, so it is never held in memory.
+
+        :param notification_id: Notification id.
+        :param events: `sent` or `clicked`.
+        :param poll_interval: Seconds to wait before checking the file again, doubled after each check.
+        :param timeout: Seconds to wait for the file to be ready before raising TimeoutError.
+        :param spool: Download the whole file to disk before parsing it, to a temporary file or to the given path.
+        :return: Iterator of player ids.
+        """
+        response = self.notification_history(notification_id, {'events': events})
+        rows = iter_remote_csv(self.http_client, response.body['destination_url'], poll_interval,
+                               EXPORT_POLL_MAX_INTERVAL, timeout, spool)
+        yield from iter_column(rows, NOTIFICATION_HISTORY_COLUMN)
+
+    def notification_history_into(self, notification_id: str, destination: Destination, **kwargs) -> int:
+        """
+        Stream the player ids of `notification_history_stream` into a set, or one per line into a text file or a file
+        at given path.
+
+        :param notification_id: Notification id.
+        :param destination: A set, a text file or a path.
+        :param kwargs: Arguments of `notification_history_stream`, such as `events`.
+        :return: Number of player ids.
+        """
+        return write_values(self.notification_history_stream(notification_id, **kwargs), destination)
 
     def view_devices(self, query: Dict[str, Any] = None) -> OneSignalResponse:
         """
@@ -477,7 +1122,39 @@ class Client(BaseClient):
         :param query: Query params such as limit and offset.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_view_devices(query))
+        return self._request(self._kwargs_view_devices, query)
+
+    def iter_devices(self,
+                     query: Dict[str, Any] = None,
+                     page_size: int = DEVICES_PAGE_SIZE,
+                     max_workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over all devices, fetching pages lazily with `view_devices`.
+
+        :param query: Query to apply to the requests. `offset` sets the starting point.
+        :param page_size: Number of devices fetched per request.
+        :param max_workers: Number of following pages fetched on threads while the current page is consumed.
+        :return: Iterator of devices.
+        """
+        return self._iter_pages(self.view_devices, 'players', query, page_size, max_workers)
+
+    def device_columns(self,
+                       query: Dict[str, Any] = None,
+                       output: str = 'arrow',
+                       page_size: int = DEVICES_PAGE_SIZE,
+                       max_workers: int = 1) -> Any:
+        """
+        Fetch all devices with `iter_devices` into column oriented buffers, without keeping a list of device dicts.
+        Columns such as `device_type`, `language` and `tags` are dictionary encoded.
+
+        :param query: Query to apply to the requests. `offset` sets the starting point.
+        :param output: `arrow` for a pyarrow Table, `numpy` for NumPy arrays or `python` for a dict of lists.
+        :param page_size: Number of devices fetched per request.
+        :param max_workers: Number of following pages fetched on threads while the current page is consumed.
+        :return: Devices in the requested output format, see `ColumnBuilder`.
+        """
+        check_output(output)
+        return ColumnBuilder().extend_records(self.iter_devices(query, page_size, max_workers)).to(output)
 
     def view_device(self, device_id: str) -> OneSignalResponse:
         """
@@ -487,7 +1164,7 @@ class Client(BaseClient):
         :param device_id: identifier Player's One Signal ID or email_auth_hash.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_view_device(device_id))
+        return self._request(self._kwargs_view_device, device_id)
 
     def add_device(self, device_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -497,7 +1174,7 @@ class Client(BaseClient):
         :param device_body: Device create request body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_add_device(device_body))
+        return self._request(self._kwargs_add_device, device_body)
 
     def edit_device(self, device_id: str, device_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -508,7 +1185,7 @@ class Client(BaseClient):
         :param device_body: Device edit request body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_edit_device(device_id, device_body))
+        return self._request(self._kwargs_edit_device, device_id, device_body)
 
     def edit_tags(self, external_user_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -519,7 +1196,7 @@ class Client(BaseClient):
         :param body: {tags: {tag1: "new", tag2: ""}}
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_edit_tags(external_user_id, body))
+        return self._request(self._kwargs_edit_tags, external_user_id, body)
 
     def new_session(self, device_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -530,7 +1207,7 @@ class Client(BaseClient):
         :param body: Update body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_new_session(device_id, body))
+        return self._request(self._kwargs_new_session, device_id, body)
 
     def new_purchase(self, device_id: str, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -541,7 +1218,7 @@ class Client(BaseClient):
         :param body: Update body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_new_purchase(device_id, body))
+        return self._request(self._kwargs_new_purchase, device_id, body)
 
     def csv_export(self, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -551,7 +1228,50 @@ class Client(BaseClient):
         :param body: Post body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_csv_export(body))
+        return self._request(self._kwargs_csv_export, body)
+
+    def csv_export_stream(self,
+                          body: Dict[str, Any],
+                          poll_interval: float = EXPORT_POLL_INTERVAL,
+                          timeout: float = EXPORT_TIMEOUT,
+                          spool: Union[bool, str, PathLike] = False) -> Iterator[Dict[str, str]]:
+        """
+        Generate a CSV export with `csv_export`, wait until it is ready and stream its rows.
+        The gzipped file is decompressed and parsed while it is downloaded, so it is never held in memory.
+
+        :param body: Post body of `csv_export`.
+        :param poll_interval: Seconds to wait before checking the file again, doubled after each check.
+        :param timeout: Seconds to wait for the file to be ready before raising TimeoutError.
+        :param spool: Download the whole file to disk before parsing it, to a temporary file or to the given path.
+        :return: Iterator of players, as dicts keyed by CSV column names.
+        """
+        response = self.csv_export(body)
+        rows = iter_remote_csv(self.http_client, response.body['csv_file_url'], poll_interval,
+                               EXPORT_POLL_MAX_INTERVAL, timeout, spool)
+        yield from iter_records(rows)
+
+    def csv_export_columns(self,
+                           body: Dict[str, Any],
+                           output: str = 'arrow',
+                           poll_interval: float = EXPORT_POLL_INTERVAL,
+                           timeout: float = EXPORT_TIMEOUT,
+                           spool: Union[bool, str, PathLike] = False) -> Any:
+        """
+        Generate a CSV export with `csv_export` and load it into column oriented buffers as it is downloaded.
+        Rows go straight from the CSV parser into the columns, no dict is built per player.
+
+        :param body: Post body of `csv_export`.
+        :param output: `arrow` for a pyarrow Table, `numpy` for NumPy arrays or `python` for a dict of lists.
+        :param poll_interval: Seconds to wait before checking the file again, doubled after each check.
+        :param timeout: Seconds to wait for the file to be ready before raising TimeoutError.
+        :param spool: Download the whole file to disk before parsing it, to a temporary file or to the given path.
+        :return: Players in the requested output format, see `ColumnBuilder`.
+        """
+        check_output(output)
+        response = self.csv_export(body)
+        rows = iter_remote_csv(self.http_client, response.body['csv_file_url'], poll_interval,
+                               EXPORT_POLL_MAX_INTERVAL, timeout, spool)
+        return ColumnBuilder().extend_rows(rows).to(output)
 
     def create_segment(self, body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -561,7 +1281,7 @@ class Client(BaseClient):
         :param body: Post body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_create_segments(body))
+        return self._request(self._kwargs_create_segments, body)
 
     def delete_segment(self, segment_id: str) -> OneSignalResponse:
         """
@@ -571,7 +1291,7 @@ class Client(BaseClient):
         :param segment_id: Id of segment to be deleted.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_delete_segments(segment_id))
+        return self._request(self._kwargs_delete_segments, segment_id)
 
     def view_outcomes(self, outcome_names: List[str], extra_params: Dict[str, Any] = None) -> OneSignalResponse:
         """
@@ -582,7 +1302,7 @@ class Client(BaseClient):
         :param extra_params: Extra path/query parameters such as outcome_time_range, outcome_attribution...
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_view_outcomes(outcome_names, extra_params))
+        return self._request(self._kwargs_view_outcomes, outcome_names, extra_params)
 
     def view_apps(self) -> OneSignalResponse:
         """
@@ -592,7 +1312,7 @@ class Client(BaseClient):
 
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_view_apps())
+        return self._request(self._kwargs_view_apps)
 
     def view_app(self, app_id: str) -> OneSignalResponse:
         """
@@ -603,7 +1323,7 @@ class Client(BaseClient):
         :param app_id: Application id.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_view_app(app_id))
+        return self._request(self._kwargs_view_app, app_id)
 
     def create_app(self, app_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -613,7 +1333,7 @@ class Client(BaseClient):
         :param app_body: App create body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_create_app(app_body))
+        return self._request(self._kwargs_create_app, app_body)
 
     def update_app(self, app_id: str, app_body: Dict[str, Any]) -> OneSignalResponse:
         """
@@ -624,4 +1344,4 @@ class Client(BaseClient):
         :param app_body: App update body.
         :return: Http response of One Signal server.
         """
-        return basic_auth_request(**self._kwargs_update_app(app_id, app_body))
+        return self._request(self._kwargs_update_app, app_id, app_body)
@@ -0,0 +1,107 @@
+import json
+import math
+from typing import Any, Callable, Dict, Union
+
+from .constants import CODEC_PREFERENCE
+
+
+class JSONCodec:
+    """
+    Serialises request payloads to bytes and parses response bodies.
+    `dumps` must return UTF-8 encoded JSON bytes, `loads` must accept bytes.
+    """
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f'<JSONCodec {self.name}>'
+
+
+_codecs: Dict[str, JSONCodec] = {}
+
+
+def register_codec(codec: JSONCodec) -> None:
+    """Register a codec, so it can be selected by name with the `JSON_CODEC` client option."""
+    _codecs[codec.name] = codec
+
+
+def get_codec(codec: Union[str, JSONCodec] = None) -> JSONCodec:
+    """
+    Get a registered codec by name. If no codec is given, the fastest available one is returned, preferring orjson,
+    then ujson, and falling back to the standard library.
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is not None:
+        try:
+            return _codecs[codec]
+        except KeyError:
+            raise ValueError(f'Unknown JSON codec {codec}, registered codecs are {", ".join(_codecs)}.') from None
+    return next(_codecs[name] for name in CODEC_PREFERENCE if name in _codecs)
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _non_finite(obj: Any) -> bool:
+    """Whether a payload holds a NaN or infinite float, in a value or a key."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_non_finite(key) or _non_finite(value) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return any(_non_finite(item) for item in obj)
+    return False
+
+
+def _falling_back(dumps: Callable[[Any], bytes]) -> Callable[[Any], bytes]:
+    """
+    Serialise with `dumps`, or with the standard library for payloads it rejects, so installing a faster codec never
+    breaks a payload which worked before.
+    """
+
+    def falling_back_dumps(obj: Any) -> bytes:
+        try:
+            return dumps(obj)
+        except (TypeError, OverflowError):
+            return _stdlib_dumps(obj)
+    return falling_back_dumps
+
+
+register_codec(JSONCodec('json', _stdlib_dumps, json.loads))
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    # Non-string keys such as ints are turned into strings, as the standard library does. Datetimes, dataclasses and
+    # subclasses of builtin types are passed through to the standard library, which rejects or serialises them.
+    _ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                       | orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+    def _orjson_dumps(obj: Any) -> bytes:
+        data = orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        # orjson writes NaN and infinities as null, where the standard library writes NaN and Infinity.
+        if b'null' in data and _non_finite(obj):
+            return _stdlib_dumps(obj)
+        return data
+
+    register_codec(JSONCodec('orjson', _falling_back(_orjson_dumps), orjson.loads))
+
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+    # ujson before 2.0 rounds floats, so it is only used from 2.0 on. Forward slashes are not escaped, as the standard
+    # library does not escape them either.
+    def _ujson_dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+    if int(ujson.__version__.split('.')[0]) >= 2:
+        register_codec(JSONCodec('ujson', _falling_back(_ujson_dumps), ujson.loads))
@@ -0,0 +1,298 @@
+import json
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List
+
+from .constants import (
+    CATEGORICAL_DEVICE_COLUMNS, DEVICE_TIMESTAMP_FORMATS, NUMERIC_DEVICE_COLUMNS,
+    TIMESTAMP_DEVICE_COLUMNS,
+)
+from .optional import import_optional
+
+OUTPUT_FORMATS = ('python', 'numpy', 'arrow')
+
+
+# Code of missing values in dictionary encoded columns.
+MISSING_CODE = -1
+
+
+def _missing(value: Any) -> bool:
+    """Whether a value is missing, absent from a record or an empty csv field."""
+    return value is None or value == ''
+
+
+class _CategoricalColumn:
+    """
+    Dictionary encoded column: distinct values are stored once, rows hold 4 byte indices into them. Missing values are
+    not a category, their rows hold `MISSING_CODE`.
+    """
+
+    def __init__(self):
+        self.codes = array('i')
+        self.categories = []
+        self.missing = 0
+        self._index = {}
+
+    def append(self, value: Any) -> None:
+        if _missing(value):
+            self.codes.append(MISSING_CODE)
+            self.missing += 1
+            return
+        if isinstance(value, (dict, list)):
+            # Tags of `view_devices` records are dicts, encode them the same way csv exports do.
+            value = json.dumps(value, sort_keys=True)
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.categories)
+            self.categories.append(value)
+        self.codes.append(code)
+
+    def to_list(self) -> List[Any]:
+        return [self.categories[code] if code != MISSING_CODE else None for code in self.codes]
+
+
+class _NumericColumn:
+    """Column of floats stored in a packed array, missing values are stored as NaN and malformed ones raise."""
+
+    kind = 'number'
+
+    def __init__(self, column: str):
+        self.column = column
+        self.values = array('d')
+        self.missing = 0
+
+    def append(self, value: Any) -> None:
+        if _missing(value):
+            self.values.append(float('nan'))
+            self.missing += 1
+            return
+        try:
+            self.values.append(self.coerce(value))
+        except (TypeError, ValueError):
+            raise ValueError(f'Malformed {self.kind} {value!r} in column {self.column}, '
+                             f'row {len(self.values)}.') from None
+
+    @staticmethod
+    def coerce(value: Any) -> float:
+        return float(value)
+
+    def to_list(self) -> List[float]:
+        return self.values.tolist()
+
+
+class _TimestampColumn(_NumericColumn):
+    """Column of unix timestamps in seconds, given as numbers or as UTC date strings such as those of csv exports."""
+
+    kind = 'timestamp'
+
+    @staticmethod
+    def coerce(value: Any) -> float:
+        try:
+            return float(value)
+        except ValueError:
+            return _parse_timestamp(value)
+
+
+class _ObjectColumn:
+    """Column of arbitrary values, for high cardinality fields such as ids."""
+
+    def __init__(self):
+        self.values = []
+
+    def append(self, value: Any) -> None:
+        self.values.append(value)
+
+    def to_list(self) -> List[Any]:
+        return list(self.values)
+
+
+class ColumnBuilder:
+    """
+    Accumulates device records into column oriented buffers instead of a list of dicts.
+    Low cardinality columns such as `device_type`, `language` and `tags` are dictionary encoded, numeric columns such
+    as `session_count` are stored in packed float arrays, and timestamp columns such as `last_active` as unix seconds
+    in packed float arrays. Missing values, absent from records or empty in csv rows, are nulls of NumPy and pyarrow
+    outputs, or NaN where NumPy has no null. Malformed numbers and timestamps raise ValueError. Finished
+    columns can be exported as Python lists, NumPy arrays or a pyarrow Table. Unless given explicitly, columns are
+    taken from the header row, or from the keys of records as they appear, with None for earlier records.
+    NumPy and pyarrow outputs share memory with the builder, rows can not be appended after exporting them.
+    """
+
+    def __init__(self,
+                 columns: List[str] = None,
+                 categorical: Iterable[str] = CATEGORICAL_DEVICE_COLUMNS,
+                 numeric: Iterable[str] = NUMERIC_DEVICE_COLUMNS,
+                 timestamp: Iterable[str] = TIMESTAMP_DEVICE_COLUMNS):
+        self.categorical = frozenset(categorical)
+        self.numeric = frozenset(numeric)
+        self.timestamp = frozenset(timestamp)
+        self.columns = []
+        self._buffers = []
+        self._known = set()
+        self._fixed = False
+        self.num_rows = 0
+        if columns is not None:
+            self._set_columns(columns)
+
+    def _set_columns(self, columns: List[str]) -> None:
+        for column in columns:
+            self._add_column(column)
+        self._fixed = True
+
+    def _add_column(self, column: str) -> None:
+        buffer = self._new_buffer(column)
+        # Rows appended before the column showed up have no value for it.
+        for _ in range(self.num_rows):
+            buffer.append(None)
+        self.columns.append(column)
+        self._buffers.append(buffer)
+        self._known.add(column)
+
+    def _new_buffer(self, column: str):
+        if column in self.categorical:
+            return _CategoricalColumn()
+        if column in self.timestamp:
+            return _TimestampColumn(column)
+        if column in self.numeric:
+            return _NumericColumn(column)
+        return _ObjectColumn()
+
+    def append_row(self, row: List[Any]) -> None:
+        """Append a row with values in column order, such as a CSV row."""
+        for buffer, value in zip(self._buffers, row):
+            buffer.append(value)
+        # Short rows are padded, so all columns keep the same length.
+        for buffer in self._buffers[len(row):]:
+            buffer.append(None)
+        self.num_rows += 1
+
+    def append_record(self, record: Dict[str, Any]) -> None:
+        """Append a record keyed by column names, such as a device of `view_devices`."""
+        if not self._fixed:
+            for column in record:
+                if column not in self._known:
+                    self._add_column(column)
+        for column, buffer in zip(self.columns, self._buffers):
+            buffer.append(record.get(column))
+        self.num_rows += 1
+
+    def extend_rows(self, rows: Iterable[List[Any]], header: bool = True) -> 'ColumnBuilder':
+        """Append CSV rows. If `header` is True, the first row names the columns."""
+        rows = iter(rows)
+        if header:
+            first = next(rows, None)
+            if first is not None and not self.columns:
+                self._set_columns(first)
+        for row in rows:
+            self.append_row(row)
+        return self
+
+    def extend_records(self, records: Iterable[Dict[str, Any]]) -> 'ColumnBuilder':
+        for record in records:
+            self.append_record(record)
+        return self
+
+    def to_python(self) -> Dict[str, List[Any]]:
+        """Columns as a dict of lists."""
+        return {column: buffer.to_list() for column, buffer in zip(self.columns, self._buffers)}
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        Columns as a NumPy structured array. Dictionary encoded columns hold integer codes, `MISSING_CODE` for missing
+        values, their distinct values are returned in the `categories` dict. Timestamps are `datetime64[s]`, NaT when
+        missing, and missing numbers are NaN. Returns `{'data': structured_array, 'categories': {column: values}}`.
+        Requires numpy.
+        """
+        np = import_optional('numpy', 'numpy')
+        fields = []
+        for column, buffer in zip(self.columns, self._buffers):
+            if isinstance(buffer, _CategoricalColumn):
+                fields.append((column, np.frombuffer(buffer.codes, dtype=np.int32)))
+            elif isinstance(buffer, _TimestampColumn):
+                seconds = np.frombuffer(buffer.values, dtype=np.float64)
+                missing = np.isnan(seconds)
+                timestamps = np.where(missing, 0, seconds).astype(np.int64).astype('datetime64[s]')
+                timestamps[missing] = np.datetime64('NaT')
+                fields.append((column, timestamps))
+            elif isinstance(buffer, _NumericColumn):
+                fields.append((column, np.frombuffer(buffer.values, dtype=np.float64)))
+            else:
+                values = np.empty(len(buffer.values), dtype=object)
+                values[:] = buffer.values
+                fields.append((column, values))
+
+        data = np.empty(self.num_rows, dtype=[(column, values.dtype) for column, values in fields])
+        for column, values in fields:
+            data[column] = values
+        categories = {
+            column: np.array(buffer.categories, dtype=object)
+            for column, buffer in zip(self.columns, self._buffers) if isinstance(buffer, _CategoricalColumn)
+        }
+        return {'data': data, 'categories': categories}
+
+    def to_arrow(self) -> Any:
+        """
+        Columns as a pyarrow Table, with dictionary encoded columns as dictionary arrays and timestamps as UTC
+        `timestamp('s')` arrays. Missing values are nulls. Requires pyarrow.
+        """
+        pa = import_optional('pyarrow', 'arrow')
+        pc = import_optional('pyarrow.compute', 'arrow')
+        arrays = []
+        for buffer in self._buffers:
+            if isinstance(buffer, _CategoricalColumn):
+                dictionary = pa.array([_to_str(value) for value in buffer.categories], type=pa.string())
+                indices = _wrap(pa, pa.int32(), buffer.codes, buffer.missing,
+                                lambda codes: pc.not_equal(codes, MISSING_CODE))
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            elif isinstance(buffer, _NumericColumn):
+                values = _wrap(pa, pa.float64(), buffer.values, buffer.missing,
+                               lambda values: pc.invert(pc.is_nan(values)))
+                if isinstance(buffer, _TimestampColumn):
+                    values = pc.cast(values, pa.int64(), safe=False).cast(pa.timestamp('s', tz='UTC'))
+                arrays.append(values)
+            else:
+                arrays.append(pa.array(buffer.values))
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+    def to(self, output: str) -> Any:
+        """Export columns in one of `OUTPUT_FORMATS`."""
+        check_output(output)
+        return getattr(self, f'to_{output}')()
+
+
+def check_output(output: str) -> None:
+    """Raise ValueError for an unknown output format, before any data is fetched for it."""
+    if output not in OUTPUT_FORMATS:
+        raise ValueError(f'Unknown output format {output}, expected one of {", ".join(OUTPUT_FORMATS)}.')
+
+
+def _wrap(pa: Any, arrow_type: Any, values: array, missing: int, valid: Callable[[Any], Any]) -> Any:
+    """
+    Arrow array of a packed array, wrapped without copying it. If values are missing, their rows are made null with
+    the boolean array `valid` returns for the array wrapped without nulls.
+    """
+    buffer = pa.py_buffer(values)
+    wrapped = pa.Array.from_buffers(arrow_type, len(values), [None, buffer])
+    if not missing:
+        return wrapped
+    validity = valid(wrapped).buffers()[1]
+    return pa.Array.from_buffers(arrow_type, len(values), [validity, buffer], null_count=missing)
+
+
+def _to_str(value: Any) -> Any:
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def _parse_timestamp(value: str) -> float:
+    """Unix seconds of a UTC date string, such as `2020-01-01 00:00:00 UTC`."""
+    text = value.strip()
+    for suffix in (' UTC', 'Z'):
+        if text.endswith(suffix):
+            text = text[:-len(suffix)]
+            break
+    for timestamp_format in DEVICE_TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, timestamp_format).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(value)
@@ -0,0 +1,97 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Awaitable, Callable, Iterable, Iterator, List, Tuple, Type
+
+import httpx
+
+from .error import OneSignalHTTPError
+
+# Errors of a single call, returned in place of its result by default: error responses and transport errors such as
+# timeouts or dropped connections.
+REQUEST_ERRORS = (OneSignalHTTPError, httpx.HTTPError)
+
+
+async def gather_bounded(func: Callable[[Any], Awaitable[Any]],
+                         items: Iterable[Any],
+                         concurrency: int,
+                         catch: Tuple[Type[BaseException], ...] = REQUEST_ERRORS) -> List[Any]:
+    """
+    Await `func(item)` for every item with at most `concurrency` calls in flight.
+    Results are returned in input order. Exceptions listed in `catch` are returned in place of the result
+    instead of aborting the whole batch.
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1.')
+
+    items = list(items)
+    results = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def worker():
+        # Workers share one iterator, so each item is picked up by exactly one of them.
+        for index, item in pending:
+            try:
+                results[index] = await func(item)
+            except catch as e:
+                results[index] = e
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(items)))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        raise
+    return results
+
+
+def map_bounded(func: Callable[[Any], Any],
+                items: Iterable[Any],
+                max_workers: int,
+                catch: Tuple[Type[BaseException], ...] = REQUEST_ERRORS,
+                ordered: bool = True) -> Iterator[Any]:
+    """
+    Call `func(item)` for every item on a pool of `max_workers` threads.
+    Results are yielded lazily in input order, as soon as they are ready. Items are consumed from `items` only as
+    workers free up, so arbitrarily large iterables can be processed. Exceptions listed in `catch` are yielded in place
+    of the result instead of stopping the iteration. If `ordered` is False, `(index, result)` pairs are yielded as
+    calls complete instead, so a slow call does not hold back the results of the calls after it.
+    Arguments are checked right away, calls start with the iteration.
+    """
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1.')
+    return _map_bounded(func, items, max_workers, catch, ordered)
+
+
+def _map_bounded(func: Callable[[Any], Any],
+                 items: Iterable[Any],
+                 max_workers: int,
+                 catch: Tuple[Type[BaseException], ...],
+                 ordered: bool) -> Iterator[Any]:
+    def call(item):
+        try:
+            return func(item)
+        except catch as e:
+            return e
+
+    items = enumerate(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Keep a few more calls queued than workers, so no worker waits for the consumer.
+        window = {executor.submit(call, item): index for index, item in islice(items, max_workers * 2)}
+        try:
+            while window:
+                if ordered:
+                    # Dicts keep insertion order, so the first future belongs to the earliest pending item.
+                    done = [next(iter(window))]
+                else:
+                    done, _ = wait(window, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = window.pop(future)
+                    result = future.result()
+                    for next_index, item in islice(items, 1):
+                        window[executor.submit(call, item)] = next_index
+                    yield result if ordered else (index, result)
+        finally:
+            for future in window:
+                future.cancel()
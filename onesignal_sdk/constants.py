@@ -13,3 +13,126 @@ SEGMENT_PATH = '/apps/{app_id}/segments/{segment_id}'
 VIEW_OUTCOMES_PATH = '/apps/{app_id}/outcomes'
 APPS_PATH = '/apps'
 APP_PATH = '/apps/{app_id}'
+ENDPOINT_PATHS = (
+    NOTIFICATIONS_PATH, NOTIFICATION_PATH, NOTIFICATION_HISTORY_PATH, DEVICES_PATH, DEVICE_PATH, EDIT_TAGS_PATH,
+    NEW_SESSION_PATH, NEW_PURCHASE_PATH, CSV_EXPORT_PATH, SEGMENTS_PATH, SEGMENT_PATH, VIEW_OUTCOMES_PATH, APPS_PATH,
+    APP_PATH,
+)
+# Paths whose `app_id` is always the app of the client, compiled with it.
+APP_SCOPED_PATHS = (EDIT_TAGS_PATH, SEGMENTS_PATH, SEGMENT_PATH, VIEW_OUTCOMES_PATH)
+# Client methods making a single request to an endpoint, the only methods `Client.map` and registry broadcasts call.
+ENDPOINT_METHODS = frozenset((
+    'send_notification', 'cancel_notification', 'view_notification', 'view_notifications', 'notification_history',
+    'view_device', 'view_devices', 'add_device', 'edit_device', 'edit_tags', 'new_session', 'new_purchase',
+    'csv_export', 'create_segment', 'delete_segment', 'view_outcomes', 'view_apps', 'view_app', 'create_app',
+    'update_app',
+))
+
+# Connection pool defaults, can be overridden with client options.
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 5.0
+
+# Default number of requests in flight for bulk operations.
+DEFAULT_CONCURRENCY = 10
+
+# OneSignal accepts at most this many targets per notification request, larger audiences are split into chunks.
+MAX_NOTIFICATION_TARGETS = 2000
+NOTIFICATION_TARGET_FIELDS = ('include_player_ids', 'include_external_user_ids')
+# Notification body fields used by OneSignal to deduplicate create notification requests.
+IDEMPOTENCY_KEY_FIELDS = ('idempotency_key', 'external_id')
+
+# Endpoint families sharing a rate limit, by endpoint path. `edit_tags` updates a player, so it is a players endpoint.
+ENDPOINT_FAMILIES = {
+    NOTIFICATIONS_PATH: 'notifications',
+    NOTIFICATION_PATH: 'notifications',
+    NOTIFICATION_HISTORY_PATH: 'notifications',
+    DEVICES_PATH: 'players',
+    DEVICE_PATH: 'players',
+    EDIT_TAGS_PATH: 'players',
+    NEW_SESSION_PATH: 'players',
+    NEW_PURCHASE_PATH: 'players',
+    CSV_EXPORT_PATH: 'players',
+    SEGMENTS_PATH: 'segments',
+    SEGMENT_PATH: 'segments',
+    VIEW_OUTCOMES_PATH: 'outcomes',
+    APPS_PATH: 'apps',
+    APP_PATH: 'apps',
+}
+# Seconds to pause a rate limited endpoint family when OneSignal does not say how long to wait.
+DEFAULT_RETRY_AFTER = 1.0
+MAX_THROTTLED_RETRIES = 3
+
+# Maximum page sizes of paginated endpoints.
+DEVICES_PAGE_SIZE = 300
+NOTIFICATIONS_PAGE_SIZE = 50
+
+# JSON codecs in order of preference, the first available one is used by default.
+CODEC_PREFERENCE = ('orjson', 'ujson', 'json')
+
+# Polling and download of files generated asynchronously by OneSignal, such as csv exports.
+EXPORT_POLL_INTERVAL = 2.0
+EXPORT_POLL_MAX_INTERVAL = 30.0
+EXPORT_TIMEOUT = 900.0
+EXPORT_CHUNK_SIZE = 64 * 1024
+# Chunks downloaded ahead of the parser by async downloads.
+EXPORT_PREFETCH_CHUNKS = 16
+# Storage responds with these until the file is generated.
+EXPORT_NOT_READY_STATUSES = (403, 404)
+# Column of player ids in the files of `notification_history`.
+NOTIFICATION_HISTORY_COLUMN = 'player_id'
+
+# Device columns stored dictionary encoded, as floats and as unix timestamps by column oriented outputs, other columns
+# are kept as is. Timestamps are unix seconds in `view_devices` and UTC date strings in csv exports.
+CATEGORICAL_DEVICE_COLUMNS = (
+    'device_type', 'language', 'timezone', 'country', 'device_os', 'device_model', 'sdk', 'game_version',
+    'app_version', 'tags',
+)
+NUMERIC_DEVICE_COLUMNS = ('session_count', 'amount_spent', 'badge_count', 'playtime')
+TIMESTAMP_DEVICE_COLUMNS = ('last_active', 'created_at')
+DEVICE_TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S.%f')
+
+# Response cache defaults: seconds responses of each read-only endpoint are cached for, and cache size limits.
+CACHE_TTLS = {
+    'view_app': 300.0,
+    'view_apps': 300.0,
+    'view_device': 30.0,
+    'view_notification': 10.0,
+    'view_outcomes': 60.0,
+}
+CACHE_MAX_ENTRIES = 1024
+CACHE_MAX_BYTES = 16 * 1024 * 1024
+# Approximate bytes taken by a cache entry besides the response body.
+CACHE_ENTRY_OVERHEAD = 512
+
+# Write-behind batching of tag and device updates: flush interval in seconds and number of pending users/devices.
+BATCH_FLUSH_INTERVAL = 1.0
+BATCH_MAX_PENDING = 1000
+
+# Number of auth tokens whose request headers are kept prebuilt.
+AUTH_HEADERS_CACHE_SIZE = 64
+
+# Connection pool monitoring: number of recent pool waits kept for percentiles, and seconds of wait deemed saturation.
+POOL_WAIT_WINDOW = 1000
+POOL_WAIT_THRESHOLD = 0.1
+
+# Send queue defaults: queued notifications before producers are pushed back, attempts per notification, retry backoff
+# in seconds, and the longest a worker sleeps before checking the spool again.
+SEND_QUEUE_MAX_PENDING = 10000
+SEND_QUEUE_MAX_ATTEMPTS = 5
+SEND_QUEUE_BACKOFF_BASE = 1.0
+SEND_QUEUE_BACKOFF_MAX = 300.0
+SEND_QUEUE_POLL_INTERVAL = 1.0
+
+# Seconds outcome totals of each `outcome_time_range` are reused by outcome aggregators. Totals of long ranges barely
+# move between refreshes, the last hour is always fetched.
+OUTCOME_WINDOW_TTLS = {
+    '1h': 0,
+    '1d': 300,
+    '30d': 3600,
+}
+
+# Delivery tracking: bounds of the seconds between polls of a notification, and the backoff when delivery stalls.
+DELIVERY_POLL_MIN_INTERVAL = 1.0
+DELIVERY_POLL_MAX_INTERVAL = 60.0
+DELIVERY_POLL_BACKOFF = 2.0
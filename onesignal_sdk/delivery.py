@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from .constants import (
+    DEFAULT_CONCURRENCY, DELIVERY_POLL_BACKOFF, DELIVERY_POLL_MAX_INTERVAL,
+    DELIVERY_POLL_MIN_INTERVAL,
+)
+from .error import OneSignalHTTPError
+
+# Delivery stats of notifications summed up by `DeliveryProgress`.
+_COUNTS = ('successful', 'failed', 'errored', 'converted', 'remaining')
+
+
+def _complete(notification: Dict[str, Any]) -> bool:
+    return bool(notification.get('canceled') or notification.get('completed_at'))
+
+
+def _delivered(notification: Dict[str, Any]) -> int:
+    return sum(notification.get(name) or 0 for name in ('successful', 'failed', 'errored'))
+
+
+def _transient(error: Exception) -> bool:
+    """Whether polling a notification again may succeed after an error."""
+    if isinstance(error, OneSignalHTTPError):
+        return error.status_code >= 500 or error.status_code == 429
+    return isinstance(error, httpx.HTTPError)
+
+
+class DeliveryProgress:
+    """
+    Delivery stats summed over the notifications of a `DeliveryTracker`, returned by `progress()`.
+
+    `tracked` counts every registered notification, `completed` those which completed or were canceled and `errors`
+    those whose polling failed. Counts such as `successful` and `remaining` are summed from the last poll of each
+    notification, notifications which were not polled yet are not counted.
+    """
+
+    def __init__(self, notifications: Iterable[Optional[Dict[str, Any]]], tracked: int, completed: int, errors: int):
+        self.tracked = tracked
+        self.completed = completed
+        self.errors = errors
+        for name in _COUNTS:
+            setattr(self, name, 0)
+        for notification in notifications:
+            if notification is not None:
+                for name in _COUNTS:
+                    setattr(self, name, getattr(self, name) + (notification.get(name) or 0))
+
+    def __repr__(self) -> str:
+        return (f'<DeliveryProgress completed={self.completed}/{self.tracked} successful={self.successful} '
+                f'remaining={self.remaining}>')
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class _Tracked:
+    """A tracked notification: its completion future, last poll and polling interval."""
+
+    __slots__ = ('id', 'future', 'notification', 'interval', 'polled_at', 'delivered', 'polls')
+
+    def __init__(self, notification_id: str, future: 'asyncio.Future', interval: float):
+        self.id = notification_id
+        self.future = future
+        self.notification: Optional[Dict[str, Any]] = None
+        self.interval = interval
+        self.polled_at: Optional[float] = None
+        self.delivered = 0
+        self.polls = 0
+
+
+class DeliveryTracker:
+    """
+    Watches the delivery of sent notifications of an `AsyncClient` with `view_notification`, until they complete or
+    are canceled. Replaces a polling loop per notification with a single schedule polled by at most `concurrency`
+    workers.
+
+    `track()` registers a notification id and returns a future of the notification as of its completion. Polls back off
+    as `remaining` approaches zero: the interval grows from `min_interval` to `max_interval` seconds with the share of
+    recipients already delivered, and while delivery stalls it is multiplied by `backoff`, up to `max_interval`.
+    `progress()` sums the delivery stats of all notifications. Polls which fail with a 4xx error, or unexpectedly such
+    as with a malformed response, fail the future, transient errors are polled again later. Notifications are
+    forgotten once their future is done, their stats are kept in `progress()` and tracking them again starts anew.
+
+    The scheduler and workers are started with the first notification, in the running event loop. Call
+    `await aclose()`, or use the tracker as an async context manager, to stop them.
+    """
+
+    def __init__(self,
+                 client: Any,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 min_interval: float = DELIVERY_POLL_MIN_INTERVAL,
+                 max_interval: float = DELIVERY_POLL_MAX_INTERVAL,
+                 backoff: float = DELIVERY_POLL_BACKOFF):
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1.')
+        self.client = client
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.polls = 0
+        self._tracked: Dict[str, _Tracked] = {}
+        # Stats of notifications which were forgotten once their future was done.
+        self._finished = dict.fromkeys(_COUNTS, 0)
+        self._finished_tracked = self._finished_completed = self._finished_errors = 0
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._closed = False
+        # Created on first use, so they belong to the running event loop.
+        self._queue = None
+        self._wakeup = None
+        self._tasks: List['asyncio.Future'] = []
+
+    async def __aenter__(self) -> 'DeliveryTracker':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def __len__(self) -> int:
+        """Number of notifications which did not complete yet."""
+        return sum(1 for tracked in self._tracked.values() if not tracked.future.done())
+
+    def track(self, notification_id: str, delay: float = None) -> 'asyncio.Future':
+        """
+        Start watching a notification, polling it first after `delay` seconds, `min_interval` by default.
+        :return: Future of the notification once it completed or was canceled.
+        """
+        if self._closed:
+            raise RuntimeError('Tracker is closed.')
+        tracked = self._tracked.get(notification_id)
+        if tracked is not None:
+            return tracked.future
+        self._start()
+        future = asyncio.get_event_loop().create_future()
+        tracked = self._tracked[notification_id] = _Tracked(notification_id, future, self.min_interval)
+        future.add_done_callback(lambda _: self._forget(tracked))
+        self._schedule_poll(tracked, self.min_interval if delay is None else delay)
+        return future
+
+    async def join(self) -> None:
+        """Wait until every tracked notification completed or failed."""
+        futures = [tracked.future for tracked in self._tracked.values()]
+        if futures:
+            await asyncio.wait(futures)
+
+    def progress(self) -> DeliveryProgress:
+        """Delivery stats summed over all tracked notifications."""
+        tracked = list(self._tracked.values())
+        finished = [entry.future for entry in tracked if entry.future.done() and not entry.future.cancelled()]
+        errors = sum(1 for future in finished if future.exception() is not None)
+        completed = len(finished) - errors
+        return DeliveryProgress([self._finished, *(entry.notification for entry in tracked)],
+                                self._finished_tracked + len(tracked), self._finished_completed + completed,
+                                self._finished_errors + errors)
+
+    async def aclose(self) -> None:
+        """Stop polling. Futures of notifications which did not complete are canceled."""
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        for tracked in list(self._tracked.values()):
+            tracked.future.cancel()
+
+    def _start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._run())]
+        self._tasks.extend(asyncio.ensure_future(self._work()) for _ in range(self.concurrency))
+
+    def _forget(self, tracked: _Tracked) -> None:
+        """Drop a notification whose future is done, adding its stats to those of finished notifications."""
+        if self._tracked.get(tracked.id) is not tracked:
+            return
+        del self._tracked[tracked.id]
+        self._finished_tracked += 1
+        if not tracked.future.cancelled():
+            if tracked.future.exception() is None:
+                self._finished_completed += 1
+            else:
+                self._finished_errors += 1
+        for name in _COUNTS:
+            self._finished[name] += (tracked.notification or {}).get(name) or 0
+
+    def _schedule_poll(self, tracked: _Tracked, delay: float) -> None:
+        due = time.monotonic() + delay
+        if not self._schedule or due < self._schedule[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._schedule, (due, next(self._sequence), tracked.id))
+
+    async def _run(self) -> None:
+        """Hand due polls over to the workers, sleeping until the next one is due or a sooner one is scheduled."""
+        while True:
+            now = time.monotonic()
+            while self._schedule and self._schedule[0][0] <= now:
+                self._queue.put_nowait(heapq.heappop(self._schedule)[2])
+            timeout = self._schedule[0][0] - now if self._schedule else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self) -> None:
+        while True:
+            tracked = self._tracked.get(await self._queue.get())
+            if tracked is None or tracked.future.done():
+                # Canceled by its owner.
+                continue
+            try:
+                response = await self.client.view_notification(tracked.id)
+                self._update(tracked, response.body)
+            except (OneSignalHTTPError, httpx.HTTPError) as e:
+                if _transient(e):
+                    tracked.interval = min(tracked.interval * self.backoff, self.max_interval)
+                    self._schedule_poll(tracked, tracked.interval)
+                elif not tracked.future.done():
+                    tracked.future.set_exception(e)
+            except Exception as e:
+                # Such as a malformed response, polling again would fail the same way.
+                if not tracked.future.done():
+                    tracked.future.set_exception(e)
+            finally:
+                self.polls += 1
+                tracked.polls += 1
+
+    def _update(self, tracked: _Tracked, notification: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        delivered = _delivered(notification)
+        remaining = notification.get('remaining') or 0
+        if tracked.polled_at is not None and delivered <= tracked.delivered:
+            # Delivery stalled.
+            interval = tracked.interval * self.backoff
+        else:
+            # Back off as remaining approaches zero.
+            share = delivered / (delivered + remaining) if delivered + remaining else 1.0
+            interval = self.min_interval + (self.max_interval - self.min_interval) * share
+        tracked.notification = notification
+        tracked.polled_at, tracked.delivered = now, delivered
+        tracked.interval = min(max(interval, self.min_interval), self.max_interval)
+        if _complete(notification):
+            if not tracked.future.done():
+                tracked.future.set_result(notification)
+        else:
+            self._schedule_poll(tracked, tracked.interval)
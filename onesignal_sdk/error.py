@@ -8,12 +8,30 @@ class OneSignalHTTPError(Exception):
 
     def __init__(self, response: httpx.Response):
         self.http_response = response
-        self.message = self._get_message(response)
         self.status_code = response.status_code
+        self._message = None
+
+    @property
+    def message(self) -> str:
+        """Error message sent by OneSignal, the response body is decoded on first access."""
+        if self._message is None:
+            self._message = self._get_message(self.http_response)
+        return self._message
 
     def _get_message(self, response: httpx.Response) -> str:
         message = f'Unexpected http status code {response.status_code}.'
-        response_body = response.json()
+        try:
+            response_body = response.json()
+        except ValueError:
+            # Errors of proxies and load balancers may not be JSON.
+            return message
         if response_body and 'errors' in response_body and len(response_body['errors']) > 0:
             message = response_body['errors'][0]
         return message
+
+
+class SendQueueFull(Exception):
+    """
+    Exception raised when a notification can not be queued because the send queue holds its maximum of pending
+    notifications.
+    """
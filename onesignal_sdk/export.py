@@ -0,0 +1,343 @@
+import asyncio
+import codecs
+import csv
+import tempfile
+import time
+import zlib
+from collections import deque
+from os import PathLike
+from typing import (
+    IO, AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, MutableSet, Union,
+)
+
+import httpx
+
+from .constants import (
+    EXPORT_CHUNK_SIZE, EXPORT_NOT_READY_STATUSES, EXPORT_PREFETCH_CHUNKS,
+)
+from .error import OneSignalHTTPError
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+Destination = Union[MutableSet[str], IO[str], str, PathLike]
+
+
+class _Lines:
+    """Iterator over a queue of lines which can be refilled after it is exhausted, used as csv.reader input."""
+
+    def __init__(self):
+        self.queue = deque()
+
+    def __iter__(self) -> '_Lines':
+        return self
+
+    def __next__(self) -> str:
+        if not self.queue:
+            raise StopIteration
+        return self.queue.popleft()
+
+
+class CSVRowParser:
+    """
+    Incremental CSV parser, fed with chunks of plain or gzip compressed bytes as they are downloaded.
+    Only complete records are handed to the csv reader, so a quoted field spanning several chunks is parsed correctly.
+    Memory use is bounded by the size of a single record.
+    """
+
+    def __init__(self):
+        self._head = b''
+        self._decompressor = None
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._partial_line = ''
+        self._record = []
+        self._record_quotes = 0
+        self._lines = _Lines()
+        self._reader = csv.reader(self._lines)
+
+    def feed(self, data: bytes) -> List[List[str]]:
+        """Parse a chunk of the file and return the rows completed by it."""
+        return self._parse(self._decoder.decode(self._decompress(data)))
+
+    def close(self) -> List[List[str]]:
+        """Parse the remaining data at the end of the file."""
+        text = ''
+        if self._head:
+            # File is shorter than the gzip magic number.
+            text = self._decoder.decode(self._head)
+        if self._decompressor is not None:
+            text += self._decoder.decode(self._decompressor.flush())
+        text += self._decoder.decode(b'', final=True)
+        rows = self._parse(text)
+        if self._partial_line:
+            self._add_line(self._partial_line)
+            self._partial_line = ''
+        if self._record:
+            self._lines.queue.append(''.join(self._record))
+            self._record = []
+        return rows + list(self._reader)
+
+    def _decompress(self, data: bytes) -> bytes:
+        if self._decompressor is None:
+            self._head += data
+            if len(self._head) < len(GZIP_MAGIC):
+                return b''
+            data, self._head = self._head, b''
+            if not data.startswith(GZIP_MAGIC):
+                self._decompressor = _Passthrough()
+                return data
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        decompressed = self._decompressor.decompress(data)
+        # Concatenated gzip members are valid gzip files too.
+        while self._decompressor.eof and self._decompressor.unused_data:
+            unused_data = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            decompressed += self._decompressor.decompress(unused_data)
+        return decompressed
+
+    def _parse(self, text: str) -> List[List[str]]:
+        lines = (self._partial_line + text).split('\n')
+        self._partial_line = lines.pop()
+        for line in lines:
+            self._add_line(line + '\n')
+        return list(self._reader)
+
+    def _add_line(self, line: str) -> None:
+        # Quotes are escaped by doubling them, so a record is complete when its quote count is even.
+        self._record.append(line)
+        self._record_quotes += line.count('"')
+        if self._record_quotes % 2 == 0:
+            self._lines.queue.append(''.join(self._record))
+            self._record = []
+            self._record_quotes = 0
+
+
+class _Passthrough:
+    """Stand-in for a decompressor, for files which are not compressed."""
+    eof = False
+    unused_data = b''
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b''
+
+
+def _open_spool(spool: Union[bool, str, PathLike]) -> BinaryIO:
+    if isinstance(spool, (str, PathLike)):
+        return open(spool, 'w+b')
+    return tempfile.TemporaryFile()
+
+
+def _is_ready(response: httpx.Response) -> bool:
+    """Return True if the remote file is ready, False if it is still being generated, raise otherwise."""
+    if response.status_code in EXPORT_NOT_READY_STATUSES:
+        return False
+    if response.status_code >= 300:
+        raise OneSignalHTTPError(response)
+    return True
+
+
+def iter_remote_csv(http_client: httpx.Client,
+                    url: str,
+                    poll_interval: float,
+                    poll_max_interval: float,
+                    timeout: float,
+                    spool: Union[bool, str, PathLike] = False) -> Iterator[List[str]]:
+    """
+    Download a CSV file which OneSignal generates asynchronously, and yield its rows as lists of strings.
+    The url is polled with exponential backoff until the file is ready, or `timeout` seconds have passed.
+    The file is parsed as it is downloaded, without holding it in memory. If `spool` is given, the file is downloaded
+    to disk first (to a temporary file, or to the path given) and parsed from there.
+    """
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+    while True:
+        with http_client.stream('GET', url) as response:
+            if response.status_code >= 300 and response.status_code not in EXPORT_NOT_READY_STATUSES:
+                response.read()
+            if _is_ready(response):
+                yield from _parse_download(response.iter_bytes(EXPORT_CHUNK_SIZE), spool)
+                return
+        if time.monotonic() + interval > deadline:
+            raise TimeoutError(f'{url} is not ready after {timeout} seconds.')
+        time.sleep(interval)
+        interval = min(poll_max_interval, interval * 2)
+
+
+def _parse_download(chunks: Iterator[bytes], spool: Union[bool, str, PathLike]) -> Iterator[List[str]]:
+    parser = CSVRowParser()
+    if spool:
+        with _open_spool(spool) as spool_file:
+            for chunk in chunks:
+                spool_file.write(chunk)
+            spool_file.seek(0)
+            for chunk in iter(lambda: spool_file.read(EXPORT_CHUNK_SIZE), b''):
+                yield from parser.feed(chunk)
+    else:
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_remote_csv(http_client: httpx.AsyncClient,
+                           url: str,
+                           poll_interval: float,
+                           poll_max_interval: float,
+                           timeout: float,
+                           spool: Union[bool, str, PathLike] = False) -> AsyncIterator[List[str]]:
+    """Async version of `iter_remote_csv`."""
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+    while True:
+        async with http_client.stream('GET', url) as response:
+            if response.status_code >= 300 and response.status_code not in EXPORT_NOT_READY_STATUSES:
+                await response.aread()
+            if _is_ready(response):
+                rows = _aparse_download(response, spool)
+                try:
+                    async for row in rows:
+                        yield row
+                finally:
+                    await rows.aclose()
+                return
+        if time.monotonic() + interval > deadline:
+            raise TimeoutError(f'{url} is not ready after {timeout} seconds.')
+        await asyncio.sleep(interval)
+        interval = min(poll_max_interval, interval * 2)
+
+
+async def _aparse_download(response: httpx.Response, spool: Union[bool, str, PathLike]) -> AsyncIterator[List[str]]:
+    parser = CSVRowParser()
+    if spool:
+        with _open_spool(spool) as spool_file:
+            async for chunk in response.aiter_bytes(EXPORT_CHUNK_SIZE):
+                spool_file.write(chunk)
+            spool_file.seek(0)
+            for chunk in iter(lambda: spool_file.read(EXPORT_CHUNK_SIZE), b''):
+                for row in parser.feed(chunk):
+                    yield row
+    else:
+        # Chunks are downloaded into a bounded queue while the parser works through them in a thread.
+        loop = asyncio.get_event_loop()
+        chunks = asyncio.Queue(EXPORT_PREFETCH_CHUNKS)
+        download = asyncio.ensure_future(_download(response, chunks))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                for row in await loop.run_in_executor(None, parser.feed, chunk):
+                    yield row
+            # Raise download errors.
+            await download
+        finally:
+            if not download.done():
+                download.cancel()
+                await asyncio.wait([download])
+    for row in parser.close():
+        yield row
+
+
+async def _download(response: httpx.Response, chunks: 'asyncio.Queue') -> None:
+    """Put the chunks of a response into a queue, then None, also when the download fails."""
+    try:
+        async for chunk in response.aiter_bytes(EXPORT_CHUNK_SIZE):
+            await chunks.put(chunk)
+    except asyncio.CancelledError:
+        # The consumer stopped early and no longer empties the queue, putting None could wait forever.
+        raise
+    except Exception:
+        await chunks.put(None)
+        raise
+    await chunks.put(None)
+
+
+def iter_records(rows: Iterator[List[str]]) -> Iterator[Dict[str, str]]:
+    """Turn CSV rows into dicts keyed by the header row."""
+    header = next(rows, None)
+    for row in rows:
+        yield dict(zip(header, row))
+
+
+async def aiter_records(rows: AsyncIterator[List[str]]) -> AsyncIterator[Dict[str, str]]:
+    """Async version of `iter_records`."""
+    header = None
+    async for row in rows:
+        if header is None:
+            header = row
+            continue
+        yield dict(zip(header, row))
+
+
+def _column_index(header: List[str], column: str) -> int:
+    try:
+        return header.index(column)
+    except ValueError:
+        raise ValueError(f'{column} is not a column of the file.') from None
+
+
+def iter_column(rows: Iterator[List[str]], column: str) -> Iterator[str]:
+    """Yield the values of a single column of CSV rows, found by name in the header row."""
+    header = next(rows, None)
+    if header is None:
+        return
+    index = _column_index(header, column)
+    for row in rows:
+        yield row[index]
+
+
+async def aiter_column(rows: AsyncIterator[List[str]], column: str) -> AsyncIterator[str]:
+    """Async version of `iter_column`."""
+    index = None
+    async for row in rows:
+        if index is None:
+            index = _column_index(row, column)
+            continue
+        yield row[index]
+
+
+class _Writer:
+    """Adds values to a set, or writes them one per line to a text file or a file at given path."""
+
+    def __init__(self, destination: Destination):
+        self.count = 0
+        self._file = None
+        if hasattr(destination, 'add'):
+            self._write = destination.add
+        elif hasattr(destination, 'write'):
+            self._write = lambda value: destination.write(value + '\n')
+        else:
+            self._file = open(destination, 'w')
+            self._write = lambda value: self._file.write(value + '\n')
+
+    def __enter__(self) -> '_Writer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def write(self, value: str) -> None:
+        self._write(value)
+        self.count += 1
+
+
+def write_values(values: Iterable[str], destination: Destination) -> int:
+    """
+    Add values to a set, or write them one per line to a text file or a file at given path, without holding them in
+    memory. Return the number of values written.
+    """
+    with _Writer(destination) as writer:
+        for value in values:
+            writer.write(value)
+    return writer.count
+
+
+async def awrite_values(values: AsyncIterator[str], destination: Destination) -> int:
+    """Async version of `write_values`."""
+    with _Writer(destination) as writer:
+        async for value in values:
+            writer.write(value)
+    return writer.count
@@ -0,0 +1,213 @@
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .optional import import_optional
+
+
+def _trace_supported() -> bool:
+    """Whether the installed httpx takes request `extensions` and passes `trace` on to httpcore, since httpx 0.21."""
+    try:
+        version = tuple(int(part) for part in httpx.__version__.split('.')[:2])
+    except ValueError:
+        return True
+    return version >= (0, 21)
+
+
+# Older httpx versions are measured without phases.
+TRACE_SUPPORTED = _trace_supported()
+
+# Phases of an attempt traced by httpcore, as (started, complete) event names without their protocol prefix.
+_TRACED_PHASES = {
+    'connect': ('connect_tcp.started', 'connect_tcp.complete'),
+    'tls': ('start_tls.started', 'start_tls.complete'),
+}
+
+
+class RequestMetrics:
+    """
+    Measurements of a single request made by a client, passed to each of the client's `METRICS_HOOKS` once the request
+    is finished, whether it succeeded or not. Durations are in seconds.
+
+    `total` spans the whole request, including rate limiter waits (`rate_limit_wait`) and retry backoff. Phases of the
+    last attempt are taken from the httpx `trace` extension, and are None when they did not happen, such as `connect`
+    and `tls` on a reused connection, or when the transport or the installed httpx, before 0.21, does not trace them:
+
+    - `pool_wait`: from sending the attempt until it got a connection, either by opening one or reusing an idle one.
+    - `connect`: opening the TCP connection. It includes DNS resolution, which httpcore does not trace on its own.
+    - `tls`: the TLS handshake.
+    - `ttfb`: from sending the attempt until the response headers were received.
+    - `download`: from receiving the response headers until the body was read.
+
+    `bytes_sent` and `bytes_received` count request and response bodies over all attempts, as sent on the wire.
+    `error` is the exception the request failed with, if any. A response with an error status sets `status_code` and
+    raises `OneSignalHTTPError`.
+    """
+
+    def __init__(self, endpoint: str, method: str, url: str):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.status_code: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        self.attempts = 0
+        self.retries = 0
+        self.throttled = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.rate_limit_wait = 0.0
+        self.total: Optional[float] = None
+        self.pool_wait: Optional[float] = None
+        self.connect: Optional[float] = None
+        self.tls: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.download: Optional[float] = None
+        # Wall clock time, for exporters such as tracing spans. Durations are measured with `perf_counter`.
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._attempt_started = self._started
+        self._events: Dict[str, float] = {}
+
+    def __repr__(self) -> str:
+        return f'<RequestMetrics {self.endpoint} {self.method} {self.status_code} {self.total}>'
+
+    def durations(self) -> Dict[str, float]:
+        """Total duration and the phases of the last attempt which happened, by name."""
+        durations = {
+            'total': self.total,
+            'rate_limit_wait': self.rate_limit_wait,
+            'pool_wait': self.pool_wait,
+            'connect': self.connect,
+            'tls': self.tls,
+            'ttfb': self.ttfb,
+            'download': self.download,
+        }
+        return {name: value for name, value in durations.items() if value is not None}
+
+    def trace(self, name: str, info: Dict[str, Any]) -> None:
+        """Callback of the httpx `trace` request extension, recording when each event of an attempt happened."""
+        self._events[name.split('.', 1)[-1]] = time.perf_counter()
+
+    async def atrace(self, name: str, info: Dict[str, Any]) -> None:
+        """Async version of `trace`, as async transports await the callback."""
+        self.trace(name, info)
+
+    def start_attempt(self, retries: int, throttled: int, bytes_sent: int) -> None:
+        """Mark an attempt as sent, after `retries` retried and `throttled` throttled attempts."""
+        self.attempts += 1
+        self.retries = retries
+        self.throttled = throttled
+        self.bytes_sent += bytes_sent
+        self._attempt_started = time.perf_counter()
+        self._events.clear()
+
+    def end_attempt(self, response: httpx.Response = None) -> None:
+        """Take the phases of an attempt from its traced events, and the status and size of its response if any."""
+        events = self._events
+        for phase, (started, complete) in _TRACED_PHASES.items():
+            setattr(self, phase, events[complete] - events[started] if complete in events else None)
+
+        # A connection is either opened, or an idle one is reused and the request is sent straight away.
+        acquired = events.get('connect_tcp.started', events.get('send_request_headers.started'))
+        self.pool_wait = acquired - self._attempt_started if acquired is not None else None
+        headers = events.get('receive_response_headers.complete')
+        self.ttfb = headers - self._attempt_started if headers is not None else None
+        body = events.get('receive_response_body.complete')
+        self.download = body - headers if headers is not None and body is not None else None
+
+        if response is not None:
+            self.status_code = response.status_code
+            received = getattr(response, 'num_bytes_downloaded', None)
+            self.bytes_received += received if received is not None else len(response.content)
+
+    def finish(self, error: BaseException = None) -> None:
+        """Mark the request as finished, failed with `error` if given."""
+        self.total = time.perf_counter() - self._started
+        self.error = error
+
+
+class PrometheusMetrics:
+    """
+    Metrics hook exporting requests to Prometheus, with `prometheus_client`:
+
+    - `{namespace}_requests_total` by `endpoint`, `method` and `status`, `error` when no response was received.
+    - `{namespace}_request_duration_seconds` histogram of `total` by `endpoint` and `method`.
+    - `{namespace}_request_phase_seconds` histogram by `endpoint` and `phase`, one of the phases of `RequestMetrics`.
+    - `{namespace}_request_retries_total` and `{namespace}_request_throttled_total` by `endpoint`.
+    - `{namespace}_request_bytes_total` by `endpoint` and `direction`, `sent` or `received`.
+
+    Metrics are registered with `registry`, the default registry of `prometheus_client` if not given.
+    """
+
+    def __init__(self, registry: Any = None, namespace: str = 'onesignal'):
+        prometheus_client = import_optional('prometheus_client', 'prometheus')
+        options = {'namespace': namespace}
+        if registry is not None:
+            options['registry'] = registry
+        self.requests = prometheus_client.Counter('requests', 'Requests made to the OneSignal API.',
+                                                  ['endpoint', 'method', 'status'], **options)
+        self.duration = prometheus_client.Histogram('request_duration_seconds', 'Duration of requests.',
+                                                    ['endpoint', 'method'], **options)
+        self.phases = prometheus_client.Histogram('request_phase_seconds', 'Duration of request phases.',
+                                                  ['endpoint', 'phase'], **options)
+        self.retries = prometheus_client.Counter('request_retries', 'Retried request attempts.',
+                                                 ['endpoint'], **options)
+        self.throttled = prometheus_client.Counter('request_throttled', 'Request attempts throttled by rate limits.',
+                                                   ['endpoint'], **options)
+        self.bytes = prometheus_client.Counter('request_bytes', 'Bytes of request and response bodies.',
+                                               ['endpoint', 'direction'], **options)
+
+    def __call__(self, metrics: RequestMetrics) -> None:
+        endpoint = metrics.endpoint
+        status = str(metrics.status_code) if metrics.status_code is not None else 'error'
+        self.requests.labels(endpoint, metrics.method, status).inc()
+        self.duration.labels(endpoint, metrics.method).observe(metrics.total)
+        for phase, seconds in metrics.durations().items():
+            if phase != 'total':
+                self.phases.labels(endpoint, phase).observe(seconds)
+        self.retries.labels(endpoint).inc(metrics.retries)
+        self.throttled.labels(endpoint).inc(metrics.throttled)
+        self.bytes.labels(endpoint, 'sent').inc(metrics.bytes_sent)
+        self.bytes.labels(endpoint, 'received').inc(metrics.bytes_received)
+
+
+class OpenTelemetrySpans:
+    """
+    Metrics hook recording each request as an OpenTelemetry client span named `onesignal.<endpoint>`, with
+    `opentelemetry-api`. Spans cover the whole request, are children of the span current when the request was made,
+    and carry the HTTP attributes of the request, its phase durations in seconds as `onesignal.*` attributes and an
+    error status for failed requests.
+    Spans are created with `tracer`, a tracer of the global tracer provider if not given.
+    """
+
+    def __init__(self, tracer: Any = None):
+        trace = import_optional('opentelemetry.trace', 'opentelemetry')
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer('onesignal_sdk')
+
+    def __call__(self, metrics: RequestMetrics) -> None:
+        attributes = {
+            'http.request.method': metrics.method,
+            'url.full': metrics.url,
+            'http.request.body.size': metrics.bytes_sent,
+            'http.response.body.size': metrics.bytes_received,
+            'onesignal.endpoint': metrics.endpoint,
+            'onesignal.attempts': metrics.attempts,
+            'onesignal.retries': metrics.retries,
+            'onesignal.throttled': metrics.throttled,
+        }
+        if metrics.status_code is not None:
+            attributes['http.response.status_code'] = metrics.status_code
+        for phase, seconds in metrics.durations().items():
+            attributes[f'onesignal.{phase}'] = seconds
+
+        start = int(metrics.started_at * 1e9)
+        span = self.tracer.start_span(f'onesignal.{metrics.endpoint}', kind=self._trace.SpanKind.CLIENT,
+                                      attributes=attributes, start_time=start)
+        if metrics.error is not None:
+            span.record_exception(metrics.error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, type(metrics.error).__name__))
+        elif metrics.status_code is not None and metrics.status_code >= 400:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        span.end(end_time=start + int(metrics.total * 1e9))
@@ -0,0 +1,13 @@
+from typing import Any
+
+
+def import_optional(module: str, extra: str) -> Any:
+    """
+    Import a dependency which is only installed with an extra of the package, such as `numpy`.
+    Dotted names return the submodule itself, e.g. `opentelemetry.trace`.
+    """
+    try:
+        return __import__(module, fromlist=['_'])
+    except ImportError:
+        raise ImportError(f'{module} is required for this feature, install it with '
+                          f'`pip install onesignal-sdk[{extra}]`.') from None
@@ -0,0 +1,178 @@
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple, Union
+
+from .concurrency import REQUEST_ERRORS, gather_bounded, map_bounded
+from .constants import DEFAULT_CONCURRENCY, OUTCOME_WINDOW_TTLS
+
+Window = Dict[str, Any]
+WindowKey = Tuple[Tuple[str, Any], ...]
+Query = Tuple[str, Window]
+
+
+def _window_key(window: Any) -> WindowKey:
+    """A window as a hashable tuple of its params, given as a dict or already as such a tuple."""
+    return tuple(sorted(dict(window).items()))
+
+
+class OutcomeTotals:
+    """
+    Outcomes of many `view_outcomes` responses, merged as they arrive into totals per window and outcome.
+
+    Windows are keyed as tuples of their params, e.g. `(('outcome_time_range', '1d'),)`. `totals[(window, name)]`
+    holds the `sum` of the values and the `count` of responses which had the outcome, such as `os__click.count`, and
+    `by_app[app_id][(window, name)]` the sum per app. Windows overlap, the last day is part of the last 30 days, so
+    totals of different windows are never added up. Failed requests are kept in `errors` by `(app_id, window)`.
+    """
+
+    def __init__(self):
+        self.totals: Dict[Tuple[WindowKey, str], Dict[str, float]] = {}
+        self.by_app: Dict[str, Dict[Tuple[WindowKey, str], float]] = {}
+        self.errors: Dict[Tuple[str, WindowKey], Exception] = {}
+
+    def __repr__(self) -> str:
+        return f'<OutcomeTotals {self.totals}>'
+
+    def __getitem__(self, key: Union[str, Tuple[Any, str]]) -> float:
+        """
+        Sum of an outcome over all apps in a window, `totals[window, name]` with the window as a dict or tuple.
+        `totals[name]` is only allowed if a single window was merged.
+        """
+        if isinstance(key, str):
+            windows = {window for window, _ in self.totals}
+            if len(windows) > 1:
+                raise KeyError(f'{key} was merged for {len(windows)} windows, use totals[window, name].')
+            return self.totals[(next(iter(windows), ()), key)]['sum']
+        window, name = key
+        return self.totals[(_window_key(window), name)]['sum']
+
+    def merge(self, app_id: str, outcomes: List[Dict[str, Any]], window: Any = ()) -> None:
+        """Add the `outcomes` of a response for an app and window, the default range if not given, to the totals."""
+        window = _window_key(window)
+        app_totals = self.by_app.setdefault(app_id, {})
+        for outcome in outcomes:
+            key = (window, f"{outcome['id']}.{outcome.get('aggregation', 'count')}")
+            total = self.totals.setdefault(key, {'sum': 0, 'count': 0})
+            total['sum'] += outcome['value']
+            total['count'] += 1
+            app_totals[key] = app_totals.get(key, 0) + outcome['value']
+
+
+class _OutcomesAggregator:
+    """Window cache of the sync and async aggregators."""
+
+    def __init__(self, clients: Mapping[str, Any], ttls: Dict[str, float] = None):
+        self.clients = clients
+        self.ttls = dict(OUTCOME_WINDOW_TTLS if ttls is None else ttls)
+        self._cache: Dict[Hashable, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _queries(self, app_ids: Optional[Iterable[str]], windows: Optional[Iterable[Window]]) -> List[Query]:
+        windows = [dict(window) for window in windows] if windows is not None else [{}]
+        return [(app_id, window) for app_id in (self.clients if app_ids is None else app_ids) for window in windows]
+
+    @staticmethod
+    def _key(outcome_names: List[str], query: Query) -> Hashable:
+        app_id, window = query
+        return app_id, tuple(outcome_names), _window_key(window)
+
+    def _cached(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._cache.pop(key, None)
+                return None
+            return entry[1]
+
+    def _store(self, key: Hashable, window: Window, outcomes: List[Dict[str, Any]]) -> None:
+        ttl = self.ttls.get(window.get('outcome_time_range', '1h'), 0)
+        if ttl > 0:
+            with self._lock:
+                self._cache[key] = (time.monotonic() + ttl, outcomes)
+
+    @staticmethod
+    def _merge(totals: OutcomeTotals, query: Query, result: Any) -> None:
+        app_id, window = query
+        if isinstance(result, Exception):
+            totals.errors[(app_id, _window_key(window))] = result
+        else:
+            totals.merge(app_id, result, window)
+
+
+class OutcomesAggregator(_OutcomesAggregator):
+    """
+    Fetches `view_outcomes` of many apps and windows on a thread pool and merges them into `OutcomeTotals`.
+
+    `clients` maps app ids to clients, such as a `ClientRegistry`. Windows are the `view_outcomes` params of each
+    query, such as `{'outcome_time_range': '1d', 'outcome_platforms': '0'}`. Outcomes of a window are reused for
+    `ttls[outcome_time_range]` seconds, so refreshing a dashboard only fetches the short ranges again. Totals of long
+    ranges change little between refreshes. Ranges without a TTL, including `1h` by default, are always fetched.
+    """
+
+    def aggregate(self,
+                  outcome_names: List[str],
+                  windows: Iterable[Window] = None,
+                  app_ids: Iterable[str] = None,
+                  max_workers: int = DEFAULT_CONCURRENCY) -> OutcomeTotals:
+        """
+        Merge outcomes of every app and window.
+        :param outcome_names: Outcomes to fetch, such as `os__click.count`.
+        :param windows: Params of each window, a single window of the default range if not given.
+        :param app_ids: Apps to fetch, all apps of `clients` by default.
+        :param max_workers: Number of threads making requests at the same time.
+        """
+        totals = OutcomeTotals()
+        queries = self._queries(app_ids, windows)
+
+        def fetch(query):
+            key = self._key(outcome_names, query)
+            outcomes = self._cached(key)
+            if outcomes is None:
+                app_id, window = query
+                outcomes = self.clients[app_id].view_outcomes(outcome_names, window).body['outcomes']
+                self._store(key, window, outcomes)
+            return outcomes
+
+        for query, result in zip(queries, map_bounded(fetch, queries, max_workers)):
+            self._merge(totals, query, result)
+        return totals
+
+
+class AsyncOutcomesAggregator(_OutcomesAggregator):
+    """Async version of `OutcomesAggregator`, for async clients such as those of an `AsyncClientRegistry`."""
+
+    async def aggregate(self,
+                        outcome_names: List[str],
+                        windows: Iterable[Window] = None,
+                        app_ids: Iterable[str] = None,
+                        concurrency: int = DEFAULT_CONCURRENCY) -> OutcomeTotals:
+        """
+        Merge outcomes of every app and window.
+        :param outcome_names: Outcomes to fetch, such as `os__click.count`.
+        :param windows: Params of each window, a single window of the default range if not given.
+        :param app_ids: Apps to fetch, all apps of `clients` by default.
+        :param concurrency: Maximum number of requests in flight.
+        """
+        totals = OutcomeTotals()
+
+        async def fetch(query):
+            key = self._key(outcome_names, query)
+            outcomes = self._cached(key)
+            if outcomes is None:
+                app_id, window = query
+                try:
+                    response = await self.clients[app_id].view_outcomes(outcome_names, window)
+                except REQUEST_ERRORS as e:
+                    outcomes = e
+                else:
+                    outcomes = response.body['outcomes']
+                    self._store(key, window, outcomes)
+            # Merged as each response arrives, instead of once all of them are in.
+            self._merge(totals, query, outcomes)
+
+        await gather_bounded(fetch, self._queries(app_ids, windows), concurrency)
+        return totals
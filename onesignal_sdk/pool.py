@@ -0,0 +1,126 @@
+import threading
+import warnings
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .constants import POOL_WAIT_THRESHOLD, POOL_WAIT_WINDOW
+from .metrics import RequestMetrics
+
+
+class PoolSaturationWarning(UserWarning):
+    """Warned by a `PoolMonitor` when a request waited longer than its threshold for a pooled connection."""
+
+
+class PoolMonitor:
+    """
+    Metrics hook recording how long requests waited for a connection of the pool, for `pool_stats()` of a client with
+    the monitor in its `METRICS_HOOKS`. The last `window` waits are kept for percentiles.
+
+    Each wait longer than `wait_threshold` seconds is reported to `on_saturation(metrics)` if given, otherwise a
+    `PoolSaturationWarning` is warned. Long waits mean requests queue for connections, and `MAX_CONNECTIONS` or
+    the concurrency of bulk operations should be revisited.
+    Requests over transports which are not traced, such as custom transports, are not recorded.
+    """
+
+    def __init__(self,
+                 window: int = POOL_WAIT_WINDOW,
+                 wait_threshold: Optional[float] = POOL_WAIT_THRESHOLD,
+                 on_saturation: Callable[[RequestMetrics], None] = None):
+        self.wait_threshold = wait_threshold
+        self.on_saturation = on_saturation
+        self.requests = 0
+        self.connections_opened = 0
+        self.saturated = 0
+        self._waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: RequestMetrics) -> None:
+        if metrics.pool_wait is None:
+            return
+        with self._lock:
+            self.requests += 1
+            self._waits.append(metrics.pool_wait)
+            if metrics.connect is not None:
+                self.connections_opened += 1
+            if self.wait_threshold is None or metrics.pool_wait <= self.wait_threshold:
+                return
+            self.saturated += 1
+        if self.on_saturation is not None:
+            self.on_saturation(metrics)
+        else:
+            warnings.warn(f'{metrics.endpoint} waited {metrics.pool_wait:.3f}s for a pooled connection, '
+                          f'consider raising MAX_CONNECTIONS.', PoolSaturationWarning)
+
+    def wait_percentiles(self) -> Dict[str, float]:
+        """Percentiles of recent pool waits in seconds, as `p50`, `p90`, `p99` and `max`. Empty without waits."""
+        with self._lock:
+            waits = sorted(self._waits)
+        if not waits:
+            return {}
+        return {'p50': _percentile(waits, 50), 'p90': _percentile(waits, 90), 'p99': _percentile(waits, 99),
+                'max': waits[-1]}
+
+
+class PoolStats:
+    """
+    Snapshot of the connection pool of a client, returned by `pool_stats()`.
+
+    `active`, `idle` and `queued` are read from the httpcore pool, and are None when the pool can not be read, such as
+    with a custom `TRANSPORT` or an httpcore version with a different pool. `queued` counts requests waiting for a
+    connection. Wait percentiles and connection churn come from a `PoolMonitor`, and are None or 0 without one:
+    `connections_opened` counts connections opened by monitored requests and `connections_closed` those of them which
+    are no longer in the pool.
+    """
+
+    def __init__(self, http_client: Any, monitor: PoolMonitor = None):
+        self.active = self.idle = self.queued = None
+        connections, requests, self.max_connections = _read_pool(http_client)
+        if connections is not None:
+            self.idle = sum(1 for connection in connections if connection.is_idle())
+            self.active = sum(1 for connection in connections if not connection.is_idle() and
+                              not connection.is_closed())
+        if requests is not None:
+            self.queued = sum(1 for request in requests if request.is_queued())
+
+        percentiles = monitor.wait_percentiles() if monitor is not None else {}
+        self.requests = monitor.requests if monitor is not None else 0
+        self.wait_p50 = percentiles.get('p50')
+        self.wait_p90 = percentiles.get('p90')
+        self.wait_p99 = percentiles.get('p99')
+        self.wait_max = percentiles.get('max')
+        self.connections_opened = monitor.connections_opened if monitor is not None else 0
+        in_pool = (self.active or 0) + (self.idle or 0)
+        self.connections_closed = max(0, self.connections_opened - in_pool)
+
+    def __repr__(self) -> str:
+        return f'<PoolStats active={self.active} idle={self.idle} queued={self.queued} wait_p99={self.wait_p99}>'
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+def _read_pool(http_client: Any) -> Tuple[Optional[List[Any]], Optional[List[Any]], Optional[int]]:
+    """
+    Connections, pending requests and connection limit of the httpcore pool of an httpx client, each None if unknown.
+    These are httpcore internals, so they are copied and checked instead of trusted.
+    """
+    pool = getattr(getattr(http_client, '_transport', None), '_pool', None)
+    connections = getattr(pool, 'connections', None)
+    requests = getattr(pool, '_requests', None)
+    max_connections = getattr(pool, '_max_connections', None)
+    try:
+        connections = list(connections) if connections is not None else None
+        requests = list(requests) if requests is not None else None
+    except TypeError:
+        return None, None, None
+    if connections is not None and not all(hasattr(connection, 'is_idle') and hasattr(connection, 'is_closed')
+                                           for connection in connections):
+        connections = None
+    if requests is not None and not all(hasattr(request, 'is_queued') for request in requests):
+        requests = None
+    return connections, requests, max_connections if isinstance(max_connections, int) else None
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values, `q` between 0 and 100."""
+    return values[max(0, min(len(values) - 1, int(round(q / 100 * len(values))) - 1))]
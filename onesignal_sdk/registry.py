@@ -0,0 +1,169 @@
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+from .client import AsyncClient, Client, http_client_kwargs
+from .concurrency import gather_bounded, map_bounded
+from .constants import DEFAULT_CONCURRENCY, ENDPOINT_METHODS
+from .response import OneSignalResponse
+
+Credentials = Tuple[str, Optional[str], Dict[str, Any]]
+
+
+class _Registry:
+    """Credentials of many apps and the clients created for them, shared by the sync and async registries."""
+
+    client_class = None
+
+    def __init__(self, apps: Dict[str, Union[str, Tuple[str, str]]] = None, options: Dict[str, Any] = None):
+        self.options = dict(options or {})
+        self._credentials: Dict[str, Credentials] = {}
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        for app_id, keys in (apps or {}).items():
+            rest_api_key, user_auth_key = keys if isinstance(keys, tuple) else (keys, None)
+            self.add(app_id, rest_api_key, user_auth_key)
+
+    def __contains__(self, app_id: str) -> bool:
+        return app_id in self._credentials
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._credentials))
+
+    def __len__(self) -> int:
+        return len(self._credentials)
+
+    def __getitem__(self, app_id: str) -> Any:
+        return self.client(app_id)
+
+    def add(self, app_id: str, rest_api_key: str, user_auth_key: str = None, options: Dict[str, Any] = None) -> None:
+        """
+        Register the credentials of an app. `options` override the options of the registry for this app, except the
+        connection pool options as the pool is shared.
+        """
+        with self._lock:
+            self._credentials[app_id] = (rest_api_key, user_auth_key, dict(options or {}))
+            self._clients.pop(app_id, None)
+
+    def remove(self, app_id: str) -> None:
+        with self._lock:
+            del self._credentials[app_id]
+            self._clients.pop(app_id, None)
+
+    def client(self, app_id: str) -> Any:
+        """Client of a registered app over the shared connection pool, created on first use."""
+        client = self._clients.get(app_id)
+        if client is not None:
+            return client
+        with self._lock:
+            if app_id not in self._clients:
+                rest_api_key, user_auth_key, options = self._credentials[app_id]
+                self._clients[app_id] = self.client_class(app_id, rest_api_key, user_auth_key,
+                                                          options={**self.options, **options},
+                                                          http_client=self.http_client)
+            return self._clients[app_id]
+
+    def _broadcast_call(self, method_name: str, app_ids: Optional[Iterable[str]]) -> Tuple[List[str], Any]:
+        if method_name not in ENDPOINT_METHODS:
+            raise ValueError(f'{method_name} is not an endpoint method of the client.')
+        app_ids = list(self if app_ids is None else app_ids)
+        for app_id in app_ids:
+            if app_id not in self._credentials:
+                raise KeyError(app_id)
+        return app_ids, lambda app_id: getattr(self.client(app_id), method_name)
+
+
+class ClientRegistry(_Registry):
+    """
+    Registry of the credentials of many OneSignal apps, with a `Client` per app over one shared connection pool.
+    Apps are given as `{app_id: rest_api_key}` or `{app_id: (rest_api_key, user_auth_key)}`, or added with `add()`.
+
+    Clients are created on first use with `registry[app_id]`, and share the `options` of the registry, so a single
+    `RATE_LIMITER`, `RESPONSE_CACHE` or set of `METRICS_HOOKS` given there applies to all apps. Options given with an
+    app override them for that app. The connection pool is configured by the pool options of the registry, and closed
+    with `close()` or when the registry is used as a context manager.
+    """
+
+    client_class = Client
+
+    def __init__(self, apps: Dict[str, Union[str, Tuple[str, str]]] = None, options: Dict[str, Any] = None):
+        super().__init__(apps, options)
+        self.http_client = httpx.Client(**http_client_kwargs(self.options))
+
+    def __enter__(self) -> 'ClientRegistry':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the shared connection pool. Clients of the registry can not be used afterwards."""
+        self.http_client.close()
+
+    def broadcast(self,
+                  method_name: str,
+                  *args,
+                  app_ids: Iterable[str] = None,
+                  max_workers: int = DEFAULT_CONCURRENCY,
+                  **kwargs) -> Dict[str, Union[OneSignalResponse, Exception]]:
+        """
+        Call an endpoint method such as `view_outcomes` with the same arguments for many apps, on a thread pool.
+        A failed call does not stop the others, its `OneSignalHTTPError` or transport error is returned in place of
+        the response.
+
+        :param method_name: Name of the client method to call, e.g. `cancel_notification`.
+        :param app_ids: Apps to call the method for, all registered apps by default.
+        :param max_workers: Number of threads making requests at the same time.
+        :return: Responses or errors of One Signal server, by app id.
+        """
+        app_ids, method = self._broadcast_call(method_name, app_ids)
+        results = map_bounded(lambda app_id: method(app_id)(*args, **kwargs), app_ids, max_workers)
+        return dict(zip(app_ids, results))
+
+
+class AsyncClientRegistry(_Registry):
+    """
+    Async version of `ClientRegistry`, with an `AsyncClient` per app. Close it with `aclose()` or use it as an async
+    context manager.
+    """
+
+    client_class = AsyncClient
+
+    def __init__(self, apps: Dict[str, Union[str, Tuple[str, str]]] = None, options: Dict[str, Any] = None):
+        super().__init__(apps, options)
+        self.http_client = httpx.AsyncClient(**http_client_kwargs(self.options))
+
+    async def __aenter__(self) -> 'AsyncClientRegistry':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the shared connection pool. Clients of the registry can not be used afterwards."""
+        await self.http_client.aclose()
+
+    async def broadcast(self,
+                        method_name: str,
+                        *args,
+                        app_ids: Iterable[str] = None,
+                        concurrency: int = DEFAULT_CONCURRENCY,
+                        **kwargs) -> Dict[str, Union[OneSignalResponse, Exception]]:
+        """
+        Call an endpoint method such as `view_outcomes` with the same arguments for many apps concurrently.
+        A failed call does not stop the others, its `OneSignalHTTPError` or transport error is returned in place of
+        the response.
+
+        :param method_name: Name of the client method to call, e.g. `cancel_notification`.
+        :param app_ids: Apps to call the method for, all registered apps by default.
+        :param concurrency: Maximum number of requests in flight.
+        :return: Responses or errors of One Signal server, by app id.
+        """
+        app_ids, method = self._broadcast_call(method_name, app_ids)
+
+        async def call(app_id):
+            return await method(app_id)(*args, **kwargs)
+
+        results = await gather_bounded(call, app_ids, concurrency)
+        return dict(zip(app_ids, results))
@@ -1,49 +1,337 @@
-from typing import Any, Dict
+import asyncio
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import httpx
 
+from .codec import JSONCodec
+from .constants import (
+    AUTH_HEADERS_CACHE_SIZE, DEFAULT_RETRY_AFTER, ENDPOINT_FAMILIES,
+    MAX_THROTTLED_RETRIES,
+)
 from .error import OneSignalHTTPError
+from .metrics import TRACE_SUPPORTED, RequestMetrics
 from .response import OneSignalResponse
+from .retry import RetryPolicy
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second on average, with bursts of up to `capacity` requests.
+    Callers reserve a token and wait for the returned delay, so requests are paced instead of rejected.
+    Thread-safe, and usable from both sync and async code.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError('rate must be positive.')
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return the number of seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            # `_updated` is in the future while the bucket is paused, tokens are not refilled until then.
+            if now > self._updated:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            self._tokens -= 1
+            ready_at = self._updated + max(0.0, -self._tokens) / self.rate
+            return max(0.0, ready_at - now)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`, after which requests are paced from an empty bucket."""
+        with self._lock:
+            resume_at = time.monotonic() + seconds
+            if resume_at > self._updated:
+                self._tokens = min(self._tokens, 0.0)
+                self._updated = resume_at
+
+
+class RateLimiter:
+    """
+    Shared rate limiter with a token bucket per endpoint family: `notifications`, `players`, `segments`, `outcomes`
+    and `apps`.
+    A `default` bucket, if given, applies to endpoints without a bucket of their own.
+    Rates are given as requests per second, or as `(requests per second, burst capacity)` tuples.
+
+    Buckets adapt to responses: a 429 response or exhausted `X-RateLimit-Remaining` header pauses the bucket until
+    `Retry-After`/`X-RateLimit-Reset`, and throttled requests are sent again up to `max_throttled_retries` times.
+    """
+
+    def __init__(self,
+                 rates: Dict[str, Union[float, Tuple[float, float]]],
+                 max_throttled_retries: int = MAX_THROTTLED_RETRIES):
+        self.max_throttled_retries = max_throttled_retries
+        self._buckets = {}
+        for family, rate in rates.items():
+            rate, capacity = rate if isinstance(rate, tuple) else (rate, None)
+            self._buckets[family] = TokenBucket(rate, capacity)
+
+    def bucket(self, url: str) -> Optional[TokenBucket]:
+        """Token bucket of the endpoint family of given url, if any."""
+        return self._buckets.get(_endpoint_family(url), self._buckets.get('default'))
+
+    def acquire(self, url: str) -> float:
+        """Reserve a request to given url and return the number of seconds to wait before sending it."""
+        bucket = self.bucket(url)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def observe(self, url: str, response: httpx.Response) -> bool:
+        """Adapt to rate limit details of a response. Return True if the request was throttled and should be resent."""
+        bucket = self.bucket(url)
+        if bucket is None:
+            return False
+
+        if response.status_code == 429:
+            bucket.pause(_retry_after(response.headers) or DEFAULT_RETRY_AFTER)
+            return True
+
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            bucket.pause(_rate_limit_reset(response.headers) or DEFAULT_RETRY_AFTER)
+        return False
+
+
+def _path_pattern(path: str) -> str:
+    """Regular expression matching the end of urls of an endpoint path, with any value in place of its ids."""
+    return re.sub(r'\\\{\w+\\\}', '[^/]+', re.escape(path)) + '$'
+
+
+# A group per endpoint path, the index of the group which matched gives the family of the endpoint.
+_FAMILY_PATTERN = re.compile('|'.join(f'({_path_pattern(path)})' for path in ENDPOINT_FAMILIES))
+_FAMILIES = (None, *ENDPOINT_FAMILIES.values())
+
+
+def _endpoint_family(url: str) -> Optional[str]:
+    """Endpoint family of a OneSignal url or path, None for unknown endpoints."""
+    match = _FAMILY_PATTERN.search(urlsplit(url).path)
+    return _FAMILIES[match.lastindex] if match is not None else None
+
+
+def _retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header, given either in seconds or as an http date."""
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate_limit_reset(headers: httpx.Headers) -> Optional[float]:
+    """Seconds to wait according to a X-RateLimit-Reset header, given either in seconds or as a unix timestamp."""
+    try:
+        reset = float(headers.get('X-RateLimit-Reset'))
+    except (TypeError, ValueError):
+        return None
+    # Values larger than a year in seconds can only be timestamps.
+    return max(0.0, reset - time.time()) if reset > 31536000 else reset
+
+
+@lru_cache(maxsize=AUTH_HEADERS_CACHE_SIZE)
+def _cached_headers(token: Optional[str], json_content: bool) -> Mapping[str, str]:
+    """Request headers for given auth token, built once and shared read-only by all requests using the token."""
+    headers = {}
+    if token is not None:
+        headers['Authorization'] = 'Basic {0}'.format(token)
+    if json_content:
+        headers['Content-Type'] = 'application/json'
+    return MappingProxyType(headers)
+
+
+def _headers(token: Optional[str], json_content: bool) -> Dict[str, str]:
+    """
+    Request headers for given auth token, copied from the cached ones. httpx before 0.20 only takes headers as a dict,
+    other mappings are iterated as pairs.
+    """
+    return dict(_cached_headers(token, json_content))
 
 
 def _build_request_kwargs(token: str = None,
                           payload: Dict[str, Any] = None,
-                          params: Dict[str, Any] = None) -> Dict[str, Any]:
+                          params: Dict[str, Any] = None,
+                          codec: JSONCodec = None) -> Dict[str, Any]:
     request_kwargs = {}
-    if token is not None:
-        request_kwargs['headers'] = {'Authorization': 'Basic {0}'.format(token)}
-    if payload is not None:
+    json_content = payload is not None and codec is not None
+    if token is not None or json_content:
+        request_kwargs['headers'] = _headers(token, json_content)
+    if payload is not None and codec is None:
         request_kwargs['json'] = payload
+    elif payload is not None:
+        request_kwargs['content'] = codec.dumps(payload)
     if params is not None:
         request_kwargs['params'] = params
     return request_kwargs
 
 
-def _handle_response(response: httpx.Response) -> OneSignalResponse:
+def _handle_response(response: httpx.Response, codec: JSONCodec = None) -> OneSignalResponse:
     """Given an httpx.Response either raise an Exception or return final Response object."""
     if response.status_code >= 300:
         raise OneSignalHTTPError(response)
 
-    return OneSignalResponse(response)
+    return OneSignalResponse(response, codec=codec)
+
+
+class _RequestAttempts:
+    """
+    Bookkeeping of a single request across its attempts, shared by the sync and async request loops.
+    Each method returns the number of seconds to wait before the next attempt, or None when the request is finished.
+    """
+
+    def __init__(self,
+                 method: str,
+                 url: str,
+                 payload: Dict[str, Any],
+                 limiter: RateLimiter,
+                 retry: RetryPolicy,
+                 metrics: RequestMetrics = None):
+        self.method = method
+        self.url = url
+        self.payload = payload
+        self.limiter = limiter
+        self.retry = retry
+        self.metrics = metrics
+        self.throttled = 0
+        self.retries = 0
+        if retry is not None:
+            retry.budget.deposit()
+
+    def before_send(self) -> float:
+        delay = self.limiter.acquire(self.url) if self.limiter is not None else 0.0
+        if self.metrics is not None:
+            self.metrics.rate_limit_wait += delay
+        return delay
+
+    def sending(self, request_kwargs: Dict[str, Any]) -> None:
+        """Called right before an attempt is sent."""
+        if self.metrics is not None:
+            self.metrics.start_attempt(self.retries, self.throttled, len(request_kwargs.get('content', b'')))
+
+    def after_response(self, response: httpx.Response) -> Optional[float]:
+        if self.metrics is not None:
+            self.metrics.end_attempt(response)
+        if self.limiter is not None and self.limiter.observe(self.url, response) and \
+                self.throttled < self.limiter.max_throttled_retries:
+            # The limiter has paused the bucket, waiting happens in the next `before_send`.
+            self.throttled += 1
+            return 0.0
+
+        if self.retry is None or not self.retry.should_retry(self.retries, self.method, self.payload,
+                                                             response=response):
+            return None
+        self.retries += 1
+        return max(self.retry.backoff(self.retries), _retry_after(response.headers) or 0.0)
+
+    def after_error(self, exception: httpx.TransportError) -> Optional[float]:
+        if self.metrics is not None:
+            self.metrics.end_attempt()
+        if self.retry is None or not self.retry.should_retry(self.retries, self.method, self.payload,
+                                                             exception=exception):
+            return None
+        self.retries += 1
+        return self.retry.backoff(self.retries)
 
 
 def basic_auth_request(method: str,
                        url: str,
                        token: str = None,
                        payload: Dict[str, Any] = None,
-                       params: Dict[str, Any] = None) -> OneSignalResponse:
-    """Make a request using basic authorization."""
-    request_kwargs = _build_request_kwargs(token, payload, params)
-    return _handle_response(httpx.request(method, url, **request_kwargs))
+                       params: Dict[str, Any] = None,
+                       client: httpx.Client = None,
+                       limiter: RateLimiter = None,
+                       retry: RetryPolicy = None,
+                       codec: JSONCodec = None,
+                       metrics: RequestMetrics = None) -> OneSignalResponse:
+    """
+    Make a request using basic authorization.
+    Request is sent over the connection pool of `client` if given, otherwise a one-off connection is used.
+    If a `limiter` is given, the request is paced by it and resent when throttled.
+    If a `retry` policy is given, failed attempts are retried according to it.
+    Body of the returned response is decoded only when it is first read.
+    If a `codec` is given, it is used to serialise the payload and decode the response instead of the standard library.
+    If `metrics` are given, attempts of the request are measured into them.
+    """
+    request_kwargs = _build_request_kwargs(token, payload, params, codec)
+    if metrics is not None and TRACE_SUPPORTED:
+        request_kwargs['extensions'] = {'trace': metrics.trace}
+    send = client.request if client is not None else httpx.request
+    attempts = _RequestAttempts(method, url, payload, limiter, retry, metrics)
+    while True:
+        delay = attempts.before_send()
+        if delay > 0:
+            time.sleep(delay)
+        attempts.sending(request_kwargs)
+        try:
+            response = send(method, url, **request_kwargs)
+        except httpx.TransportError as e:
+            delay = attempts.after_error(e)
+            if delay is None:
+                raise
+        else:
+            delay = attempts.after_response(response)
+            if delay is None:
+                return _handle_response(response, codec)
+        if delay > 0:
+            time.sleep(delay)
 
 
 async def async_basic_auth_request(method: str,
                                    url: str,
                                    token: str = None,
                                    payload: Dict[str, Any] = None,
-                                   params: Dict[str, Any] = None) -> OneSignalResponse:
-    """Make an async request using basic authorization."""
-    request_kwargs = _build_request_kwargs(token, payload, params)
-    async with httpx.AsyncClient() as client:
-        response = await client.request(method, url, **request_kwargs)
-        return _handle_response(response)
+                                   params: Dict[str, Any] = None,
+                                   client: httpx.AsyncClient = None,
+                                   limiter: RateLimiter = None,
+                                   retry: RetryPolicy = None,
+                                   codec: JSONCodec = None,
+                                   metrics: RequestMetrics = None) -> OneSignalResponse:
+    """
+    Make an async request using basic authorization.
+    Request is sent over the connection pool of `client` if given, otherwise a one-off connection is used.
+    If a `limiter` is given, the request is paced by it and resent when throttled.
+    If a `retry` policy is given, failed attempts are retried according to it.
+    Body of the returned response is decoded only when it is first read.
+    If a `codec` is given, it is used to serialise the payload and decode the response instead of the standard library.
+    If `metrics` are given, attempts of the request are measured into them.
+    """
+    if client is None:
+        async with httpx.AsyncClient() as one_off_client:
+            return await async_basic_auth_request(method, url, token, payload, params, one_off_client, limiter, retry,
+                                                  codec, metrics)
+
+    request_kwargs = _build_request_kwargs(token, payload, params, codec)
+    if metrics is not None and TRACE_SUPPORTED:
+        request_kwargs['extensions'] = {'trace': metrics.atrace}
+    attempts = _RequestAttempts(method, url, payload, limiter, retry, metrics)
+    while True:
+        delay = attempts.before_send()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        attempts.sending(request_kwargs)
+        try:
+            response = await client.request(method, url, **request_kwargs)
+        except httpx.TransportError as e:
+            delay = attempts.after_error(e)
+            if delay is None:
+                raise
+        else:
+            delay = attempts.after_response(response)
+            if delay is None:
+                return _handle_response(response, codec)
+        if delay > 0:
+            await asyncio.sleep(delay)
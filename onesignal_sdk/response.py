@@ -1,12 +1,68 @@
+from typing import Any, List, Union
+
 import httpx
 
+from .codec import JSONCodec
+
+_NOT_DECODED = object()
+
 
 class OneSignalResponse:
     """
     Designates a successful response from OneSignal with body.
+    Body is decoded on first access and cached, with `codec` if given. If `decode` is False, body is never decoded and
+    is always None, raw bytes are still available with `.raw`.
     """
 
-    def __init__(self, response: httpx.Response):
+    def __init__(self, response: httpx.Response, decode: bool = True, codec: JSONCodec = None):
         self.http_response = response
         self.status_code = response.status_code
-        self.body = response.json()
+        self._body = _NOT_DECODED if decode else None
+        self._codec = codec
+
+    @property
+    def body(self) -> Any:
+        if self._body is _NOT_DECODED:
+            if self._codec is None:
+                self._body = self.http_response.json()
+            else:
+                self._body = self._codec.loads(self.http_response.content)
+        return self._body
+
+    @body.setter
+    def body(self, value: Any) -> None:
+        self._body = value
+
+    @property
+    def raw(self) -> bytes:
+        """Raw bytes of the response body."""
+        return self.http_response.content
+
+
+class OneSignalChunkedResponse:
+    """
+    Aggregated result of a notification whose targets were split into several requests.
+    Failed chunks do not raise, their errors are collected in `.errors`.
+    """
+
+    def __init__(self, results: List[Union[OneSignalResponse, Exception]]):
+        self.results = results
+
+    @property
+    def responses(self) -> List[OneSignalResponse]:
+        return [result for result in self.results if isinstance(result, OneSignalResponse)]
+
+    @property
+    def errors(self) -> List[Exception]:
+        """Errors of failed chunks, `OneSignalHTTPError` or transport errors of httpx."""
+        return [result for result in self.results if not isinstance(result, OneSignalResponse)]
+
+    @property
+    def ids(self) -> List[Any]:
+        """Notification ids of successful chunks."""
+        return [response.body.get('id') for response in self.responses]
+
+    @property
+    def recipients(self) -> int:
+        """Total number of recipients of successful chunks."""
+        return sum(response.body.get('recipients', 0) for response in self.responses)
@@ -0,0 +1,92 @@
+import random
+import threading
+from typing import Any, Dict, Iterable
+
+import httpx
+
+from .constants import IDEMPOTENCY_KEY_FIELDS
+
+# Transport errors raised before the request could reach OneSignal, any request can be retried safely after them.
+CONNECTION_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RetryBudget:
+    """
+    Limits retries to a `ratio` of all requests, so retries can not multiply the load on an already failing server.
+    Up to `reserve` retries can be spent in a burst. Thread-safe, a budget can be shared between clients.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: int = 10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """Record a new request, which earns `ratio` of a retry."""
+        with self._lock:
+            self._balance = min(float(self.reserve), self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Spend a retry if the budget allows."""
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried, and how long to wait before doing so.
+
+    - Connection errors and 429 responses are retried for any request, OneSignal has not processed these requests.
+    - Other transport errors, such as read timeouts, and `retry_statuses` responses are retried only for idempotent
+      requests: `idempotent_methods`, or POST requests carrying an `idempotency_key`/`external_id` in their body.
+    - Waits use exponential backoff with full jitter, never shorter than `Retry-After` of the response.
+    - A request is attempted at most `max_attempts` times, and retries are drawn from a shared `budget`.
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+                 idempotent_methods: Iterable[str] = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'),
+                 budget: RetryBudget = None):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(idempotent_methods)
+        self.budget = budget or RetryBudget()
+
+    def is_idempotent(self, method: str, payload: Dict[str, Any] = None) -> bool:
+        if method.upper() in self.idempotent_methods:
+            return True
+        return payload is not None and any(payload.get(field) for field in IDEMPOTENCY_KEY_FIELDS)
+
+    def backoff(self, retry: int) -> float:
+        """Seconds to wait before the given retry, counting from 1."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (retry - 1)))
+
+    def should_retry(self,
+                     retries: int,
+                     method: str,
+                     payload: Dict[str, Any] = None,
+                     response: httpx.Response = None,
+                     exception: Exception = None) -> bool:
+        """Whether a request which has already been retried `retries` times should be retried again."""
+        if retries + 1 >= self.max_attempts:
+            return False
+
+        if exception is not None:
+            retryable = isinstance(exception, CONNECTION_ERRORS) or (
+                isinstance(exception, httpx.TransportError) and self.is_idempotent(method, payload)
+            )
+        elif response.status_code not in self.retry_statuses:
+            retryable = False
+        else:
+            retryable = response.status_code == 429 or self.is_idempotent(method, payload)
+
+        return retryable and self.budget.withdraw()
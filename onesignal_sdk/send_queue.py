@@ -0,0 +1,385 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import httpx
+
+from .constants import (
+    DEFAULT_CONCURRENCY, IDEMPOTENCY_KEY_FIELDS, SEND_QUEUE_BACKOFF_BASE,
+    SEND_QUEUE_BACKOFF_MAX, SEND_QUEUE_MAX_ATTEMPTS, SEND_QUEUE_MAX_PENDING,
+    SEND_QUEUE_POLL_INTERVAL,
+)
+from .error import OneSignalHTTPError, SendQueueFull
+from .request import _retry_after
+from .response import OneSignalChunkedResponse
+from .retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+# Errors of queued notifications which are retried or reported instead of raised.
+SEND_ERRORS = (OneSignalHTTPError, httpx.HTTPError)
+
+
+class SpoolEntry:
+    """A queued notification: its body, when it is due, how many times it was attempted and its last error."""
+
+    def __init__(self, entry_id: str, body: Dict[str, Any], send_at: float, attempts: int = 0, error: str = None):
+        self.id = entry_id
+        self.body = body
+        self.send_at = send_at
+        self.attempts = attempts
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f'<SpoolEntry {self.id} attempts={self.attempts}>'
+
+
+class MemorySpool:
+    """
+    Spool keeping queued notifications in memory, lost when the process exits. Thread-safe.
+
+    Entries are pending until they are due and taken by a worker, which marks them as done, schedules them again for a
+    retry, or moves them to the dead letters.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, SpoolEntry] = {}
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._sending: Set[str] = set()
+        self._dead: List[SpoolEntry] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of pending entries and entries being sent."""
+        return len(self._entries)
+
+    def put(self, body: Dict[str, Any], send_at: float) -> str:
+        entry = SpoolEntry(uuid.uuid4().hex, body, send_at)
+        with self._lock:
+            self._entries[entry.id] = entry
+            heapq.heappush(self._schedule, (send_at, next(self._counter), entry.id))
+        return entry.id
+
+    def take(self, now: float) -> Optional[SpoolEntry]:
+        """Take the earliest entry due at `now` for sending, if any."""
+        with self._lock:
+            if not self._schedule or self._schedule[0][0] > now:
+                return None
+            entry = self._entries[heapq.heappop(self._schedule)[2]]
+            entry.attempts += 1
+            self._sending.add(entry.id)
+            return entry
+
+    def next_due(self) -> Optional[float]:
+        """When the earliest pending entry is due, if there is any."""
+        with self._lock:
+            return self._schedule[0][0] if self._schedule else None
+
+    def busy(self, now: float) -> bool:
+        """Whether entries are being sent or are due at `now`."""
+        with self._lock:
+            return bool(self._sending) or bool(self._schedule and self._schedule[0][0] <= now)
+
+    def done(self, entry_id: str) -> None:
+        with self._lock:
+            self._sending.discard(entry_id)
+            del self._entries[entry_id]
+
+    def retry(self, entry_id: str, send_at: float) -> None:
+        with self._lock:
+            self._sending.discard(entry_id)
+            entry = self._entries[entry_id]
+            entry.send_at = send_at
+            heapq.heappush(self._schedule, (send_at, next(self._counter), entry_id))
+
+    def dead(self, entry_id: str, error: str) -> None:
+        with self._lock:
+            self._sending.discard(entry_id)
+            entry = self._entries.pop(entry_id)
+            entry.error = error
+            self._dead.append(entry)
+
+    def dead_letters(self) -> List[SpoolEntry]:
+        """Entries which failed for good."""
+        with self._lock:
+            return list(self._dead)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteSpool:
+    """
+    Spool keeping queued notifications in a SQLite database at `path`, so they survive process restarts. Thread-safe.
+    Entries which were being sent when the previous process stopped are pending again, their idempotency key keeps
+    OneSignal from sending them twice.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            # Write-ahead logging makes each commit an append instead of a rewrite of the database.
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS queue (id TEXT PRIMARY KEY, body TEXT NOT NULL, '
+                             'send_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL, '
+                             'error TEXT)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS queue_due ON queue (state, send_at)')
+            self._db.execute("UPDATE queue SET state = 'pending' WHERE state = 'sending'")
+
+    def __len__(self) -> int:
+        """Number of pending entries and entries being sent."""
+        return self._query("SELECT COUNT(*) FROM queue WHERE state != 'dead'")[0][0]
+
+    def put(self, body: Dict[str, Any], send_at: float) -> str:
+        entry_id = uuid.uuid4().hex
+        self._query("INSERT INTO queue (id, body, send_at, state) VALUES (?, ?, ?, 'pending')",
+                    entry_id, json.dumps(body), send_at)
+        return entry_id
+
+    def take(self, now: float) -> Optional[SpoolEntry]:
+        """Take the earliest entry due at `now` for sending, if any."""
+        with self._lock:
+            row = self._db.execute("SELECT id, body, send_at, attempts FROM queue WHERE state = 'pending' "
+                                   "AND send_at <= ? ORDER BY send_at LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE queue SET state = 'sending', attempts = attempts + 1 WHERE id = ?", (row[0],))
+        return SpoolEntry(row[0], json.loads(row[1]), row[2], row[3] + 1)
+
+    def next_due(self) -> Optional[float]:
+        """When the earliest pending entry is due, if there is any."""
+        return self._query("SELECT MIN(send_at) FROM queue WHERE state = 'pending'")[0][0]
+
+    def busy(self, now: float) -> bool:
+        """Whether entries are being sent or are due at `now`."""
+        return bool(self._query("SELECT 1 FROM queue WHERE state = 'sending' OR (state = 'pending' AND send_at <= ?) "
+                                "LIMIT 1", now))
+
+    def done(self, entry_id: str) -> None:
+        self._query('DELETE FROM queue WHERE id = ?', entry_id)
+
+    def retry(self, entry_id: str, send_at: float) -> None:
+        self._query("UPDATE queue SET state = 'pending', send_at = ? WHERE id = ?", send_at, entry_id)
+
+    def dead(self, entry_id: str, error: str) -> None:
+        self._query("UPDATE queue SET state = 'dead', error = ? WHERE id = ?", error, entry_id)
+
+    def dead_letters(self) -> List[SpoolEntry]:
+        """Entries which failed for good."""
+        rows = self._query("SELECT id, body, send_at, attempts, error FROM queue WHERE state = 'dead' "
+                           "ORDER BY send_at")
+        return [SpoolEntry(entry_id, json.loads(body), send_at, attempts, error)
+                for entry_id, body, send_at, attempts, error in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql: str, *params: Any) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+
+Spool = Union[MemorySpool, SQLiteSpool]
+
+
+class SendQueue:
+    """
+    Queue of notifications sent in the background by an `AsyncClient`, so producers do not wait for OneSignal.
+
+    `send_notification` stores the notification in the `spool` and returns immediately. Notifications without an
+    `idempotency_key`/`external_id` get an `idempotency_key`, so that resending them never notifies twice. Producers
+    are pushed back once the spool holds `max_pending` notifications: they wait up to `timeout` seconds for room, then
+    `SendQueueFull` is raised.
+
+    Notifications are sent by `concurrency` workers on an event loop running in a thread of the queue, which owns the
+    client from then on. Failed sends are retried according to `retry`, which waits for `Retry-After` of throttled
+    requests, and notifications which can not be sent are moved to the dead letters of the spool. `on_sent(entry,
+    response)` and `on_error(entry, error)` are called from the queue's thread, if given, and their exceptions are
+    logged. Notifications split into chunks fail if any chunk fails. Resending them only resends the failed chunks,
+    as chunks have idempotency keys of their own. Unexpected errors, such as a body which can not be serialised, move
+    the notification to the dead letters without retrying it.
+
+    Call `close()`, or use the queue as a context manager, to send the notifications which are due and stop. Entries
+    due later, including retries waiting for their backoff, stay in the spool for the next queue of a durable spool.
+    """
+
+    def __init__(self,
+                 client: Any,
+                 spool: Spool = None,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 max_pending: int = SEND_QUEUE_MAX_PENDING,
+                 retry: RetryPolicy = None,
+                 on_sent: Callable[[SpoolEntry, Any], None] = None,
+                 on_error: Callable[[SpoolEntry, Exception], None] = None):
+        self.client = client
+        self.spool = spool if spool is not None else MemorySpool()
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.retry = retry or RetryPolicy(max_attempts=SEND_QUEUE_MAX_ATTEMPTS,
+                                          backoff_base=SEND_QUEUE_BACKOFF_BASE,
+                                          backoff_max=SEND_QUEUE_BACKOFF_MAX)
+        self.on_sent = on_sent
+        self.on_error = on_error
+        self.sent = 0
+        self.failed = 0
+        self._closed = False
+        self._space = threading.Condition()
+        self._loop = asyncio.new_event_loop()
+        self._wakeup = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='onesignal-send-queue', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def __enter__(self) -> 'SendQueue':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.spool)
+
+    def send_notification(self,
+                          notification_body: Dict[str, Any],
+                          send_at: Union[datetime, float] = None,
+                          timeout: Optional[float] = 0.0) -> str:
+        """
+        Queue a notification and return the id of its spool entry.
+        :param notification_body: Body of the notification, as for `send_notification` of a client.
+        :param send_at: Datetime or unix timestamp to hold the notification until, it is sent right away by default.
+        :param timeout: Seconds to wait for room in a full queue before raising `SendQueueFull`, None to wait for as
+        long as it takes.
+        """
+        if self._closed:
+            raise RuntimeError('Send queue is closed.')
+        body = dict(notification_body)
+        if not any(body.get(field) for field in IDEMPOTENCY_KEY_FIELDS):
+            body['idempotency_key'] = str(uuid.uuid4())
+        if isinstance(send_at, datetime):
+            send_at = send_at.timestamp()
+
+        with self._space:
+            if not self._space.wait_for(lambda: len(self.spool) < self.max_pending, timeout):
+                raise SendQueueFull(f'{self.max_pending} notifications are pending.')
+            entry_id = self.spool.put(body, send_at if send_at is not None else time.time())
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return entry_id
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until the notifications due now are sent or failed. Return False if `timeout` seconds passed first."""
+        with self._space:
+            return self._space.wait_for(lambda: not self.spool.busy(time.time()), timeout)
+
+    def close(self) -> None:
+        """Send the notifications which are due, then stop the workers and close the client and the spool."""
+        if self._closed:
+            return
+        self._closed = True
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        self._thread.join()
+        self.spool.close()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._drain())
+        finally:
+            self._loop.close()
+
+    async def _drain(self) -> None:
+        # Created on the queue's event loop, producers set it thread-safely.
+        self._wakeup = asyncio.Event()
+        self._started.set()
+        try:
+            await asyncio.gather(*[self._worker() for _ in range(self.concurrency)])
+        finally:
+            await self.client.aclose()
+
+    async def _worker(self) -> None:
+        while True:
+            self._wakeup.clear()
+            entry = self.spool.take(time.time())
+            if entry is not None:
+                try:
+                    await self._send(entry)
+                except Exception:
+                    # Such as a failing spool, the worker keeps going with the next entries.
+                    logger.exception('Failed to process send queue entry %s.', entry.id)
+                with self._space:
+                    self._space.notify_all()
+                continue
+            if self._closed:
+                return
+            next_due = self.spool.next_due()
+            timeout = SEND_QUEUE_POLL_INTERVAL if next_due is None else \
+                min(SEND_QUEUE_POLL_INTERVAL, max(0.0, next_due - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, entry: SpoolEntry) -> None:
+        self.retry.budget.deposit()
+        try:
+            response = await self.client.send_notification(entry.body)
+        except SEND_ERRORS as e:
+            self._failed(entry, e, self._retry_delay(entry, e))
+            return
+        except Exception as e:
+            # Not a failure of OneSignal, such as a body the codec can not serialise, sending it again would not help.
+            self._failed(entry, e, None)
+            return
+
+        errors = response.errors if isinstance(response, OneSignalChunkedResponse) else []
+        if errors:
+            # Chunks have idempotency keys derived from the notification's, so sending the whole notification again
+            # only sends the failed chunks.
+            message = f'{len(errors)} of {len(response.results)} chunks failed: {errors!r}'
+            self._failed(entry, errors[0], self._retry_delay(entry, errors[0]), message)
+            return
+        self.spool.done(entry.id)
+        self.sent += 1
+        self._callback(self.on_sent, entry, response)
+
+    def _failed(self, entry: SpoolEntry, error: Exception, delay: Optional[float], message: str = None) -> None:
+        """Schedule a failed entry again after `delay` seconds, or move it to the dead letters if it is None."""
+        if delay is not None:
+            self.spool.retry(entry.id, time.time() + delay)
+            return
+        self.spool.dead(entry.id, message or repr(error))
+        self.failed += 1
+        self._callback(self.on_error, entry, error)
+
+    @staticmethod
+    def _callback(callback: Optional[Callable[..., None]], *args: Any) -> None:
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception('Send queue callback %r failed.', callback)
+
+    def _retry_delay(self, entry: SpoolEntry, error: Exception) -> Optional[float]:
+        """Seconds to wait before sending a failed entry again, or None if it should not be retried."""
+        retries = entry.attempts - 1
+        if isinstance(error, OneSignalHTTPError):
+            if not self.retry.should_retry(retries, 'POST', entry.body, response=error.http_response):
+                return None
+            return max(self.retry.backoff(retries + 1), _retry_after(error.http_response.headers) or 0.0)
+        if not self.retry.should_retry(retries, 'POST', entry.body, exception=error):
+            return None
+        return self.retry.backoff(retries + 1)
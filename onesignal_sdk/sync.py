@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .client import AsyncClient, Client
+from .concurrency import gather_bounded, map_bounded
+from .constants import DEFAULT_CONCURRENCY, NOTIFICATIONS_PAGE_SIZE
+from .error import OneSignalHTTPError
+
+State = Dict[str, Any]
+
+
+class MemoryStateStore:
+    """Keeps sync states in memory, for the lifetime of the process."""
+
+    def __init__(self):
+        self._states: Dict[str, State] = {}
+
+    def load(self, key: str) -> Optional[State]:
+        return self._states.get(key)
+
+    def save(self, key: str, state: State) -> None:
+        self._states[key] = state
+
+
+class JSONFileStateStore:
+    """Keeps sync states by key in a JSON file, replaced atomically on every save."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, State]:
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def load(self, key: str) -> Optional[State]:
+        with self._lock:
+            return self._read().get(key)
+
+    def save(self, key: str, state: State) -> None:
+        with self._lock:
+            states = self._read()
+            states[key] = state
+            temporary = self.path.with_name(self.path.name + '.tmp')
+            with open(temporary, 'w') as file:
+                json.dump(states, file)
+            os.replace(temporary, self.path)
+
+
+def _in_flight(notification: Dict[str, Any]) -> bool:
+    """Whether the delivery of a notification, and so its stats, may still change."""
+    return not notification.get('canceled') and not notification.get('completed_at')
+
+
+class _SyncRun:
+    """Notifications seen during a single sync, and the state it leaves behind."""
+
+    def __init__(self, state: Optional[State]):
+        state = state or {}
+        self.mark: Optional[int] = state.get('queued_at')
+        self.mark_ids: Set[str] = set(state.get('ids', ()))
+        self.previously_in_flight: List[str] = list(state.get('in_flight', ()))
+        self.queued_at = self.mark
+        self.ids = set(self.mark_ids)
+        self.in_flight: Set[str] = set()
+        self.seen: Set[str] = set()
+
+    def new(self, notifications: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """New notifications of a page, newest first, and whether the page reached the high-water mark."""
+        new = []
+        for notification in notifications:
+            queued_at = notification.get('queued_at') or 0
+            if self.mark is not None and queued_at < self.mark:
+                return new, True
+            if self.mark is not None and queued_at == self.mark and notification['id'] in self.mark_ids:
+                # Notifications queued in the same second are in no particular order, keep looking past them.
+                continue
+            if self.track(notification):
+                new.append(notification)
+        return new, False
+
+    def track(self, notification: Dict[str, Any]) -> bool:
+        """Record a notification, return False if it was already seen during this sync."""
+        notification_id = notification['id']
+        if notification_id in self.seen:
+            # Pages shift when notifications are sent during a sync.
+            return False
+        self.seen.add(notification_id)
+        queued_at = notification.get('queued_at') or 0
+        if self.queued_at is None or queued_at > self.queued_at:
+            self.queued_at, self.ids = queued_at, {notification_id}
+        elif queued_at == self.queued_at:
+            self.ids.add(notification_id)
+        if _in_flight(notification):
+            self.in_flight.add(notification_id)
+        return True
+
+    def refresh(self) -> List[str]:
+        """Notifications in flight at the end of the previous sync which were not paged through again."""
+        return [notification_id for notification_id in self.previously_in_flight if notification_id not in self.seen]
+
+    def failed(self, notification_id: str, error: Exception) -> None:
+        """Keep refreshing a notification after transient errors, forget it once OneSignal does not find it."""
+        if not isinstance(error, OneSignalHTTPError) or error.status_code >= 500 or error.status_code == 429:
+            self.in_flight.add(notification_id)
+
+    def state(self) -> State:
+        return {'queued_at': self.queued_at, 'ids': sorted(self.ids), 'in_flight': sorted(self.in_flight)}
+
+
+class _NotificationSync:
+    """State handling shared by the sync and async notification syncs."""
+
+    def __init__(self,
+                 client: Any,
+                 store: Any = None,
+                 key: str = None,
+                 query: Dict[str, Any] = None,
+                 page_size: int = NOTIFICATIONS_PAGE_SIZE):
+        self.client = client
+        self.store = MemoryStateStore() if store is None else store
+        self.key = client.app_id if key is None else key
+        self.query = dict(query or {})
+        self.page_size = page_size
+
+    def reset(self) -> None:
+        """Forget the high-water mark, the next sync goes through the whole history again."""
+        self.store.save(self.key, {})
+
+    def _page_query(self, offset: int) -> Dict[str, Any]:
+        return {**self.query, 'offset': offset, 'limit': self.page_size}
+
+    def _last_page(self, body: Dict[str, Any], offset: int) -> bool:
+        return len(body['notifications']) < self.page_size or offset + self.page_size >= body.get('total_count', 0)
+
+
+class NotificationSync(_NotificationSync):
+    """
+    Incremental sync of the notifications of an app with `view_notifications`, for jobs which regularly pull them.
+
+    OneSignal lists notifications newest first. Each sync pages only until the newest `queued_at` seen by the previous
+    one, its high-water mark, and yields the new notifications. Notifications still being delivered, whose stats can
+    change, are fetched again by id on the next syncs until they complete or are canceled. The mark and the
+    notifications in flight are saved to `store` by `key`, the app id by default, once a sync is iterated through.
+    A `JSONFileStateStore` keeps them across runs, a `MemoryStateStore` is used by default. Give a different `key`
+    for each `query` when syncing filtered notifications.
+    """
+
+    def __init__(self,
+                 client: Client,
+                 store: Any = None,
+                 key: str = None,
+                 query: Dict[str, Any] = None,
+                 page_size: int = NOTIFICATIONS_PAGE_SIZE,
+                 max_workers: int = DEFAULT_CONCURRENCY):
+        super().__init__(client, store, key, query, page_size)
+        self.max_workers = max_workers
+
+    def sync(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield notifications queued since the previous sync, newest first, then those which were in flight.
+        The new state is saved only if the iteration completes, so an interrupted sync is repeated.
+        """
+        run = _SyncRun(self.store.load(self.key))
+        offset = 0
+        while True:
+            body = self.client.view_notifications(self._page_query(offset)).body
+            new, reached_mark = run.new(body['notifications'])
+            yield from new
+            if reached_mark or self._last_page(body, offset):
+                break
+            offset += self.page_size
+
+        refresh = run.refresh()
+        results = map_bounded(self.client.view_notification, refresh, self.max_workers)
+        for notification_id, result in zip(refresh, results):
+            if isinstance(result, Exception):
+                run.failed(notification_id, result)
+            elif run.track(result.body):
+                yield result.body
+        self.store.save(self.key, run.state())
+
+
+class AsyncNotificationSync(_NotificationSync):
+    """Async version of `NotificationSync`, for an `AsyncClient`."""
+
+    def __init__(self,
+                 client: AsyncClient,
+                 store: Any = None,
+                 key: str = None,
+                 query: Dict[str, Any] = None,
+                 page_size: int = NOTIFICATIONS_PAGE_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        super().__init__(client, store, key, query, page_size)
+        self.concurrency = concurrency
+
+    async def sync(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield notifications queued since the previous sync, newest first, then those which were in flight.
+        Usage: `async for notification in notification_sync.sync(): ...`
+        """
+        run = _SyncRun(self.store.load(self.key))
+        offset = 0
+        while True:
+            body = (await self.client.view_notifications(self._page_query(offset))).body
+            new, reached_mark = run.new(body['notifications'])
+            for notification in new:
+                yield notification
+            if reached_mark or self._last_page(body, offset):
+                break
+            offset += self.page_size
+
+        refresh = run.refresh()
+        results = await gather_bounded(self.client.view_notification, refresh, self.concurrency)
+        for notification_id, result in zip(refresh, results):
+            if isinstance(result, Exception):
+                run.failed(notification_id, result)
+            elif run.track(result.body):
+                yield result.body
+        self.store.save(self.key, run.state())
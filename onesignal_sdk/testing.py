@@ -0,0 +1,465 @@
+"""
+In-process stand-in of the OneSignal REST API, for testing and load testing code built on the clients offline.
+"""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+from .constants import (
+    API_ROOT, APP_PATH, APPS_PATH, CSV_EXPORT_PATH, DEVICE_PATH, DEVICES_PAGE_SIZE,
+    DEVICES_PATH, EDIT_TAGS_PATH, NEW_PURCHASE_PATH, NEW_SESSION_PATH,
+    NOTIFICATION_HISTORY_PATH, NOTIFICATION_PATH, NOTIFICATIONS_PAGE_SIZE,
+    NOTIFICATIONS_PATH, SEGMENT_PATH, SEGMENTS_PATH, VIEW_OUTCOMES_PATH,
+)
+from .request import _endpoint_family
+
+# Path of generated files, such as csv exports, relative to the origin of the API root.
+EXPORTS_PATH = '/exports/{name}'
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+_LANGUAGES = ('en', 'tr', 'de', 'es', 'fr', 'pt', 'ja')
+_COUNTRIES = ('US', 'TR', 'DE', 'ES', 'FR', 'BR', 'JP')
+_DEVICE_TYPES = (0, 1, 5, 11)
+_CSV_COLUMNS = (
+    'id', 'identifier', 'session_count', 'language', 'timezone', 'game_version', 'device_os', 'device_type',
+    'device_model', 'ad_id', 'tags', 'last_active', 'playtime', 'amount_spent', 'created_at', 'invalid_identifier',
+    'badge_count', 'country',
+)
+
+
+def _route(template: str) -> 're.Pattern':
+    return re.compile('^' + re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', template) + '$')
+
+
+def player_id(index: int) -> str:
+    """Id of the synthetic player at given index."""
+    return f'00000000-0000-4000-8000-{index:012x}'
+
+
+class StandInServer:
+    """
+    Stand-in of the OneSignal API serving the endpoints of the clients, as an ASGI app (`.asgi`) and a WSGI app
+    (`.wsgi`). Use `transport()`/`async_transport()` with the `TRANSPORT` client option to send requests to it
+    in-process, or serve `.asgi`/`.wsgi` with any server to exercise real connection pooling.
+
+    - `players` synthetic players and `notifications` synthetic notifications are served with pagination. Players are
+      generated from their index, so large counts take no memory up front. Notifications are listed newest first,
+      raising `notifications` adds newer ones.
+    - `latency` is a number of seconds, or a function returning one, such as `lambda: random.expovariate(20)`.
+    - `error_rate` and `throttle_rate` are the fractions of requests answered with 500/503 and 429 responses.
+    - `rate_limits` are requests per second per endpoint family, such as `notifications` or `players`, exceeding them
+      gets 429 responses with `Retry-After` and `X-RateLimit-*` headers.
+    - Csv exports are ready after `export_not_ready` polls.
+
+    Requests are counted per route in `.stats`, such as `stats['GET /players/{id}']`, and the largest number of
+    concurrent requests is kept in `.max_in_flight`.
+    Writes are recorded: `.sent_notifications`, `.device_updates` and `.tag_updates`.
+    """
+
+    def __init__(self,
+                 players: int = 1000,
+                 notifications: int = 100,
+                 latency: Union[float, Callable[[], float]] = 0.0,
+                 error_rate: float = 0.0,
+                 throttle_rate: float = 0.0,
+                 rate_limits: Dict[str, float] = None,
+                 export_not_ready: int = 0,
+                 api_root: str = API_ROOT,
+                 seed: int = 0):
+        self.players = players
+        self.notifications = notifications
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limits = dict(rate_limits or {})
+        self.export_not_ready = export_not_ready
+        self.seed = seed
+        self.stats = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sent_notifications: Dict[str, Dict[str, Any]] = {}
+        self.device_updates: Dict[str, Dict[str, Any]] = {}
+        self.tag_updates: Dict[str, Dict[str, Any]] = {}
+
+        api_root = urlsplit(api_root)
+        self._origin = f'{api_root.scheme}://{api_root.netloc}'
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Tuple[int, int]] = {}
+        self._export_polls = Counter()
+        self._exports: Dict[str, Callable[[], bytes]] = {}
+        routes = (
+            ('POST', NOTIFICATIONS_PATH, self._send_notification),
+            ('GET', NOTIFICATIONS_PATH, self._view_notifications),
+            ('GET', NOTIFICATION_PATH, self._view_notification),
+            ('DELETE', NOTIFICATION_PATH, self._cancel_notification),
+            ('POST', NOTIFICATION_HISTORY_PATH, self._notification_history),
+            ('POST', CSV_EXPORT_PATH, self._csv_export),
+            ('GET', DEVICES_PATH, self._view_devices),
+            ('POST', DEVICES_PATH, self._add_device),
+            ('GET', DEVICE_PATH, self._view_device),
+            ('PUT', DEVICE_PATH, self._edit_device),
+            ('PUT', EDIT_TAGS_PATH, self._edit_tags),
+            ('POST', NEW_SESSION_PATH, self._success),
+            ('POST', NEW_PURCHASE_PATH, self._success),
+            ('POST', SEGMENTS_PATH, self._create_segment),
+            ('DELETE', SEGMENT_PATH, self._success),
+            ('GET', VIEW_OUTCOMES_PATH, self._view_outcomes),
+            ('GET', APPS_PATH, self._view_apps),
+            ('POST', APPS_PATH, self._create_app),
+            ('GET', APP_PATH, self._view_app),
+            ('PUT', APP_PATH, self._update_app),
+        )
+        self._routes = [(method, path, _route(api_root.path + path), handler) for method, path, handler in routes]
+        self._export_route = _route(EXPORTS_PATH)
+
+    def transport(self) -> httpx.WSGITransport:
+        """Transport sending requests of a `Client` to the stand-in."""
+        return httpx.WSGITransport(app=self.wsgi)
+
+    def async_transport(self) -> httpx.ASGITransport:
+        """Transport sending requests of an `AsyncClient` to the stand-in."""
+        return httpx.ASGITransport(app=self.asgi)
+
+    def handle(self,
+               method: str,
+               path: str,
+               query: str = '',
+               headers: Dict[str, str] = None,
+               body: bytes = b'') -> Response:
+        """Handle a request, without waiting for the latency. Return status code, headers and body."""
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        match = self._export_route.match(path)
+        if match is not None:
+            self._count(f'{method} {EXPORTS_PATH}')
+            return self._download_export(match.group('name'))
+
+        for route_method, template, route, handler in self._routes:
+            match = route.match(path)
+            if match is None or route_method != method:
+                continue
+            self._count(f'{method} {template}')
+            rate_limit_headers, rejection = self._rate_limit(path)
+            if rejection is not None:
+                return rejection
+            if not headers.get('authorization', '').startswith('Basic '):
+                return self._json(400, {'errors': ['Please include a case-sensitive header of Authorization.']})
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                return self._json(400, {'errors': ['Invalid JSON body.']})
+            status, response_headers, content = handler(payload=payload, params=dict(parse_qsl(query)),
+                                                        **match.groupdict())
+            return status, {**rate_limit_headers, **response_headers}, content
+
+        self._count('not_found')
+        return self._json(404, {'errors': ['Not found.']})
+
+    async def asgi(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        self._enter()
+        try:
+            headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+            status, response_headers, content = self.handle(scope['method'], scope['path'],
+                                                            scope['query_string'].decode('latin-1'), headers, body)
+            delay = self._delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self._exit()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in response_headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    def wsgi(self, environ: Dict[str, Any], start_response: Callable) -> List[bytes]:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+        headers = {key[5:].replace('_', '-'): value for key, value in environ.items() if key.startswith('HTTP_')}
+
+        self._enter()
+        try:
+            status, response_headers, content = self.handle(environ['REQUEST_METHOD'], environ['PATH_INFO'],
+                                                            environ.get('QUERY_STRING', ''), headers, body)
+            delay = self._delay()
+            if delay > 0:
+                time.sleep(delay)
+        finally:
+            self._exit()
+        start_response(f'{status} {HTTPStatus(status).phrase}', list(response_headers.items()))
+        return [content]
+
+    def player(self, index: int) -> Dict[str, Any]:
+        """Synthetic player at given index, the same for every call."""
+        rnd = random.Random(self.seed * 1000003 + index)
+        created_at = 1577836800 + rnd.randrange(31536000)
+        player = {
+            'id': player_id(index),
+            'identifier': f'{rnd.getrandbits(128):032x}',
+            'session_count': rnd.randint(1, 500),
+            'language': rnd.choice(_LANGUAGES),
+            'timezone': rnd.choice((-18000, 0, 3600, 10800, 32400)),
+            'game_version': f'1.{rnd.randint(0, 9)}',
+            'device_os': f'{rnd.randint(10, 17)}.0',
+            'device_type': rnd.choice(_DEVICE_TYPES),
+            'device_model': rnd.choice(('iPhone14,2', 'Pixel 7', 'SM-G991B')),
+            'ad_id': None,
+            'tags': {'level': str(rnd.randint(1, 50))},
+            'last_active': created_at + rnd.randrange(8640000),
+            'playtime': rnd.randint(0, 100000),
+            'amount_spent': round(rnd.random() * 100, 2),
+            'created_at': created_at,
+            'invalid_identifier': False,
+            'badge_count': rnd.randint(0, 5),
+            'country': rnd.choice(_COUNTRIES),
+        }
+        return {**player, **self.device_updates.get(player['id'], {})}
+
+    def notification(self, index: int) -> Dict[str, Any]:
+        """Synthetic notification at given index, the same for every call."""
+        rnd = random.Random(self.seed * 1000033 + index)
+        successful = rnd.randint(0, self.players)
+        return {
+            'id': str(uuid.UUID(int=self.seed << 64 | index, version=4)),
+            'contents': {'en': f'Notification {index}'},
+            'successful': successful,
+            'failed': rnd.randint(0, 10),
+            'errored': 0,
+            'converted': rnd.randint(0, successful),
+            'remaining': 0,
+            'queued_at': 1577836800 + index * 3600,
+            'send_after': 1577836800 + index * 3600,
+            'completed_at': 1577836800 + index * 3600 + 60,
+            'canceled': False,
+        }
+
+    def _count(self, route: str) -> None:
+        with self._lock:
+            self.stats[route] += 1
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _delay(self) -> float:
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _rate_limit(self, path: str) -> Tuple[Dict[str, str], Optional[Response]]:
+        """Rate limit headers of a request, and the 429 or 5xx response to send instead of handling it, if any."""
+        family = _endpoint_family(path)
+        limit = self.rate_limits.get(family)
+        headers = {}
+        if limit is not None:
+            with self._lock:
+                now = time.time()
+                window = int(now)
+                start, count = self._windows.get(family, (window, 0))
+                count = count + 1 if start == window else 1
+                self._windows[family] = (window, count)
+            headers = {
+                'X-RateLimit-Limit': str(int(limit)),
+                'X-RateLimit-Remaining': str(max(0, int(limit) - count)),
+                'X-RateLimit-Reset': str(window + 1),
+            }
+            if count > limit:
+                retry_after = {'Retry-After': f'{window + 1 - now:.3f}'}
+                return headers, self._json(429, {'errors': ['API rate limit exceeded']}, {**headers, **retry_after})
+
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            return headers, self._json(429, {'errors': ['API rate limit exceeded']}, {**headers, 'Retry-After': '1'})
+        if roll < self.throttle_rate + self.error_rate:
+            return headers, self._json(self._random.choice((500, 503)), {'errors': ['Internal server error']}, headers)
+        return headers, None
+
+    @staticmethod
+    def _json(status: int, body: Any, headers: Dict[str, str] = None) -> Response:
+        return status, {**(headers or {}), 'Content-Type': 'application/json'}, json.dumps(body).encode()
+
+    def _player_index(self, device_id: str) -> Optional[int]:
+        try:
+            index = int(device_id.rsplit('-', 1)[1], 16)
+        except (IndexError, ValueError):
+            return None
+        return index if device_id == player_id(index) and index < self.players else None
+
+    def _page(self, params: Dict[str, str], max_limit: int) -> Tuple[int, int]:
+        offset = int(params.get('offset', 0))
+        limit = min(int(params.get('limit', max_limit)), max_limit)
+        return offset, limit
+
+    def _success(self, **kwargs) -> Response:
+        return self._json(200, {'success': True})
+
+    def _send_notification(self, payload: Dict[str, Any], **kwargs) -> Response:
+        if not payload.get('app_id'):
+            return self._json(400, {'errors': ['You must include app_id.']})
+        targets = payload.get('include_player_ids') or payload.get('include_external_user_ids')
+        notification_id = str(uuid.uuid4())
+        self.sent_notifications[notification_id] = payload
+        recipients = len(targets) if targets is not None else self.players
+        return self._json(200, {'id': notification_id, 'recipients': recipients,
+                                'external_id': payload.get('external_id')})
+
+    def _view_notifications(self, params: Dict[str, str], **kwargs) -> Response:
+        offset, limit = self._page(params, NOTIFICATIONS_PAGE_SIZE)
+        # Newest first, as OneSignal lists them.
+        newest = self.notifications - 1
+        notifications = [self.notification(newest - position)
+                         for position in range(offset, min(offset + limit, self.notifications))]
+        return self._json(200, {'total_count': self.notifications, 'offset': offset, 'limit': limit,
+                                'notifications': notifications})
+
+    def _notification_by_id(self, notification_id: str) -> Optional[Dict[str, Any]]:
+        if notification_id in self.sent_notifications:
+            return {'id': notification_id, **self.sent_notifications[notification_id]}
+        index = uuid.UUID(notification_id).int & (1 << 62) - 1 if _is_uuid(notification_id) else None
+        if index is not None and index < self.notifications and self.notification(index)['id'] == notification_id:
+            return self.notification(index)
+        return None
+
+    def _view_notification(self, id: str, **kwargs) -> Response:
+        notification = self._notification_by_id(id)
+        if notification is None:
+            return self._json(400, {'errors': ['Could not find notification with id: ' + id]})
+        return self._json(200, notification)
+
+    def _cancel_notification(self, id: str, **kwargs) -> Response:
+        if self._notification_by_id(id) is None:
+            return self._json(400, {'errors': ['Could not find notification with id: ' + id]})
+        return self._json(200, {'success': True})
+
+    def _notification_history(self, id: str, payload: Dict[str, Any], **kwargs) -> Response:
+        notification = self._notification_by_id(id)
+        if notification is None:
+            return self._json(400, {'errors': ['Could not find notification with id: ' + id]})
+        recipients = min(self.players, notification.get('successful', self.players))
+        name = f'history-{id}.csv'
+        self._exports[name] = lambda: _csv_bytes(('player_id',), ((player_id(index),) for index in range(recipients)))
+        return self._json(200, {'success': True, 'destination_url': self._origin + EXPORTS_PATH.format(name=name)})
+
+    def _csv_export(self, **kwargs) -> Response:
+        name = f'{uuid.uuid4()}.csv.gz'
+        self._exports[name] = lambda: gzip.compress(_csv_bytes(_CSV_COLUMNS, self._csv_rows()))
+        return self._json(200, {'csv_file_url': self._origin + EXPORTS_PATH.format(name=name)})
+
+    def _csv_rows(self):
+        for index in range(self.players):
+            player = self.player(index)
+            yield [json.dumps(player[column]) if column == 'tags' else player[column] for column in _CSV_COLUMNS]
+
+    def _download_export(self, name: str) -> Response:
+        if name not in self._exports:
+            return 404, {}, b''
+        self._export_polls[name] += 1
+        if self._export_polls[name] <= self.export_not_ready:
+            # Storage responds with 403 until the file is generated.
+            return 403, {}, b''
+        return 200, {'Content-Type': 'application/octet-stream'}, self._exports[name]()
+
+    def _view_devices(self, params: Dict[str, str], **kwargs) -> Response:
+        offset, limit = self._page(params, DEVICES_PAGE_SIZE)
+        players = [self.player(index) for index in range(offset, min(offset + limit, self.players))]
+        return self._json(200, {'total_count': self.players, 'offset': offset, 'limit': limit, 'players': players})
+
+    def _view_device(self, id: str, **kwargs) -> Response:
+        index = self._player_index(id)
+        if index is None:
+            return self._json(400, {'errors': ['No user with this id found']})
+        return self._json(200, self.player(index))
+
+    def _add_device(self, payload: Dict[str, Any], **kwargs) -> Response:
+        return self._json(200, {'success': True, 'id': str(uuid.uuid4())})
+
+    def _edit_device(self, id: str, payload: Dict[str, Any], **kwargs) -> Response:
+        if self._player_index(id) is None:
+            return self._json(400, {'errors': ['No user with this id found']})
+        updates = self.device_updates.setdefault(id, {})
+        tags = {**updates.get('tags', {}), **payload.get('tags', {})}
+        updates.update({key: value for key, value in payload.items() if key != 'app_id'})
+        if tags:
+            updates['tags'] = tags
+        return self._json(200, {'success': True})
+
+    def _edit_tags(self, user_id: str, payload: Dict[str, Any], **kwargs) -> Response:
+        self.tag_updates.setdefault(user_id, {}).update(payload.get('tags', {}))
+        return self._json(200, {'success': True})
+
+    def _create_segment(self, **kwargs) -> Response:
+        return self._json(201, {'success': True, 'id': str(uuid.uuid4())})
+
+    def _view_outcomes(self, app_id: str, params: Dict[str, str], **kwargs) -> Response:
+        outcomes = []
+        for name in filter(None, params.get('outcome_names', '').split(',')):
+            outcome_id, _, aggregation = name.partition('.')
+            rnd = random.Random(f'{self.seed}/{name}/{params.get("outcome_time_range", "1h")}')
+            outcomes.append({'id': outcome_id, 'value': rnd.randint(0, self.players),
+                             'aggregation': aggregation or 'count'})
+        return self._json(200, {'outcomes': outcomes})
+
+    def _app(self, app_id: str) -> Dict[str, Any]:
+        return {'id': app_id, 'name': 'Stand-in app', 'players': self.players, 'messageable_players': self.players}
+
+    def _view_apps(self, **kwargs) -> Response:
+        return self._json(200, [self._app(str(uuid.UUID(int=self.seed, version=4)))])
+
+    def _view_app(self, app_id: str, **kwargs) -> Response:
+        return self._json(200, self._app(app_id))
+
+    def _create_app(self, payload: Dict[str, Any], **kwargs) -> Response:
+        return self._json(200, {**self._app(str(uuid.uuid4())), **payload})
+
+    def _update_app(self, app_id: str, payload: Dict[str, Any], **kwargs) -> Response:
+        return self._json(200, {**self._app(app_id), **payload})
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _csv_bytes(columns, rows) -> bytes:
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return text.getvalue().encode('utf-8')
@@ -1,17 +1,35 @@
+import json
 from typing import Any, Dict
 
+import httpx
+
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.testing import StandInServer
+
 
 class MockHttpxResponse:
     """A mock response class that implements basic interface for httpx.Response"""
 
-    def __init__(self, status_code: int, body: dict):
+    def __init__(self, status_code: int, body: dict, headers: Dict[str, str] = None):
         self.status_code = status_code
         self.body = body
+        self.headers = httpx.Headers(headers)
+
+    @property
+    def content(self) -> bytes:
+        return json.dumps(self.body).encode()
 
     def json(self) -> dict:
         return self.body
 
 
+def request_body(request_kwargs: Dict[str, Any]) -> Any:
+    """Payload of a mocked request, whether it is passed as `json` or serialised as `content` by a codec."""
+    if 'content' in request_kwargs:
+        return json.loads(request_kwargs['content'])
+    return request_kwargs.get('json')
+
+
 # Check if expected_params is a subset of request_body. Raise Exception if not
 def required_in_request(request_body: Dict[str, Any], expected_params: Dict[str, Any]):
     for key, val in expected_params.items():
@@ -47,14 +65,14 @@ def mock_request(response: MockHttpxResponse = None,
         if required_params is not None and 'params' not in request_kwargs:
             raise Exception('params expected in request but not found!')
 
-        if required_body is not None and 'json' not in request_kwargs:
+        if required_body is not None and request_body(request_kwargs) is None:
             raise Exception('a post body expected in request but not found!')
 
         if required_params is not None:
             required_in_request(request_kwargs['params'], required_params)
 
         if required_body is not None:
-            required_in_request(request_kwargs['json'], required_body)
+            required_in_request(request_body(request_kwargs), required_body)
 
         return response or MockHttpxResponse(200, {'success': True})
 
@@ -62,3 +80,32 @@ def mock_request(response: MockHttpxResponse = None,
         return mocked(method, url, **request_kwargs)
 
     return mocked if not is_async else async_mocked
+
+
+def mock_paginated(records_key: str, records: list, is_async: bool = False):
+    """Mock behaviour of a paginated OneSignal endpoint, serving `records` by `offset` and `limit` params."""
+
+    def mocked(method: str, url: str, **request_kwargs):
+        offset = request_kwargs['params']['offset']
+        limit = request_kwargs['params']['limit']
+        return MockHttpxResponse(200, {
+            'total_count': len(records),
+            'offset': offset,
+            'limit': limit,
+            records_key: records[offset:offset + limit],
+        })
+
+    async def async_mocked(method: str, url: str, **request_kwargs):
+        return mocked(method, url, **request_kwargs)
+
+    return mocked if not is_async else async_mocked
+
+
+def stand_in_client(server: StandInServer, **options) -> Client:
+    """Client sending its requests to the stand-in `server`, with any other client options."""
+    return Client('app-id', 'api-key', 'auth-key', options={'TRANSPORT': server.transport(), **options})
+
+
+def async_stand_in_client(server: StandInServer, **options) -> AsyncClient:
+    """Async client sending its requests to the stand-in `server`, with any other client options."""
+    return AsyncClient('app-id', 'api-key', 'auth-key', options={'TRANSPORT': server.async_transport(), **options})
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+from onesignal_sdk.batching import AsyncUpdateBatcher, UpdateBatcher, merge_update
+from onesignal_sdk.client import AsyncClient, Client
+
+from .mocks import MockHttpxResponse, request_body
+
+
+def recording_request(sent: list, status_code: int = 200):
+    lock = threading.Lock()
+
+    def mocked(method, url, **request_kwargs):
+        with lock:
+            sent.append((url.rsplit('/', 1)[1], request_body(request_kwargs)))
+        return MockHttpxResponse(status_code, {'success': status_code == 200})
+
+    return mocked
+
+
+def test_merge_update():
+    merged = merge_update({'tags': {'a': '1', 'b': '1'}, 'language': 'en'}, {'tags': {'b': '2'}, 'language': 'tr'})
+    assert merged == {'tags': {'a': '1', 'b': '2'}, 'language': 'tr'}
+
+
+class TestUpdateBatcher:
+
+    def test_merges_updates_per_user(self):
+        sent = []
+        client = Client('app-id', 'api-key')
+        with mock.patch('httpx.Client.request', side_effect=recording_request(sent)):
+            with UpdateBatcher(client, flush_interval=60) as batcher:
+                batcher.edit_tags('user-1', {'tags': {'level': '1', 'coins': '5'}})
+                batcher.edit_tags('user-1', {'tags': {'level': '2'}})
+                batcher.edit_tags('user-2', {'tags': {'level': '1'}})
+                batcher.edit_device('device-1', {'language': 'en'})
+
+        assert sorted(sent) == [
+            ('device-1', {'language': 'en', 'app_id': 'app-id'}),
+            ('user-1', {'tags': {'level': '2', 'coins': '5'}}),
+            ('user-2', {'tags': {'level': '1'}}),
+        ]
+        assert (batcher.updates, batcher.sent) == (4, 3)
+
+    def test_flushes_when_full(self):
+        sent = []
+        client = Client('app-id', 'api-key')
+        with mock.patch('httpx.Client.request', side_effect=recording_request(sent)):
+            batcher = UpdateBatcher(client, max_pending=2, flush_interval=60)
+            batcher.edit_tags('user-1', {'tags': {'a': '1'}})
+            batcher.edit_tags('user-2', {'tags': {'a': '1'}})
+            for _ in range(100):
+                if len(sent) == 2:
+                    break
+                threading.Event().wait(0.01)
+            assert len(sent) == 2
+            batcher.close()
+
+    def test_collects_errors(self):
+        client = Client('app-id', 'api-key')
+        with mock.patch('httpx.Client.request', side_effect=recording_request([], status_code=400)):
+            batcher = UpdateBatcher(client, flush_interval=60)
+            batcher.edit_tags('user-1', {'tags': {'a': '1'}})
+            batcher.close()
+        assert batcher.errors[0][:2] == ('edit_tags', 'user-1')
+        with pytest.raises(RuntimeError):
+            batcher.edit_tags('user-1', {})
+
+    def test_background_flush_survives_unexpected_errors(self, caplog):
+        client = mock.Mock()
+        client.edit_tags.side_effect = lambda user_id, body: 1 / int(body['tags']['a'])
+        failing_handler = mock.Mock(side_effect=KeyError('handler'))
+        batcher = UpdateBatcher(client, max_pending=1, flush_interval=60, on_error=failing_handler)
+        batcher.edit_tags('user-1', {'tags': {'a': '0'}})
+        for _ in range(100):
+            if failing_handler.called:
+                break
+            threading.Event().wait(0.01)
+        assert isinstance(failing_handler.call_args[0][3], ZeroDivisionError)
+        assert 'Error handler' in caplog.text
+
+        batcher.edit_tags('user-2', {'tags': {'a': '1'}})
+        for _ in range(100):
+            if client.edit_tags.call_count == 2:
+                break
+            threading.Event().wait(0.01)
+        assert batcher._thread.is_alive()
+        batcher.close()
+        assert client.edit_tags.call_count == 2 and batcher.sent == 2
+
+    def test_failed_flush_restores_updates(self):
+        client = Client('app-id', 'api-key')
+        batcher = UpdateBatcher(client, flush_interval=60)
+        batcher.edit_tags('user-1', {'tags': {'a': '1', 'b': '1'}})
+        with mock.patch('onesignal_sdk.batching.map_bounded', side_effect=RuntimeError), pytest.raises(RuntimeError):
+            batcher.flush()
+        batcher.edit_tags('user-1', {'tags': {'b': '2'}})
+        assert batcher._take() == [('edit_tags', 'user-1', {'tags': {'a': '1', 'b': '2'}})]
+        batcher.close()
+
+
+class TestAsyncUpdateBatcher:
+
+    @pytest.mark.asyncio
+    async def test_merges_and_flushes_periodically(self):
+        sent = []
+        client = AsyncClient('app-id', 'api-key')
+        mocked = recording_request(sent)
+
+        async def async_mocked(*args, **kwargs):
+            return mocked(*args, **kwargs)
+
+        errors = []
+        batcher = AsyncUpdateBatcher(client, flush_interval=0.01, on_error=lambda *error: errors.append(error))
+        with mock.patch('httpx.AsyncClient.request', side_effect=async_mocked):
+            async with batcher:
+                batcher.edit_tags('user-1', {'tags': {'a': '1'}})
+                batcher.edit_tags('user-1', {'tags': {'b': '1'}})
+                await asyncio.sleep(0.05)
+                assert sent == [('user-1', {'tags': {'a': '1', 'b': '1'}})]
+                batcher.edit_tags('user-1', {'tags': {'a': '2'}})
+
+        assert sent[1] == ('user-1', {'tags': {'a': '2'}})
+        assert errors == []
+
+    @pytest.mark.asyncio
+    async def test_background_flush_survives_unexpected_errors(self):
+        calls = []
+
+        class FailingClient:
+            async def edit_tags(self, user_id, body):
+                calls.append(user_id)
+                if user_id == 'user-1':
+                    raise TypeError('not serializable')
+
+        client = FailingClient()
+        errors = []
+        async with AsyncUpdateBatcher(client, flush_interval=0.01,
+                                      on_error=lambda *error: errors.append(error)) as batcher:
+            batcher.edit_tags('user-1', {'tags': {'a': '1'}})
+            await asyncio.sleep(0.05)
+            batcher.edit_tags('user-2', {'tags': {'a': '1'}})
+            await asyncio.sleep(0.05)
+            assert not batcher._task.done()
+        assert [error[1] for error in errors] == ['user-1'] and isinstance(errors[0][3], TypeError)
+        assert calls == ['user-1', 'user-2']
@@ -0,0 +1,104 @@
+from unittest import mock
+
+import pytest
+
+from onesignal_sdk.cache import ResponseCache
+from onesignal_sdk.client import AsyncClient, Client
+
+from .mocks import MockHttpxResponse
+
+
+def view_kwargs(url: str = 'https://onesignal.com/api/v1/players/1', token: str = 'key', **params):
+    return {'method': 'GET', 'url': url, 'token': token, 'params': params}
+
+
+class TestResponseCache:
+
+    def test_key(self):
+        cache = ResponseCache()
+        assert cache.key('view_device', view_kwargs(a=1, b=2)) == cache.key('view_device', view_kwargs(b=2, a=1))
+        assert cache.key('view_device', view_kwargs()) != cache.key('view_device', view_kwargs(token='other'))
+        assert cache.key('view_devices', view_kwargs()) is None
+        assert cache.key('view_device', {**view_kwargs(), 'method': 'PUT'}) is None
+
+    def test_entries_expire(self):
+        cache = ResponseCache({'view_device': 10})
+        key = cache.key('view_device', view_kwargs())
+        cache.set('view_device', key, MockHttpxResponse(200, {}))
+        with mock.patch('time.monotonic', return_value=10 ** 9):
+            assert cache.get(key) is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used_by_count(self):
+        cache = ResponseCache(max_entries=2)
+        keys = [cache.key('view_device', view_kwargs(f'https://onesignal.com/api/v1/players/{i}')) for i in range(3)]
+        cache.set('view_device', keys[0], MockHttpxResponse(200, {}))
+        cache.set('view_device', keys[1], MockHttpxResponse(200, {}))
+        cache.get(keys[0])
+        cache.set('view_device', keys[2], MockHttpxResponse(200, {}))
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+
+    def test_evicts_by_size(self):
+        cache = ResponseCache(max_bytes=1200)
+        keys = [cache.key('view_device', view_kwargs(f'https://onesignal.com/api/v1/players/{i}')) for i in range(2)]
+        cache.set('view_device', keys[0], MockHttpxResponse(200, {'a': 'x' * 200}))
+        cache.set('view_device', keys[1], MockHttpxResponse(200, {'a': 'x' * 200}))
+        assert len(cache) == 1
+        assert cache.size <= 1200
+        cache.set('view_device', keys[0], MockHttpxResponse(200, {'a': 'x' * 2000}))
+        assert len(cache) == 1
+
+    def test_invalidate_url_and_parent(self):
+        cache = ResponseCache()
+        app = cache.key('view_app', view_kwargs('https://onesignal.com/api/v1/apps/1'))
+        apps = cache.key('view_apps', view_kwargs('https://onesignal.com/api/v1/apps'))
+        other = cache.key('view_app', view_kwargs('https://onesignal.com/api/v1/apps/2'))
+        for key in (app, apps, other):
+            cache.set('view_app', key, MockHttpxResponse(200, {}))
+        cache.invalidate('https://onesignal.com/api/v1/apps/1')
+        assert cache.get(app) is None and cache.get(apps) is None
+        assert cache.get(other) is not None
+
+
+class TestClientCache:
+
+    def test_repeated_reads_are_cached(self):
+        client = Client('app-id', 'api-key', options={'RESPONSE_CACHE': ResponseCache()})
+        response = MockHttpxResponse(200, {'id': 'device-1'})
+        with mock.patch('httpx.Client.request', return_value=response) as mocked_request:
+            first = client.view_device('device-1')
+            first.body['id'] = 'changed'
+            second = client.view_device('device-1')
+            client.view_devices()
+            client.view_devices()
+        assert second.body == {'id': 'device-1'}
+        assert mocked_request.call_count == 3
+
+    def test_write_invalidates(self):
+        client = Client('app-id', 'api-key', 'auth-key', options={'RESPONSE_CACHE': ResponseCache()})
+        with mock.patch('httpx.Client.request', return_value=MockHttpxResponse(200, {})) as mocked_request:
+            client.view_apps()
+            client.view_app('app-id')
+            client.update_app('app-id', {'name': 'new'})
+            client.view_apps()
+            client.view_app('app-id')
+        assert mocked_request.call_count == 5
+
+    def test_errors_are_not_cached(self):
+        client = Client('app-id', 'api-key', options={'RESPONSE_CACHE': ResponseCache()})
+        with mock.patch('httpx.Client.request', return_value=MockHttpxResponse(404, {})) as mocked_request:
+            for _ in range(2):
+                with pytest.raises(Exception):
+                    client.view_notification('notification-1')
+        assert mocked_request.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_async_client(self):
+        client = AsyncClient('app-id', 'api-key', options={'RESPONSE_CACHE': ResponseCache()})
+        with mock.patch('httpx.AsyncClient.request', return_value=MockHttpxResponse(200, {})) as mocked_request:
+            await client.view_notification('notification-1')
+            await client.view_notification('notification-1')
+            await client.cancel_notification('notification-1')
+            await client.view_notification('notification-1')
+        assert mocked_request.call_count == 3
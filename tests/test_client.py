@@ -3,8 +3,9 @@ from unittest import mock
 import pytest
 
 from onesignal_sdk.client import Client
+from onesignal_sdk.error import OneSignalHTTPError
 
-from .mocks import MockHttpxResponse, mock_request
+from .mocks import MockHttpxResponse, mock_paginated, mock_request, request_body
 
 
 class TestClient:
@@ -22,7 +23,7 @@ class TestClient:
 
     def test_send_notification(self, client: Client, ok_response: MockHttpxResponse):
         body = {'contents': {'en': 'hey there'}}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -39,7 +40,7 @@ class TestClient:
 
     def test_cancel_notification(self, client: Client, ok_response: MockHttpxResponse):
         notification_id = 'notification-one-id'
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -55,7 +56,7 @@ class TestClient:
 
     def test_view_notification(self, client: Client, ok_response: MockHttpxResponse):
         notification_id = 'notification-one-id'
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -71,7 +72,7 @@ class TestClient:
 
     def test_view_notifications(self, client: Client, ok_response: MockHttpxResponse):
         query = {'limit': 4, 'offset': 10}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -89,7 +90,7 @@ class TestClient:
     def test_notification_history(self, client: Client, ok_response: MockHttpxResponse):
         notification_id = 'notification-one-id'
         body = {'events': 'clicked', 'email': 'test@email.com'}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -104,9 +105,20 @@ class TestClient:
             assert response.status_code == 200
             assert response.body['success']
 
+    def test_changing_app_id(self, client: Client, ok_response: MockHttpxResponse):
+        client.app_id = 'other-app-id'
+        with mock.patch('httpx.Client.request', return_value=ok_response) as mocked_request:
+            client.view_device('player1')
+            client.view_outcomes(['os__click.count'])
+            client.edit_tags('user-1', {'tags': {}})
+        view_device, view_outcomes, edit_tags = mocked_request.call_args_list
+        assert view_device[1]['params'] == {'app_id': 'other-app-id'}
+        assert view_outcomes[0][1].endswith('/apps/other-app-id/outcomes')
+        assert edit_tags[0][1].endswith('/apps/other-app-id/users/user-1')
+
     def test_view_device(self, client: Client, ok_response: MockHttpxResponse):
         device_id = 'player1'
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -122,7 +134,7 @@ class TestClient:
 
     def test_view_devices(self, client: Client, ok_response: MockHttpxResponse):
         query = {'limit': 1, 'offset': 0}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -139,7 +151,7 @@ class TestClient:
 
     def test_add_device(self, client: Client, ok_response: MockHttpxResponse):
         body = {'device_type': 2}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -157,7 +169,7 @@ class TestClient:
     def test_edit_device(self, client: Client, ok_response: MockHttpxResponse):
         device_id = 'player1'
         body = {'language': 'ch'}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -175,7 +187,7 @@ class TestClient:
     def test_edit_tags(self, client: Client, ok_response: MockHttpxResponse):
         user_id = 'some-user'
         body = {'tags': {'rank': ''}}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -190,7 +202,7 @@ class TestClient:
     def test_new_session(self, client: Client, ok_response: MockHttpxResponse):
         device_id = 'player0'
         body = {'game_version': '1.2'}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -208,7 +220,7 @@ class TestClient:
     def test_new_purchase(self, client: Client, ok_response: MockHttpxResponse):
         device_id = 'player0'
         body = {'purchases': [{'sku': 'SKU123'}]}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -225,7 +237,7 @@ class TestClient:
 
     def test_csv_export(self, client: Client, ok_response: MockHttpxResponse):
         body = {'last_active_since': '1469392779'}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -242,7 +254,7 @@ class TestClient:
 
     def test_create_segment(self, client: Client, ok_response: MockHttpxResponse):
         body = {'name': 'new segment'}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -256,7 +268,7 @@ class TestClient:
 
     def test_delete_segment(self, client: Client, ok_response: MockHttpxResponse):
         segment_id = '0bb44ff'
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -269,7 +281,7 @@ class TestClient:
 
     def test_view_outcomes(self, client: Client, ok_response: MockHttpxResponse):
         outcome_names = ['foo', 'bar', 'halt']
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.REST_API_KEY,
@@ -282,7 +294,7 @@ class TestClient:
             assert response.body['success']
 
     def test_view_apps(self, client: Client, ok_response: MockHttpxResponse):
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.USER_AUTH_TOKEN,
@@ -295,7 +307,7 @@ class TestClient:
 
     def test_view_app(self, client: Client, ok_response: MockHttpxResponse):
         app_id = '0fff11'
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.USER_AUTH_TOKEN,
@@ -308,7 +320,7 @@ class TestClient:
 
     def test_create_app(self, client: Client, ok_response: MockHttpxResponse):
         body = {'name': 'new-app', 'chrome_key': 'secret-key'}
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.USER_AUTH_TOKEN,
@@ -323,7 +335,7 @@ class TestClient:
     def test_update_app(self, client: Client, ok_response: MockHttpxResponse):
         body = {'name': 'new-name'}
         app_id = '0fff11'
-        with mock.patch('httpx.request',
+        with mock.patch('httpx.Client.request',
                         side_effect=mock_request(
                             response=ok_response,
                             expected_auth_token=self.USER_AUTH_TOKEN,
@@ -334,3 +346,90 @@ class TestClient:
             response = client.update_app(app_id, body)
             assert response.status_code == 200
             assert response.body['success']
+
+    def test_reuses_connection_pool_between_requests(self, client: Client):
+        http_client = client.http_client
+        with mock.patch('httpx.Client.request', side_effect=mock_request()):
+            client.view_apps()
+            client.view_apps()
+        assert client.http_client is http_client
+
+    def test_closes_connection_pool_on_exit(self):
+        with Client(self.APP_ID, self.REST_API_KEY) as client:
+            assert not client.http_client.is_closed
+        assert client.http_client.is_closed
+
+    def test_connection_pool_options(self):
+        options = {'MAX_CONNECTIONS': 7, 'MAX_KEEPALIVE_CONNECTIONS': 3, 'KEEPALIVE_EXPIRY': 1.5}
+        client = Client(self.APP_ID, self.REST_API_KEY, options=options)
+        limits = client._http_client_kwargs()['limits']
+        assert limits.max_connections == 7
+        assert limits.max_keepalive_connections == 3
+        assert limits.keepalive_expiry == 1.5
+        client.close()
+
+    def test_map(self, client: Client):
+        def mocked(method, url, **request_kwargs):
+            if url.endswith('/users/user-2'):
+                return MockHttpxResponse(400, {'errors': ['Invalid tags']})
+            return MockHttpxResponse(200, {'url': url})
+
+        args = ((f'user-{i}', {'tags': {'level': i}}) for i in range(5))
+        with mock.patch('httpx.Client.request', side_effect=mocked) as mocked_request:
+            results = list(client.map('edit_tags', args, max_workers=2))
+
+        assert mocked_request.call_count == 5
+        assert isinstance(results[2], OneSignalHTTPError)
+        assert [r.body['url'].rsplit('/', 1)[1] for r in results if not isinstance(r, OneSignalHTTPError)] == [
+            'user-0', 'user-1', 'user-3', 'user-4'
+        ]
+
+    def test_map_single_argument(self, client: Client, ok_response: MockHttpxResponse):
+        with mock.patch('httpx.Client.request', side_effect=mock_request(response=ok_response)) as mocked_request:
+            results = list(client.map('view_device', ['a', 'b', 'c']))
+        assert len(results) == 3
+        assert mocked_request.call_count == 3
+
+    @pytest.mark.parametrize('method_name', ['_request', 'map', 'close', 'pool_stats', 'iter_devices',
+                                             'delivery_tracker', 'unknown'])
+    def test_map_rejects_non_endpoint_methods(self, client: Client, method_name: str):
+        with pytest.raises(ValueError):
+            client.map(method_name, [])
+
+    def test_map_validates_max_workers_eagerly(self, client: Client):
+        with pytest.raises(ValueError):
+            client.map('edit_tags', [], max_workers=0)
+
+    def test_send_notification_splits_large_audience(self):
+        client = Client(self.APP_ID, self.REST_API_KEY, options={'MAX_NOTIFICATION_TARGETS': 2})
+        body = {'contents': {'en': 'hey'}, 'include_player_ids': ['a', 'b', 'c', 'd', 'e'], 'external_id': 'key'}
+        sent = []
+
+        def mocked(method, url, **request_kwargs):
+            targets = request_body(request_kwargs)['include_player_ids']
+            sent.append(request_body(request_kwargs))
+            if targets == ['e']:
+                return MockHttpxResponse(400, {'errors': ['Rate limited']})
+            return MockHttpxResponse(200, {'id': targets[0], 'recipients': 2})
+
+        with mock.patch('httpx.Client.request', side_effect=mocked):
+            response = client.send_notification(body)
+
+        assert sorted(chunk['include_player_ids'] for chunk in sent) == [['a', 'b'], ['c', 'd'], ['e']]
+        assert len({chunk['external_id'] for chunk in sent}) == 3
+        assert response.ids == ['a', 'c']
+        assert response.recipients == 4
+        assert response.errors[0].message == 'Rate limited'
+
+    @pytest.mark.parametrize('max_workers', [1, 3])
+    def test_iter_devices(self, client: Client, max_workers: int):
+        players = [{'id': str(i)} for i in range(7)]
+        with mock.patch('httpx.Client.request', side_effect=mock_paginated('players', players)) as mocked_request:
+            devices = list(client.iter_devices({'offset': 1}, page_size=2, max_workers=max_workers))
+        assert devices == players[1:]
+        assert mocked_request.call_count == 3
+
+    def test_iter_notifications(self, client: Client):
+        notifications = [{'id': str(i)} for i in range(5)]
+        with mock.patch('httpx.Client.request', side_effect=mock_paginated('notifications', notifications)):
+            assert list(client.iter_notifications(page_size=2)) == notifications
@@ -1,10 +1,13 @@
+import asyncio
 from unittest import mock
 
+import httpx
 import pytest
 
 from onesignal_sdk.client import AsyncClient
+from onesignal_sdk.error import OneSignalHTTPError
 
-from .mocks import MockHttpxResponse, mock_request
+from .mocks import MockHttpxResponse, mock_paginated, mock_request, request_body
 
 
 class TestClient:
@@ -374,3 +377,114 @@ class TestClient:
             response = await client.update_app(app_id, body)
             assert response.status_code == 200
             assert response.body['success']
+
+    @pytest.mark.asyncio
+    async def test_closes_connection_pool_on_exit(self):
+        async with AsyncClient(self.APP_ID, self.REST_API_KEY) as client:
+            assert not client.http_client.is_closed
+        assert client.http_client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_send_notifications(self, client: AsyncClient):
+        bodies = [{'contents': {'en': str(i)}} for i in range(5)]
+
+        async def mocked(method, url, **request_kwargs):
+            if request_body(request_kwargs)['contents']['en'] == '2':
+                return MockHttpxResponse(400, {'errors': ['Invalid contents']})
+            return MockHttpxResponse(200, {'id': request_body(request_kwargs)['contents']['en']})
+
+        with mock.patch('httpx.AsyncClient.request', side_effect=mocked) as mocked_request:
+            results = await client.send_notifications(bodies, concurrency=2)
+
+        assert mocked_request.call_count == 5
+        assert [r.body['id'] for r in results if not isinstance(r, OneSignalHTTPError)] == ['0', '1', '3', '4']
+        assert isinstance(results[2], OneSignalHTTPError)
+        assert results[2].message == 'Invalid contents'
+
+    @pytest.mark.asyncio
+    async def test_send_notifications_transport_error(self, client: AsyncClient):
+        bodies = [{'contents': {'en': str(i)}} for i in range(3)]
+
+        async def mocked(method, url, **request_kwargs):
+            if request_body(request_kwargs)['contents']['en'] == '1':
+                raise httpx.ConnectTimeout('Timed out')
+            return MockHttpxResponse(200, {'id': request_body(request_kwargs)['contents']['en']})
+
+        with mock.patch('httpx.AsyncClient.request', side_effect=mocked):
+            results = await client.send_notifications(bodies)
+
+        assert results[0].body['id'] == '0' and results[2].body['id'] == '2'
+        assert isinstance(results[1], httpx.ConnectTimeout)
+
+    @pytest.mark.asyncio
+    async def test_send_notification_splits_large_audience(self):
+        client = AsyncClient(self.APP_ID, self.REST_API_KEY, options={'MAX_NOTIFICATION_TARGETS': 2})
+        body = {'contents': {'en': 'hey'}, 'include_external_user_ids': ['a', 'b', 'c']}
+
+        async def mocked(method, url, **request_kwargs):
+            targets = request_body(request_kwargs)['include_external_user_ids']
+            return MockHttpxResponse(200, {'id': 'id', 'recipients': len(targets)})
+
+        with mock.patch('httpx.AsyncClient.request', side_effect=mocked) as mocked_request:
+            response = await client.send_notification(body)
+
+        assert mocked_request.call_count == 2
+        assert response.recipients == 3
+        assert response.errors == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('concurrency', [1, 3])
+    async def test_iter_notifications(self, client: AsyncClient, concurrency: int):
+        notifications = [{'id': str(i)} for i in range(7)]
+        with mock.patch('httpx.AsyncClient.request',
+                        side_effect=mock_paginated('notifications', notifications, is_async=True)) as mocked_request:
+            received = [n async for n in client.iter_notifications(page_size=2, concurrency=concurrency)]
+        assert received == notifications
+        assert mocked_request.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_iter_devices(self, client: AsyncClient):
+        players = [{'id': str(i)} for i in range(3)]
+        with mock.patch('httpx.AsyncClient.request', side_effect=mock_paginated('players', players, is_async=True)):
+            assert [device async for device in client.iter_devices(page_size=2)] == players
+
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_identical_reads(self):
+        client = AsyncClient(self.APP_ID, self.REST_API_KEY, options={'COALESCE_REQUESTS': True})
+
+        async def mocked(method, url, **request_kwargs):
+            await asyncio.sleep(0.01)
+            return MockHttpxResponse(200, {'id': url.rsplit('/', 1)[1]})
+
+        with mock.patch('httpx.AsyncClient.request', side_effect=mocked) as mocked_request:
+            responses = await asyncio.gather(*[client.view_notification('a') for _ in range(5)],
+                                             client.view_notification('b'))
+            await client.view_notification('a')
+        assert [response.body['id'] for response in responses] == ['a'] * 5 + ['b']
+        assert len({id(response) for response in responses}) == 6
+        assert mocked_request.call_count == 3
+        assert client._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_coalesced_errors_and_cancellation(self):
+        client = AsyncClient(self.APP_ID, self.REST_API_KEY, options={'COALESCE_REQUESTS': True})
+
+        async def mocked(method, url, **request_kwargs):
+            await asyncio.sleep(0.01)
+            return MockHttpxResponse(404, {'errors': ['Not found']})
+
+        with mock.patch('httpx.AsyncClient.request', side_effect=mocked) as mocked_request:
+            first = asyncio.ensure_future(client.view_device('a'))
+            second = asyncio.ensure_future(client.view_device('a'))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(OneSignalHTTPError):
+                await second
+        assert mocked_request.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_writes_are_not_coalesced(self):
+        client = AsyncClient(self.APP_ID, self.REST_API_KEY, options={'COALESCE_REQUESTS': True})
+        with mock.patch('httpx.AsyncClient.request', return_value=MockHttpxResponse(200, {})) as mocked_request:
+            await asyncio.gather(*[client.edit_device('a', {'language': 'en'}) for _ in range(3)])
+        assert mocked_request.call_count == 3
@@ -0,0 +1,71 @@
+import datetime
+import json
+
+import pytest
+
+from onesignal_sdk import codec as codec_module
+from onesignal_sdk.codec import JSONCodec, get_codec, register_codec
+from onesignal_sdk.request import _build_request_kwargs
+from onesignal_sdk.response import OneSignalResponse
+
+from .mocks import MockHttpxResponse
+
+
+@pytest.fixture
+def codec_registry(monkeypatch):
+    """Codecs registered by a test are dropped after it."""
+    monkeypatch.setattr(codec_module, '_codecs', dict(codec_module._codecs))
+
+
+class TestCodec:
+
+    def test_stdlib_codec_round_trip(self):
+        codec = get_codec('json')
+        payload = {'contents': {'tr': 'Yeni bildirim'}, 'include_player_ids': ['a']}
+        assert json.loads(codec.dumps(payload).decode('utf-8')) == payload
+        assert codec.loads(codec.dumps(payload)) == payload
+
+    def test_prefers_orjson_when_available(self):
+        pytest.importorskip('orjson')
+        assert get_codec().name == 'orjson'
+
+    def test_register_and_select_codec(self, codec_registry):
+        codec = JSONCodec('test-codec', lambda obj: b'{}', lambda data: {'decoded': True})
+        register_codec(codec)
+        assert get_codec('test-codec') is codec
+        assert get_codec(codec) is codec
+
+    @pytest.mark.parametrize('name', sorted(codec_module._codecs))
+    def test_matches_stdlib_output(self, name):
+        payload = {
+            'contents': {'en': 'Hi', 'tr': 'Yeni bildirim \u2028', 'url': 'https://example.com/a/b'},
+            'tags': {1: 'a', 2.5: 'b', None: 'c', False: 'd'},
+            'data': {'id': 2 ** 70, 'ratio': 0.1 + 0.2, 'items': (1, 'two', None, False), 'control': '\x00"\\'},
+        }
+        assert get_codec(name).dumps(payload) == get_codec('json').dumps(payload)
+
+    @pytest.mark.parametrize('name', sorted(codec_module._codecs))
+    @pytest.mark.parametrize('value', [float('nan'), float('inf'), -float('inf')])
+    def test_non_finite_floats_match_stdlib(self, name, value):
+        payload = {'data': {'value': value, 'values': [1.5, value]}}
+        assert get_codec(name).dumps(payload) == get_codec('json').dumps(payload)
+
+    @pytest.mark.parametrize('name', sorted(codec_module._codecs))
+    def test_rejects_what_stdlib_rejects(self, name):
+        with pytest.raises(TypeError):
+            get_codec(name).dumps({'send_after': datetime.datetime(2020, 1, 1)})
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            get_codec('unknown-codec')
+
+    def test_serialises_payload_with_codec(self):
+        request_kwargs = _build_request_kwargs('token', {'name': 'test'}, codec=get_codec('json'))
+        assert request_kwargs['content'] == b'{"name":"test"}'
+        assert request_kwargs['headers'] == {'Authorization': 'Basic token', 'Content-Type': 'application/json'}
+        assert 'json' not in request_kwargs
+
+    def test_decodes_response_with_codec(self):
+        codec = JSONCodec('decoding-codec', json.dumps, lambda data: {'raw': data.decode()})
+        response = OneSignalResponse(MockHttpxResponse(200, {'id': 1}), codec=codec)
+        assert response.body == {'raw': '{"id": 1}'}
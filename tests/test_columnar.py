@@ -0,0 +1,138 @@
+import math
+from unittest import mock
+
+import httpx
+import pytest
+
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.columnar import ColumnBuilder
+
+from .mocks import mock_paginated
+from .test_export import export_api
+
+ROWS = [
+    ['id', 'device_type', 'session_count', 'tags'],
+    ['player-1', '0', '3', '{"level": "1"}'],
+    ['player-2', '1', '', '{"level": "1"}'],
+    ['player-3', '0', '12'],
+]
+
+DEVICES = [
+    {'id': 'player-1', 'device_type': 1, 'language': 'en', 'tags': {'level': '2', 'a': 'b'}, 'session_count': 4},
+    {'id': 'player-2', 'device_type': 1, 'language': 'tr', 'tags': {'a': 'b', 'level': '2'}},
+]
+
+
+class TestColumnBuilder:
+
+    def test_rows_to_python(self):
+        columns = ColumnBuilder().extend_rows(ROWS).to_python()
+        assert columns['id'] == ['player-1', 'player-2', 'player-3']
+        assert columns['device_type'] == ['0', '1', '0']
+        assert columns['session_count'][0] == 3.0 and math.isnan(columns['session_count'][1])
+        assert columns['tags'] == ['{"level": "1"}', '{"level": "1"}', None]
+
+    def test_timestamps(self):
+        rows = [['id', 'last_active', 'created_at'], ['player-1', '2020-01-01 00:00:10 UTC', '1577836800'],
+                ['player-2', '', '2020-01-01T00:00:00Z']]
+        columns = ColumnBuilder().extend_rows(rows).to_python()
+        assert columns['last_active'][0] == 1577836810.0 and math.isnan(columns['last_active'][1])
+        assert columns['created_at'] == [1577836800.0, 1577836800.0]
+
+    def test_malformed_values_raise(self):
+        builder = ColumnBuilder(['id', 'last_active', 'session_count'])
+        builder.append_row(['player-1', '1577836800', '3'])
+        with pytest.raises(ValueError, match='last_active, row 1'):
+            builder.append_row(['player-2', 'yesterday', '3'])
+        with pytest.raises(ValueError, match='session_count'):
+            ColumnBuilder().append_record({'session_count': 'many'})
+
+    def test_records_add_columns(self):
+        builder = ColumnBuilder().extend_records([{'id': 'player-1', 'language': 'en'},
+                                                  {'id': 'player-2', 'session_count': 4, 'country': 'TR'}])
+        columns = builder.to_python()
+        assert list(columns) == ['id', 'language', 'session_count', 'country']
+        assert columns['language'] == ['en', None] and columns['country'] == [None, 'TR']
+        assert math.isnan(columns['session_count'][0]) and columns['session_count'][1] == 4.0
+        assert ColumnBuilder(['id']).extend_records(DEVICES).columns == ['id']
+
+    def test_categorical_columns_store_distinct_values_once(self):
+        builder = ColumnBuilder().extend_records(DEVICES)
+        tags = builder._buffers[builder.columns.index('tags')]
+        assert tags.categories == ['{"a": "b", "level": "2"}']
+        assert list(tags.codes) == [0, 0]
+
+    def test_unknown_output(self):
+        with pytest.raises(ValueError):
+            ColumnBuilder().to('pandas')
+
+    def test_to_numpy(self):
+        np = pytest.importorskip('numpy')
+        result = ColumnBuilder().extend_rows(ROWS).to_numpy()
+        data = result['data']
+        assert data['id'].tolist() == ['player-1', 'player-2', 'player-3']
+        assert data['device_type'].dtype == np.int32
+        assert result['categories']['device_type'][data['device_type']].tolist() == ['0', '1', '0']
+        assert data['session_count'][2] == 12.0
+        assert result['categories']['tags'].tolist() == ['{"level": "1"}'] and data['tags'].tolist() == [0, 0, -1]
+
+    def test_numpy_timestamps(self):
+        np = pytest.importorskip('numpy')
+        data = ColumnBuilder().extend_records([{'last_active': 1577836800}, {}]).to_numpy()['data']
+        assert data['last_active'][0] == np.datetime64('2020-01-01T00:00:00')
+        assert np.isnat(data['last_active'][1])
+
+    def test_to_arrow(self):
+        pa = pytest.importorskip('pyarrow')
+        table = ColumnBuilder().extend_records(DEVICES).to_arrow()
+        assert pa.types.is_dictionary(table.schema.field('language').type)
+        assert table.column('language').to_pylist() == ['en', 'tr']
+        assert table.column('session_count').to_pylist() == [4.0, None]
+        assert table.num_rows == 2
+
+    def test_arrow_nulls_and_timestamps(self):
+        pa = pytest.importorskip('pyarrow')
+        rows = [['id', 'language', 'session_count', 'last_active'], ['player-1', 'en', '3', '2020-01-01 00:00:10 UTC'],
+                ['player-2', '', '', '']]
+        table = ColumnBuilder().extend_rows(rows).to_arrow()
+        assert [table.column(name).null_count for name in table.column_names] == [0, 1, 1, 1]
+        assert table.column('language').chunk(0).dictionary.to_pylist() == ['en']
+        assert table.schema.field('last_active').type == pa.timestamp('s', tz='UTC')
+        assert table.column('last_active')[0].value == 1577836810
+        assert table.drop_null().num_rows == 1
+
+
+class TestClientColumns:
+
+    def test_device_columns(self):
+        client = Client('app-id', 'api-key')
+        with mock.patch('httpx.Client.request', side_effect=mock_paginated('players', DEVICES)):
+            columns = client.device_columns(output='python', page_size=1)
+        assert columns['language'] == ['en', 'tr']
+
+    def test_csv_export_columns(self):
+        client = Client('app-id', 'api-key')
+        client.http_client = httpx.Client(transport=httpx.MockTransport(export_api))
+        columns = client.csv_export_columns({}, output='python')
+        assert columns['id'] == ['player-1', 'player-2', 'player-3']
+
+    def test_unknown_output_fails_before_requests(self):
+        client = Client('app-id', 'api-key')
+        with mock.patch('httpx.Client.request') as mocked_request, pytest.raises(ValueError):
+            client.csv_export_columns({}, output='pandas')
+        assert not mocked_request.called
+
+    @pytest.mark.asyncio
+    async def test_async_device_columns(self):
+        client = AsyncClient('app-id', 'api-key')
+        mocked = mock_paginated('players', DEVICES, is_async=True)
+        with mock.patch('httpx.AsyncClient.request', side_effect=mocked):
+            columns = await client.device_columns(output='python')
+        assert columns['id'] == ['player-1', 'player-2']
+
+    @pytest.mark.asyncio
+    async def test_async_csv_export_columns(self):
+        client = AsyncClient('app-id', 'api-key')
+        client.http_client = httpx.AsyncClient(transport=httpx.MockTransport(export_api))
+        columns = await client.csv_export_columns({}, output='python')
+        assert columns['tags'][2] == 'çok dilli'
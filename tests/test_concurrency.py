@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from onesignal_sdk.concurrency import gather_bounded, map_bounded
+
+
+class TestGatherBounded:
+
+    @pytest.mark.asyncio
+    async def test_limits_calls_in_flight(self):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def func(item):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return item * 2
+
+        results = await gather_bounded(func, range(10), concurrency=3)
+        assert results == [i * 2 for i in range(10)]
+        assert max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_raises_uncaught_exceptions(self):
+        async def func(item):
+            raise KeyError(item)
+
+        with pytest.raises(KeyError):
+            await gather_bounded(func, [1, 2], concurrency=2)
+
+
+class TestMapBounded:
+
+    def test_yields_results_in_input_order(self):
+        def func(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 2
+
+        assert list(map_bounded(func, range(5), max_workers=5)) == [0, 2, 4, 6, 8]
+
+    def test_consumes_items_lazily(self):
+        consumed = []
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        results = map_bounded(lambda item: item, items(), max_workers=2)
+        assert next(results) == 0
+        assert len(consumed) < 10
+        results.close()
+
+    def test_completion_order(self):
+        def func(item):
+            time.sleep(0.5 if item == 0 else 0)
+            return item * 2
+
+        results = list(map_bounded(func, range(5), max_workers=2, ordered=False))
+        assert results[-1] == (0, 0)
+        assert sorted(results) == [(0, 0), (1, 2), (2, 4), (3, 6), (4, 8)]
+
+    def test_validates_max_workers_eagerly(self):
+        with pytest.raises(ValueError):
+            map_bounded(lambda item: item, [], max_workers=0)
@@ -0,0 +1,126 @@
+import asyncio
+from unittest import mock
+
+import httpx
+import pytest
+
+from onesignal_sdk.client import AsyncClient
+from onesignal_sdk.delivery import DeliveryTracker
+from onesignal_sdk.error import OneSignalHTTPError
+
+FAST = {'min_interval': 0.01, 'max_interval': 0.05}
+
+
+class DeliveringServer:
+    """Transport whose notifications deliver `step` more devices on every poll, out of 100."""
+
+    def __init__(self, step=40, statuses=None):
+        self.step = step
+        self.statuses = dict(statuses or {})
+        self.polls = {}
+        self.in_flight = self.max_in_flight = 0
+
+    async def handler(self, request):
+        notification_id = request.url.path.rsplit('/', 1)[1]
+        self.polls[notification_id] = polls = self.polls.get(notification_id, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.005)
+        self.in_flight -= 1
+        statuses = self.statuses.get(notification_id)
+        if statuses:
+            return httpx.Response(statuses.pop(0), json={'errors': ['Error']})
+        successful = min(100, polls * self.step)
+        return httpx.Response(200, json={
+            'id': notification_id, 'successful': successful, 'failed': 0, 'errored': 0, 'converted': 1,
+            'remaining': 100 - successful, 'completed_at': 1577836800 if successful == 100 else None,
+        })
+
+    def client(self):
+        return AsyncClient('app-id', 'api-key', options={'TRANSPORT': httpx.MockTransport(self.handler)})
+
+
+class TestDeliveryTracker:
+
+    @pytest.mark.asyncio
+    async def test_futures_and_progress(self):
+        server = DeliveringServer()
+        async with server.client().delivery_tracker(concurrency=2, **FAST) as tracker:
+            futures = [tracker.track(f'notification-{index}') for index in range(5)]
+            assert tracker.track('notification-0') is futures[0]
+            assert len(tracker) == 5
+            await asyncio.sleep(0.02)
+            progress = tracker.progress()
+            assert 0 < progress.successful < 500 and progress.completed == 0
+
+            notifications = await asyncio.gather(*futures)
+            assert [notification['successful'] for notification in notifications] == [100] * 5
+            assert tracker.progress().as_dict() == {
+                'tracked': 5, 'completed': 5, 'errors': 0, 'successful': 500, 'failed': 0, 'errored': 0,
+                'converted': 5, 'remaining': 0,
+            }
+            assert len(tracker) == 0 and tracker._tracked == {}
+        assert server.max_in_flight == 2
+        assert set(server.polls.values()) == {3}
+
+    @pytest.mark.asyncio
+    async def test_errors(self):
+        server = DeliveringServer(step=100, statuses={'missing': [400], 'flaky': [500, 503]})
+        tracker = server.client().delivery_tracker(**FAST)
+        missing, flaky, canceled = tracker.track('missing'), tracker.track('flaky'), tracker.track('canceled', 0.05)
+        canceled.cancel()
+        with pytest.raises(OneSignalHTTPError):
+            await missing
+        assert (await flaky)['successful'] == 100
+        await tracker.join()
+        progress = tracker.progress()
+        assert (progress.tracked, progress.completed, progress.errors) == (3, 1, 1)
+        await asyncio.sleep(0.1)
+        assert 'canceled' not in server.polls
+
+        later = tracker.track('later', delay=10)
+        await tracker.aclose()
+        assert later.cancelled()
+        with pytest.raises(RuntimeError):
+            tracker.track('another')
+
+    @pytest.mark.asyncio
+    async def test_unexpected_errors_fail_the_future(self):
+        server = DeliveringServer(step=100)
+
+        async def handler(request):
+            if request.url.path.endswith('/malformed'):
+                return httpx.Response(200, content=b'<html>')
+            return await server.handler(request)
+
+        client = AsyncClient('app-id', 'api-key', options={'TRANSPORT': httpx.MockTransport(handler)})
+        async with client.delivery_tracker(concurrency=1, **FAST) as tracker:
+            malformed, delivered = tracker.track('malformed'), tracker.track('delivered', 0.02)
+            with pytest.raises(ValueError):
+                await malformed
+            assert (await delivered)['successful'] == 100
+            assert (tracker.progress().completed, tracker.progress().errors) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_adaptive_intervals(self):
+        tracker = DeliveryTracker(DeliveringServer().client(), min_interval=1, max_interval=61, backoff=2)
+        tracker.track('notification', delay=100)
+        tracked = tracker._tracked['notification']
+
+        def poll(at, **stats):
+            with mock.patch('time.monotonic', return_value=at):
+                tracker._update(tracked, {'successful': 0, 'remaining': 1000, **stats})
+            return tracked.interval
+
+        assert poll(0) == 1
+        # A tenth delivered, a tenth of the way to the longest interval.
+        assert poll(2, successful=100, remaining=900) == 7
+        # Delivery stalls, back off.
+        assert poll(9, successful=100, remaining=900) == 14
+        assert poll(23, successful=100, remaining=900) == 28
+        assert poll(51, successful=100, remaining=900) == 56
+        assert poll(107, successful=100, remaining=900) == 61
+        # Back off further as remaining approaches zero.
+        assert poll(168, successful=500, remaining=500) == 31
+        assert poll(199, successful=999, remaining=1) == pytest.approx(60.94)
+        await tracker.aclose()
@@ -1,3 +1,5 @@
+from unittest import mock
+
 from onesignal_sdk.error import OneSignalHTTPError
 
 from .mocks import MockHttpxResponse
@@ -21,3 +23,9 @@ class TestOneSignalHTTPError:
         error = OneSignalHTTPError(response)
         assert error.message == 'Unexpected http status code 500.'
         assert error.status_code == 500
+
+    def test_uses_default_message_for_non_json_response(self):
+        response = mock.Mock(status_code=502)
+        response.json.side_effect = ValueError('Expecting value')
+        error = OneSignalHTTPError(response)
+        assert error.message == 'Unexpected http status code 502.'
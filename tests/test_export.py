@@ -0,0 +1,205 @@
+import asyncio
+import csv
+import gzip
+import io
+from unittest import mock
+
+import httpx
+import pytest
+
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.error import OneSignalHTTPError
+from onesignal_sdk.export import (
+    CSVRowParser, aiter_remote_csv, iter_column, iter_records, iter_remote_csv,
+    write_values,
+)
+from onesignal_sdk.testing import StandInServer, player_id
+
+ROWS = [
+    ['id', 'device_type', 'tags'],
+    ['player-1', '0', '{"level": "1"}'],
+    ['player-2', '1', 'multi\nline "quoted" value'],
+    ['player-3', '2', 'çok dilli'],
+]
+
+
+def csv_bytes(rows=ROWS) -> bytes:
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return text.getvalue().encode('utf-8')
+
+
+def parse_in_chunks(data: bytes, chunk_size: int):
+    parser = CSVRowParser()
+    rows = []
+    for start in range(0, len(data), chunk_size):
+        rows.extend(parser.feed(data[start:start + chunk_size]))
+    return rows + parser.close()
+
+
+def file_server(data: bytes, not_ready: int = 0):
+    """Transport serving `data` after responding 404 `not_ready` times."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) <= not_ready:
+            return httpx.Response(404, content=b'<Error>NoSuchKey</Error>')
+        return httpx.Response(200, content=data)
+
+    return handler, calls
+
+
+class TestCSVRowParser:
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 1024])
+    def test_parses_plain_csv_in_chunks(self, chunk_size):
+        assert parse_in_chunks(csv_bytes(), chunk_size) == ROWS
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 1024])
+    def test_parses_gzipped_csv_in_chunks(self, chunk_size):
+        assert parse_in_chunks(gzip.compress(csv_bytes()), chunk_size) == ROWS
+
+    def test_parses_concatenated_gzip_members(self):
+        data = gzip.compress(csv_bytes(ROWS[:2])) + gzip.compress(csv_bytes(ROWS[2:]))
+        assert parse_in_chunks(data, 10) == ROWS
+
+    def test_parses_last_row_without_newline_and_bom(self):
+        assert parse_in_chunks(b'\xef\xbb\xbfid,name\r\n1,foo', 4) == [['id', 'name'], ['1', 'foo']]
+
+
+class TestIterRemoteCSV:
+
+    def test_polls_until_file_is_ready(self):
+        handler, calls = file_server(gzip.compress(csv_bytes()), not_ready=2)
+        http_client = httpx.Client(transport=httpx.MockTransport(handler))
+        with mock.patch('time.sleep') as sleep:
+            rows = list(iter_remote_csv(http_client, 'https://s3/export.csv.gz',
+                                        poll_interval=1, poll_max_interval=30, timeout=60))
+        assert rows == ROWS
+        assert len(calls) == 3
+        assert [c[0][0] for c in sleep.call_args_list] == [1, 2]
+
+    def test_spools_to_disk(self, tmp_path):
+        handler, _ = file_server(gzip.compress(csv_bytes()))
+        spool_path = tmp_path / 'export.csv.gz'
+        rows = list(iter_remote_csv(httpx.Client(transport=httpx.MockTransport(handler)), 'https://s3/export.csv.gz',
+                                    poll_interval=1, poll_max_interval=30, timeout=60, spool=spool_path))
+        assert rows == ROWS
+        assert gzip.decompress(spool_path.read_bytes()) == csv_bytes()
+
+    def test_raises_timeout_when_file_is_never_ready(self):
+        handler, _ = file_server(b'', not_ready=100)
+        with mock.patch('time.sleep'), pytest.raises(TimeoutError):
+            list(iter_remote_csv(httpx.Client(transport=httpx.MockTransport(handler)), 'https://s3/export.csv.gz',
+                                 poll_interval=1, poll_max_interval=30, timeout=5))
+
+    def test_raises_for_unexpected_status(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(500, json={'errors': ['Server error']}))
+        with pytest.raises(OneSignalHTTPError):
+            list(iter_remote_csv(httpx.Client(transport=transport), 'https://s3/export.csv.gz',
+                                 poll_interval=1, poll_max_interval=30, timeout=5))
+
+    @pytest.mark.asyncio
+    async def test_async_polls_until_file_is_ready(self):
+        handler, calls = file_server(gzip.compress(csv_bytes()), not_ready=1)
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        rows = [row async for row in aiter_remote_csv(http_client, 'https://s3/export.csv.gz', poll_interval=0.01,
+                                                      poll_max_interval=1, timeout=60)]
+        assert rows == ROWS
+        assert len(calls) == 2
+
+    def test_iter_records(self):
+        assert list(iter_records(iter(ROWS[:2]))) == [{'id': 'player-1', 'device_type': '0', 'tags': '{"level": "1"}'}]
+
+    @pytest.mark.asyncio
+    async def test_async_parses_while_downloading(self):
+        rows = [['player_id', 'index']] + [[f'player-{index}', str(index)] for index in range(100000)]
+        handler, _ = file_server(csv_bytes(rows))
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        received = [row async for row in aiter_remote_csv(http_client, 'https://s3/history.csv', poll_interval=0.01,
+                                                          poll_max_interval=1, timeout=60)]
+        assert received == rows
+
+    @pytest.mark.asyncio
+    async def test_async_stops_early(self):
+        rows = [['player_id']] + [[f'player-{index}'] for index in range(100000)]
+        handler, _ = file_server(csv_bytes(rows))
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        stream = aiter_remote_csv(http_client, 'https://s3/history.csv', poll_interval=0.01, poll_max_interval=1,
+                                  timeout=60)
+        async for row in stream:
+            if row == ['player-10']:
+                break
+        await stream.aclose()
+        # The download task stopped instead of waiting for room in the full queue.
+        await asyncio.sleep(0.01)
+        assert [task for task in asyncio.all_tasks() if '_download' in repr(task)] == []
+
+    def test_iter_column(self):
+        assert list(iter_column(iter(ROWS), 'device_type')) == ['0', '1', '2']
+        assert list(iter_column(iter([]), 'device_type')) == []
+        with pytest.raises(ValueError):
+            list(iter_column(iter(ROWS), 'player_id'))
+
+    def test_write_values(self, tmp_path):
+        players = set()
+        assert write_values(iter(['a', 'b', 'a']), players) == 3
+        assert players == {'a', 'b'}
+        text = io.StringIO()
+        assert write_values(iter(['a', 'b']), text) == 2
+        assert text.getvalue() == 'a\nb\n'
+        assert write_values(iter(['c']), str(tmp_path / 'ids.txt')) == 1
+        assert (tmp_path / 'ids.txt').read_text() == 'c\n'
+
+
+def export_api(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith('/players/csv_export'):
+        return httpx.Response(200, json={'csv_file_url': 'https://s3/export.csv.gz'})
+    return httpx.Response(200, content=gzip.compress(csv_bytes()))
+
+
+class TestCSVExportStream:
+
+    def test_client_csv_export_stream(self):
+        client = Client('app-id', 'api-key')
+        client.http_client = httpx.Client(transport=httpx.MockTransport(export_api))
+        players = list(client.csv_export_stream({'extra_fields': ['country']}))
+        assert [player['id'] for player in players] == ['player-1', 'player-2', 'player-3']
+
+    @pytest.mark.asyncio
+    async def test_async_client_csv_export_stream(self):
+        client = AsyncClient('app-id', 'api-key')
+        client.http_client = httpx.AsyncClient(transport=httpx.MockTransport(export_api))
+        players = [player async for player in client.csv_export_stream({})]
+        assert players[2]['tags'] == 'çok dilli'
+
+
+class TestNotificationHistoryStream:
+
+    def test_client(self, tmp_path):
+        server = StandInServer(players=500, export_not_ready=2)
+        client = Client('app-id', 'api-key', options={'TRANSPORT': server.transport()})
+        notification = server.notification(0)
+        player_ids = list(client.notification_history_stream(notification['id'], poll_interval=0.001))
+        assert player_ids == [player_id(index) for index in range(notification['successful'])]
+        assert server.stats['POST /notifications/{id}/history'] == 1
+
+        count = client.notification_history_into(notification['id'], tmp_path / 'sent.txt', events='clicked',
+                                                 poll_interval=0.001)
+        assert count == len(player_ids)
+        assert (tmp_path / 'sent.txt').read_text().splitlines() == player_ids
+
+    @pytest.mark.asyncio
+    async def test_async_client(self):
+        server = StandInServer(players=500, export_not_ready=1)
+        client = AsyncClient('app-id', 'api-key', options={'TRANSPORT': server.async_transport()})
+        notification = server.notification(1)
+        stream = client.notification_history_stream(notification['id'], poll_interval=0.001)
+        player_ids = [player async for player in stream]
+        assert player_ids == [player_id(index) for index in range(notification['successful'])]
+
+        recipients = set()
+        count = await client.notification_history_into(notification['id'], recipients, poll_interval=0.001)
+        assert count == len(player_ids)
+        assert recipients == set(player_ids)
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+from unittest import mock
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import httpx
+import pytest
+
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.error import OneSignalHTTPError
+from onesignal_sdk.metrics import (
+    TRACE_SUPPORTED, OpenTelemetrySpans, PrometheusMetrics, RequestMetrics,
+)
+from onesignal_sdk.retry import RetryPolicy
+from onesignal_sdk.testing import StandInServer, player_id
+
+from .mocks import MockHttpxResponse
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in_url():
+    """Url of a stand-in server listening on a local port, for requests over real connections."""
+    server = StandInServer(players=10)
+    httpd = make_server('127.0.0.1', 0, server.wsgi, handler_class=QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}/api/v1'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def recording_client(**options):
+    recorded = []
+    client = Client('app-id', 'api-key', options={'METRICS_HOOKS': [recorded.append], **options})
+    return client, recorded
+
+
+class TestClientMetrics:
+
+    def test_successful_request(self):
+        client, recorded = recording_client()
+        with mock.patch('httpx.Client.request', return_value=MockHttpxResponse(200, {'id': 'd'})) as mocked_request:
+            client.edit_device('device-1', {'language': 'en'})
+        metrics, = recorded
+        assert (metrics.endpoint, metrics.method, metrics.status_code) == ('edit_device', 'PUT', 200)
+        assert metrics.url == 'https://onesignal.com/api/v1/players/device-1'
+        assert (metrics.attempts, metrics.retries, metrics.error) == (1, 0, None)
+        assert metrics.bytes_sent == len(mocked_request.call_args[1]['content'])
+        assert metrics.bytes_received == len(b'{"id": "d"}')
+        assert metrics.total > 0
+        # Mocked requests are not traced.
+        assert metrics.ttfb is None and metrics.connect is None
+        assert ('extensions' in mocked_request.call_args[1]) == TRACE_SUPPORTED
+
+    def test_retries_and_errors(self):
+        client, recorded = recording_client(RETRY_POLICY=RetryPolicy(backoff_base=0))
+        responses = [MockHttpxResponse(503, {}), MockHttpxResponse(503, {}), MockHttpxResponse(404, {})]
+        with mock.patch('httpx.Client.request', side_effect=responses):
+            with pytest.raises(OneSignalHTTPError):
+                client.view_device('device-1')
+        metrics, = recorded
+        assert (metrics.attempts, metrics.retries, metrics.status_code) == (3, 2, 404)
+        assert isinstance(metrics.error, OneSignalHTTPError)
+
+        with mock.patch('httpx.Client.request', side_effect=httpx.ConnectError('refused')):
+            with pytest.raises(httpx.ConnectError):
+                client.view_apps()
+        assert recorded[1].status_code is None
+        assert isinstance(recorded[1].error, httpx.ConnectError)
+
+    def test_failing_hook(self, caplog):
+        def failing_hook(metrics):
+            raise ValueError('Exporter is down')
+
+        recorded = []
+        client = Client('app-id', 'api-key', options={'METRICS_HOOKS': [failing_hook, recorded.append]})
+        with mock.patch('httpx.Client.request', return_value=MockHttpxResponse(200, {'id': 'n'})):
+            assert client.send_notification({'contents': {'en': 'Hi'}}).body == {'id': 'n'}
+        assert len(recorded) == 1
+        assert 'Exporter is down' in caplog.text
+
+    def test_no_hooks(self):
+        client = Client('app-id', 'api-key')
+        with mock.patch('httpx.Client.request', return_value=MockHttpxResponse(200, {})) as mocked_request:
+            client.view_device('device-1')
+        assert 'extensions' not in mocked_request.call_args[1]
+
+    @pytest.mark.skipif(not TRACE_SUPPORTED, reason='httpx before 0.21 does not trace requests.')
+    def test_traced_phases(self, stand_in_url):
+        client, recorded = recording_client(API_ROOT=stand_in_url)
+        client.view_device(player_id(1))
+        metrics, = recorded
+        assert metrics.status_code == 200
+        assert metrics.connect is not None and metrics.tls is None
+        assert 0 <= metrics.pool_wait <= metrics.ttfb <= metrics.total
+        assert metrics.download is not None
+        assert set(metrics.durations()) == {'total', 'rate_limit_wait', 'pool_wait', 'connect', 'ttfb', 'download'}
+
+    @pytest.mark.asyncio
+    async def test_async_client(self):
+        recorded = []
+        server = StandInServer(players=10, latency=0.01)
+        client = AsyncClient('app-id', 'api-key', options={
+            'TRANSPORT': server.async_transport(), 'COALESCE_REQUESTS': True, 'METRICS_HOOKS': [recorded.append],
+        })
+        await asyncio.gather(*[client.view_device(player_id(1)) for _ in range(3)])
+        # Coalesced callers share a single request.
+        metrics, = recorded
+        assert (metrics.endpoint, metrics.status_code) == ('view_device', 200)
+
+
+class TestExporters:
+
+    def metrics(self, status_code=200, error=None):
+        metrics = RequestMetrics('view_device', 'GET', 'https://onesignal.com/api/v1/players/1')
+        metrics.start_attempt(0, 0, 0)
+        metrics.end_attempt(MockHttpxResponse(status_code, {}) if status_code is not None else None)
+        metrics.ttfb = 0.05
+        metrics.finish(error)
+        return metrics
+
+    def test_prometheus(self):
+        prometheus_client = pytest.importorskip('prometheus_client')
+        registry = prometheus_client.CollectorRegistry()
+        hook = PrometheusMetrics(registry=registry)
+        hook(self.metrics())
+        hook(self.metrics(status_code=None, error=httpx.ConnectError('refused')))
+        labels = {'endpoint': 'view_device', 'method': 'GET'}
+        assert registry.get_sample_value('onesignal_requests_total', {**labels, 'status': '200'}) == 1
+        assert registry.get_sample_value('onesignal_requests_total', {**labels, 'status': 'error'}) == 1
+        assert registry.get_sample_value('onesignal_request_duration_seconds_count', labels) == 2
+        assert registry.get_sample_value('onesignal_request_phase_seconds_count',
+                                         {'endpoint': 'view_device', 'phase': 'ttfb'}) == 2
+        assert registry.get_sample_value('onesignal_request_bytes_total',
+                                         {'endpoint': 'view_device', 'direction': 'received'}) == 2
+
+    def test_opentelemetry(self):
+        pytest.importorskip('opentelemetry.sdk')
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+        from opentelemetry.trace import SpanKind, StatusCode
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        hook = OpenTelemetrySpans(provider.get_tracer('test'))
+        hook(self.metrics())
+        hook(self.metrics(status_code=404))
+        ok, failed = exporter.get_finished_spans()
+        assert (ok.name, ok.kind) == ('onesignal.view_device', SpanKind.CLIENT)
+        assert ok.attributes['http.response.status_code'] == 200
+        assert ok.attributes['onesignal.ttfb'] == 0.05
+        assert ok.end_time >= ok.start_time
+        assert failed.status.status_code == StatusCode.ERROR
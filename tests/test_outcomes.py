@@ -0,0 +1,111 @@
+import httpx
+import pytest
+
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.constants import VIEW_OUTCOMES_PATH
+from onesignal_sdk.outcomes import (
+    AsyncOutcomesAggregator, OutcomesAggregator, OutcomeTotals,
+)
+from onesignal_sdk.registry import ClientRegistry
+from onesignal_sdk.testing import StandInServer
+
+NAMES = ['os__click.count', 'os__session_duration.sum']
+WINDOWS = [{'outcome_time_range': '1h'}, {'outcome_time_range': '30d'}]
+LAST_HOUR = (('outcome_time_range', '1h'),)
+
+
+def counting_transport(requests, failing_app=None):
+    server = StandInServer(players=1000)
+
+    def handler(request):
+        requests.append(request)
+        if failing_app is not None and failing_app in str(request.url):
+            return httpx.Response(400, json={'errors': ['Invalid app']})
+        status_code, headers, body = server.handle(request.method, request.url.path, request.url.query.decode(),
+                                                   dict(request.headers))
+        return httpx.Response(status_code, headers=headers, content=body)
+    return handler
+
+
+class TestOutcomeTotals:
+
+    def test_merge(self):
+        totals = OutcomeTotals()
+        totals.merge('app-1', [{'id': 'os__click', 'value': 3, 'aggregation': 'count'},
+                               {'id': 'purchase', 'value': 9.5, 'aggregation': 'sum'}])
+        totals.merge('app-2', [{'id': 'os__click', 'value': 4, 'aggregation': 'count'}])
+        totals.merge('app-1', [{'id': 'os__click', 'value': 1, 'aggregation': 'count'}])
+        assert totals['os__click.count'] == totals[(), 'os__click.count'] == 8
+        assert totals.totals == {((), 'os__click.count'): {'sum': 8, 'count': 3},
+                                 ((), 'purchase.sum'): {'sum': 9.5, 'count': 1}}
+        assert totals.by_app == {'app-1': {((), 'os__click.count'): 4, ((), 'purchase.sum'): 9.5},
+                                 'app-2': {((), 'os__click.count'): 4}}
+
+    def test_windows_are_not_added_up(self):
+        totals = OutcomeTotals()
+        totals.merge('app-1', [{'id': 'os__click', 'value': 3}], {'outcome_time_range': '1d'})
+        totals.merge('app-1', [{'id': 'os__click', 'value': 40}], {'outcome_time_range': '30d'})
+        assert totals[{'outcome_time_range': '1d'}, 'os__click.count'] == 3
+        assert totals[(('outcome_time_range', '30d'),), 'os__click.count'] == 40
+        with pytest.raises(KeyError):
+            totals['os__click.count']
+
+
+class TestOutcomesAggregator:
+
+    def test_aggregates_apps_and_windows(self):
+        requests = []
+        handler = counting_transport(requests, failing_app='app-3')
+        with ClientRegistry({'app-1': 'key-1', 'app-2': 'key-2', 'app-3': 'key-3'},
+                            options={'TRANSPORT': httpx.MockTransport(handler), 'RESPONSE_CACHE': None}) as registry:
+            aggregator = OutcomesAggregator(registry)
+            totals = aggregator.aggregate(NAMES, WINDOWS, max_workers=4)
+            assert len(requests) == 6
+
+            # The stand-in answers the same values for every app.
+            assert totals.by_app['app-1'] == totals.by_app['app-2']
+            assert totals.totals[(LAST_HOUR, 'os__click.count')]['count'] == 2
+            assert totals[WINDOWS[0], 'os__click.count'] == 2 * totals.by_app['app-1'][(LAST_HOUR, 'os__click.count')]
+            assert set(totals.errors) == {('app-3', (('outcome_time_range', '1h'),)),
+                                          ('app-3', (('outcome_time_range', '30d'),))}
+            assert totals.errors[('app-3', (('outcome_time_range', '1h'),))].status_code == 400
+
+            # Only the last hour is fetched again, 30 day totals are reused.
+            refreshed = aggregator.aggregate(NAMES, WINDOWS, app_ids=['app-1', 'app-2'])
+            assert len(requests) == 8
+            assert all('outcome_time_range=1h' in str(request.url) for request in requests[6:])
+            assert refreshed.by_app == totals.by_app
+
+            aggregator.clear()
+            aggregator.aggregate(NAMES, WINDOWS, app_ids=['app-1'])
+            assert len(requests) == 10
+
+    def test_default_window_is_not_cached(self):
+        requests = []
+        handler = counting_transport(requests)
+        client = Client('app-1', 'key-1', options={'TRANSPORT': httpx.MockTransport(handler), 'RESPONSE_CACHE': None})
+        aggregator = OutcomesAggregator({'app-1': client}, ttls={'1h': 60})
+        aggregator.aggregate(NAMES)
+        aggregator.aggregate(NAMES, [{'outcome_time_range': '1d'}])
+        aggregator.aggregate(NAMES)
+        aggregator.aggregate(NAMES, [{'outcome_time_range': '1d'}])
+        assert len(requests) == 3
+
+
+class TestAsyncOutcomesAggregator:
+
+    @pytest.mark.asyncio
+    async def test_aggregates_apps_and_windows(self):
+        server = StandInServer(players=1000, latency=0.01)
+        clients = {app_id: AsyncClient(app_id, 'api-key', options={'TRANSPORT': server.async_transport(),
+                                                                   'RESPONSE_CACHE': None})
+                   for app_id in ('app-1', 'app-2', 'app-3')}
+        aggregator = AsyncOutcomesAggregator(clients)
+        totals = await aggregator.aggregate(NAMES, WINDOWS, concurrency=6)
+        assert server.max_in_flight > 1
+        assert totals.totals[(LAST_HOUR, 'os__session_duration.sum')]['count'] == 3
+        assert len(totals.by_app) == 3 and not totals.errors
+
+        refreshed = await aggregator.aggregate(NAMES, WINDOWS, concurrency=6)
+        assert refreshed.totals == totals.totals
+        assert server.stats[f'GET {VIEW_OUTCOMES_PATH}'] == 9
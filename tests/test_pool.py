@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from onesignal_sdk.client import AsyncClient, Client
+from onesignal_sdk.metrics import RequestMetrics
+from onesignal_sdk.pool import PoolMonitor, PoolSaturationWarning
+from onesignal_sdk.retry import RetryPolicy
+from onesignal_sdk.testing import StandInServer
+
+
+@pytest.fixture
+def blocking_server():
+    """Keep-alive server whose responses are held back until its `release` event is set."""
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            release.wait(5)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.release = release
+    httpd.url = f'http://127.0.0.1:{httpd.server_port}/api/v1'
+    yield httpd
+    release.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+class TestPoolMonitor:
+
+    def metrics(self, pool_wait, connect=None):
+        metrics = RequestMetrics('view_device', 'GET', 'https://onesignal.com/api/v1/players/1')
+        metrics.pool_wait, metrics.connect = pool_wait, connect
+        return metrics
+
+    def test_wait_percentiles(self):
+        monitor = PoolMonitor(window=100, wait_threshold=None)
+        for wait in range(200):
+            monitor(self.metrics(wait / 1000, connect=0.001 if wait < 5 else None))
+        monitor(self.metrics(None))
+        assert monitor.wait_percentiles() == {'p50': 0.149, 'p90': 0.189, 'p99': 0.198, 'max': 0.199}
+        assert (monitor.requests, monitor.connections_opened) == (200, 5)
+
+    def test_saturation(self):
+        saturated = []
+        monitor = PoolMonitor(wait_threshold=0.1, on_saturation=saturated.append)
+        monitor(self.metrics(0.05))
+        monitor(self.metrics(0.5))
+        assert [metrics.pool_wait for metrics in saturated] == [0.5]
+        with pytest.warns(PoolSaturationWarning):
+            PoolMonitor(wait_threshold=0.1)(self.metrics(0.5))
+
+
+class TestPoolStats:
+
+    def test_active_idle_and_queued(self, blocking_server):
+        monitor = PoolMonitor(wait_threshold=None)
+        # Handing a connection over to a queued request can race with httpcore dropping it, retry as clients would.
+        client = Client('app-id', 'api-key', options={
+            'API_ROOT': blocking_server.url, 'MAX_CONNECTIONS': 2, 'METRICS_HOOKS': [monitor],
+            'RETRY_POLICY': RetryPolicy(backoff_base=0),
+        })
+        with ThreadPoolExecutor(5) as executor:
+            futures = [executor.submit(client.view_device, f'device-{i}') for i in range(5)]
+            wait_until(lambda: client.pool_stats().queued == 3)
+            stats = client.pool_stats()
+            assert (stats.active, stats.idle, stats.max_connections) == (2, 0, 2)
+            time.sleep(0.05)
+            blocking_server.release.set()
+            for future in futures:
+                future.result()
+
+        stats = client.pool_stats()
+        assert (stats.active, stats.idle, stats.queued) == (0, 2, 0)
+        assert stats.requests == 5
+        assert stats.connections_closed == stats.connections_opened - 2
+        assert stats.wait_p50 <= stats.wait_p99 <= stats.wait_max
+        # Queued requests waited for the first responses, which were held back.
+        assert stats.wait_max > 0.05
+        client.close()
+
+    def test_without_monitor(self):
+        stats = Client('app-id', 'api-key').pool_stats()
+        assert (stats.active, stats.idle, stats.queued) == (0, 0, 0)
+        assert stats.wait_p99 is None and stats.connections_opened == 0
+
+    @pytest.mark.asyncio
+    async def test_custom_transport(self):
+        client = AsyncClient('app-id', 'api-key', options={
+            'TRANSPORT': StandInServer(players=1).async_transport(), 'METRICS_HOOKS': [PoolMonitor()],
+        })
+        await client.view_apps()
+        stats = client.pool_stats()
+        assert (stats.active, stats.queued, stats.requests) == (None, None, 0)
+        assert stats.as_dict()['wait_p50'] is None
@@ -0,0 +1,96 @@
+import httpx
+import pytest
+
+from onesignal_sdk.cache import ResponseCache
+from onesignal_sdk.error import OneSignalHTTPError
+from onesignal_sdk.registry import AsyncClientRegistry, ClientRegistry
+from onesignal_sdk.response import OneSignalResponse
+
+
+def recording_transport(requests, failing_app=None):
+    def handler(request):
+        requests.append(request)
+        if failing_app is not None and failing_app in str(request.url):
+            return httpx.Response(400, json={'errors': ['Invalid app']})
+        return httpx.Response(200, json={'outcomes': []})
+    return handler
+
+
+class TestClientRegistry:
+
+    def test_clients_share_the_pool_and_options(self):
+        requests = []
+        cache = ResponseCache()
+        registry = ClientRegistry({'app-1': 'key-1', 'app-2': ('key-2', 'auth-2')}, options={
+            'TRANSPORT': httpx.MockTransport(recording_transport(requests)), 'RESPONSE_CACHE': None,
+            'MAX_NOTIFICATION_TARGETS': 10,
+        })
+        registry.add('app-3', 'key-3', options={'RESPONSE_CACHE': cache})
+        assert list(registry) == ['app-1', 'app-2', 'app-3'] and 'app-2' in registry
+
+        first, second, third = registry['app-1'], registry['app-2'], registry.client('app-3')
+        assert registry['app-1'] is first
+        assert first.http_client is second.http_client is registry.http_client
+        assert (second.rest_api_key, second.user_auth_key) == ('key-2', 'auth-2')
+        assert first._options['MAX_NOTIFICATION_TARGETS'] == 10
+        assert third._options['RESPONSE_CACHE'] is cache
+
+        first.view_outcomes(['os__click.count'])
+        second.view_outcomes(['os__click.count'])
+        assert [request.headers['Authorization'] for request in requests] == ['Basic key-1', 'Basic key-2']
+
+        # Closing a client of the registry leaves the shared pool open.
+        first.close()
+        second.view_outcomes(['os__click.count'])
+        registry.close()
+        assert registry.http_client.is_closed
+
+    def test_broadcast(self):
+        requests = []
+        with ClientRegistry({f'app-{i}': f'key-{i}' for i in range(5)}, options={
+            'TRANSPORT': httpx.MockTransport(recording_transport(requests, failing_app='app-3')),
+        }) as registry:
+            results = registry.broadcast('view_outcomes', ['os__click.count'], max_workers=2,
+                                         extra_params={'outcome_time_range': '1d'})
+            assert list(results) == [f'app-{i}' for i in range(5)]
+            assert isinstance(results['app-3'], OneSignalHTTPError)
+            assert all(isinstance(results[f'app-{i}'], OneSignalResponse) for i in (0, 1, 2, 4))
+            assert all('outcome_time_range=1d' in str(request.url) for request in requests)
+
+            results = registry.broadcast('cancel_notification', 'notification-1', app_ids=['app-0'])
+            assert list(results) == ['app-0']
+            with pytest.raises(ValueError):
+                registry.broadcast('close')
+            with pytest.raises(KeyError):
+                registry.broadcast('view_apps', app_ids=['unknown'])
+
+    def test_remove(self):
+        registry = ClientRegistry({'app-1': 'key-1'})
+        registry['app-1']
+        registry.add('app-1', 'new-key')
+        assert registry['app-1'].rest_api_key == 'new-key'
+        registry.remove('app-1')
+        assert len(registry) == 0
+        with pytest.raises(KeyError):
+            registry['app-1']
+        registry.close()
+
+
+class TestAsyncClientRegistry:
+
+    @pytest.mark.asyncio
+    async def test_broadcast(self):
+        requests = []
+
+        async def handler(request):
+            return recording_transport(requests, failing_app='app-1')(request)
+
+        async with AsyncClientRegistry({'app-0': 'key-0', 'app-1': 'key-1'},
+                                       options={'TRANSPORT': httpx.MockTransport(handler)}) as registry:
+            results = await registry.broadcast('view_outcomes', ['os__click.count'], concurrency=2)
+            assert registry['app-0'].http_client is registry['app-1'].http_client
+            await registry['app-0'].aclose()
+        assert isinstance(results['app-0'], OneSignalResponse)
+        assert isinstance(results['app-1'], OneSignalHTTPError)
+        assert len(requests) == 2
+        assert registry.http_client.is_closed
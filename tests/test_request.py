@@ -1,9 +1,11 @@
 from unittest import mock
 
+import httpx
 import pytest
 
 from onesignal_sdk.error import OneSignalHTTPError
-from onesignal_sdk.request import basic_auth_request
+from onesignal_sdk.request import RateLimiter, TokenBucket, basic_auth_request
+from onesignal_sdk.retry import RetryPolicy
 
 from .mocks import MockHttpxResponse, mock_request
 
@@ -37,3 +39,84 @@ class TestBasicAuthRequest:
                                       {'offset': 3})
         assert response.status_code == 200
         assert response.body == self.RESPONSE_200.body
+
+    def test_uses_given_client(self):
+        client = mock.Mock()
+        client.request.side_effect = mock_request(response=self.RESPONSE_200, expected_auth_token=self.TOKEN)
+        with mock.patch('httpx.request') as one_off_request:
+            response = basic_auth_request('GET', self.TEST_URL, self.TOKEN, client=client)
+        assert response.status_code == 200
+        assert client.request.call_count == 1
+        assert not one_off_request.called
+
+    def test_resends_throttled_request_through_limiter(self):
+        limiter = RateLimiter({'notifications': 100})
+        responses = [MockHttpxResponse(429, {'errors': ['Rate limit']}, {'Retry-After': '2'}), self.RESPONSE_200]
+        client = mock.Mock()
+        client.request.side_effect = responses
+        with mock.patch('time.sleep') as sleep:
+            response = basic_auth_request('POST', self.TEST_URL + '/notifications', client=client, limiter=limiter)
+        assert response.status_code == 200
+        assert client.request.call_count == 2
+        assert sleep.call_args[0][0] == pytest.approx(2, abs=0.1)
+
+    def test_gives_up_after_max_throttled_retries(self):
+        limiter = RateLimiter({'default': 100}, max_throttled_retries=1)
+        client = mock.Mock()
+        client.request.return_value = MockHttpxResponse(429, {'errors': ['Rate limit']}, {'Retry-After': '0'})
+        with pytest.raises(OneSignalHTTPError):
+            basic_auth_request('GET', self.TEST_URL + '/apps', client=client, limiter=limiter)
+        assert client.request.call_count == 2
+
+    def test_retries_failed_attempts_with_retry_policy(self):
+        client = mock.Mock()
+        client.request.side_effect = [httpx.ConnectError('refused'), MockHttpxResponse(502, {}), self.RESPONSE_200]
+        with mock.patch('time.sleep'):
+            response = basic_auth_request('POST', self.TEST_URL, payload={'external_id': 'key'}, client=client,
+                                          retry=RetryPolicy(max_attempts=3))
+        assert response.status_code == 200
+        assert client.request.call_count == 3
+
+    def test_raises_transport_error_when_retries_are_exhausted(self):
+        client = mock.Mock()
+        client.request.side_effect = httpx.ReadTimeout('timeout')
+        with mock.patch('time.sleep'), pytest.raises(httpx.ReadTimeout):
+            basic_auth_request('GET', self.TEST_URL, client=client, retry=RetryPolicy(max_attempts=2))
+        assert client.request.call_count == 2
+
+
+class TestTokenBucket:
+
+    def test_paces_requests_beyond_capacity(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+    def test_pause_delays_requests(self):
+        bucket = TokenBucket(rate=10, capacity=5)
+        bucket.pause(3)
+        assert bucket.reserve() == pytest.approx(3.1, abs=0.01)
+
+
+class TestRateLimiter:
+
+    def test_uses_bucket_of_endpoint_family(self):
+        limiter = RateLimiter({'players': 1, 'default': (5, 10)})
+        assert limiter.bucket('https://onesignal.com/api/v1/players/id-1').rate == 1
+        assert limiter.bucket('https://onesignal.com/api/v1/notifications').capacity == 10
+
+    def test_endpoint_families(self):
+        limiter = RateLimiter({'players': 1, 'outcomes': 2, 'segments': 3, 'apps': 4})
+        assert limiter.bucket('https://onesignal.com/api/v1/apps/app-id/users/user-1').rate == 1
+        assert limiter.bucket('https://onesignal.com/api/v1/apps/app-id/outcomes').rate == 2
+        assert limiter.bucket('https://onesignal.com/api/v1/apps/app-id/segments/segment-1').rate == 3
+        assert limiter.bucket('https://onesignal.com/api/v1/apps/app-id').rate == 4
+        assert limiter.bucket('https://onesignal.com/api/v1/notifications') is None
+
+    def test_pauses_when_rate_limit_is_exhausted(self):
+        limiter = RateLimiter({'apps': 100})
+        response = MockHttpxResponse(200, {}, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '5'})
+        assert not limiter.observe('https://onesignal.com/api/v1/apps', response)
+        assert limiter.acquire('https://onesignal.com/api/v1/apps') == pytest.approx(5, abs=0.1)
@@ -3,7 +3,8 @@ from unittest import mock
 import pytest
 
 from onesignal_sdk.error import OneSignalHTTPError
-from onesignal_sdk.request import async_basic_auth_request
+from onesignal_sdk.request import RateLimiter, async_basic_auth_request
+from onesignal_sdk.retry import RetryPolicy
 
 from .mocks import MockHttpxResponse, mock_request
 
@@ -38,3 +39,21 @@ class TestAsyncBasicAuthRequest:
                                                       {'name': 'test'}, {'offset': 3})
             assert response.status_code == 200
             assert response.body == self.RESPONSE_200.body
+
+    @pytest.mark.asyncio
+    async def test_resends_throttled_request_through_limiter(self):
+        limiter = RateLimiter({'notifications': 100})
+        responses = [MockHttpxResponse(429, {'errors': ['Rate limit']}, {'Retry-After': '0.01'}), self.RESPONSE_200]
+        with mock.patch('httpx.AsyncClient.request', side_effect=responses) as mocked_request:
+            response = await async_basic_auth_request('POST', self.TEST_URL + '/notifications', limiter=limiter)
+        assert response.status_code == 200
+        assert mocked_request.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_failed_attempts_with_retry_policy(self):
+        responses = [MockHttpxResponse(500, {}), self.RESPONSE_200]
+        retry = RetryPolicy(backoff_base=0.001)
+        with mock.patch('httpx.AsyncClient.request', side_effect=responses) as mocked_request:
+            response = await async_basic_auth_request('GET', self.TEST_URL, retry=retry)
+        assert response.status_code == 200
+        assert mocked_request.call_count == 2
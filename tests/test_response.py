@@ -1,4 +1,7 @@
-from onesignal_sdk.response import OneSignalResponse
+from unittest import mock
+
+from onesignal_sdk.error import OneSignalHTTPError
+from onesignal_sdk.response import OneSignalChunkedResponse, OneSignalResponse
 
 from .mocks import MockHttpxResponse
 
@@ -10,3 +13,33 @@ class TestOneSignalResponse:
         response = OneSignalResponse(http_response)
         assert response.status_code == 201
         assert response.body == http_response.body
+
+    def test_decodes_body_lazily_once(self):
+        http_response = mock.Mock(status_code=200)
+        http_response.json.return_value = {'id': 'foo'}
+        response = OneSignalResponse(http_response)
+        assert not http_response.json.called
+        assert response.body == {'id': 'foo'}
+        assert response.body == {'id': 'foo'}
+        assert http_response.json.call_count == 1
+
+    def test_skips_decoding(self):
+        http_response = mock.Mock(status_code=200, content=b'{"id": "foo"}')
+        response = OneSignalResponse(http_response, decode=False)
+        assert response.body is None
+        assert response.raw == b'{"id": "foo"}'
+        assert not http_response.json.called
+
+
+class TestOneSignalChunkedResponse:
+
+    def test_aggregates_chunk_results(self):
+        results = [
+            OneSignalResponse(MockHttpxResponse(200, {'id': 'first', 'recipients': 10})),
+            OneSignalHTTPError(MockHttpxResponse(400, {'errors': ['Failed']})),
+            OneSignalResponse(MockHttpxResponse(200, {'id': 'second', 'recipients': 5})),
+        ]
+        response = OneSignalChunkedResponse(results)
+        assert response.ids == ['first', 'second']
+        assert response.recipients == 15
+        assert [error.message for error in response.errors] == ['Failed']
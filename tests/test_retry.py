@@ -0,0 +1,60 @@
+import httpx
+
+from onesignal_sdk.retry import RetryBudget, RetryPolicy
+
+from .mocks import MockHttpxResponse
+
+
+class TestRetryBudget:
+
+    def test_limits_retries_to_reserve_and_ratio(self):
+        budget = RetryBudget(ratio=0.5, reserve=2)
+        assert budget.withdraw()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.withdraw()
+
+
+class TestRetryPolicy:
+
+    def test_retries_idempotent_requests_on_server_errors(self):
+        policy = RetryPolicy()
+        response = MockHttpxResponse(503, {})
+        assert policy.should_retry(0, 'GET', response=response)
+        assert policy.should_retry(0, 'DELETE', response=response)
+        assert not policy.should_retry(0, 'POST', {'contents': {}}, response=response)
+        assert policy.should_retry(0, 'POST', {'contents': {}, 'external_id': 'key'}, response=response)
+
+    def test_retries_any_request_on_connection_errors(self):
+        policy = RetryPolicy()
+        assert policy.should_retry(0, 'POST', {}, exception=httpx.ConnectError('refused'))
+        assert not policy.should_retry(0, 'POST', {}, exception=httpx.ReadTimeout('timeout'))
+        assert policy.should_retry(0, 'GET', exception=httpx.ReadTimeout('timeout'))
+
+    def test_retries_throttled_requests(self):
+        policy = RetryPolicy()
+        assert policy.should_retry(0, 'POST', {}, response=MockHttpxResponse(429, {}))
+
+    def test_does_not_retry_client_errors(self):
+        policy = RetryPolicy()
+        assert not policy.should_retry(0, 'GET', response=MockHttpxResponse(400, {}))
+
+    def test_stops_after_max_attempts(self):
+        policy = RetryPolicy(max_attempts=3)
+        response = MockHttpxResponse(500, {})
+        assert policy.should_retry(1, 'GET', response=response)
+        assert not policy.should_retry(2, 'GET', response=response)
+
+    def test_stops_when_budget_is_spent(self):
+        policy = RetryPolicy(budget=RetryBudget(reserve=1))
+        response = MockHttpxResponse(500, {})
+        assert policy.should_retry(0, 'GET', response=response)
+        assert not policy.should_retry(0, 'GET', response=response)
+
+    def test_backoff_uses_full_jitter(self):
+        policy = RetryPolicy(backoff_base=1, backoff_max=5)
+        delays = [policy.backoff(10) for _ in range(100)]
+        assert all(0 <= delay <= 5 for delay in delays)
+        assert len(set(delays)) > 1
@@ -0,0 +1,163 @@
+import time
+
+import httpx
+import pytest
+
+from onesignal_sdk.client import AsyncClient
+from onesignal_sdk.error import SendQueueFull
+from onesignal_sdk.retry import RetryPolicy
+from onesignal_sdk.send_queue import MemorySpool, SendQueue, SQLiteSpool
+from onesignal_sdk.testing import StandInServer, player_id
+
+from .mocks import async_stand_in_client
+
+
+def notification(index: int = 0):
+    return {'contents': {'en': f'Hello {index}'}, 'include_player_ids': [player_id(index)]}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def spool(request, tmp_path):
+    return MemorySpool() if request.param == 'memory' else SQLiteSpool(tmp_path / 'queue.db')
+
+
+class TestSpool:
+
+    def test_lifecycle(self, spool):
+        first = spool.put({'n': 1}, send_at=10)
+        second = spool.put({'n': 2}, send_at=5)
+        assert len(spool) == 2
+        assert spool.take(now=1) is None
+        assert spool.next_due() == 5
+        entry = spool.take(now=10)
+        assert (entry.id, entry.body, entry.attempts) == (second, {'n': 2}, 1)
+        assert spool.busy(now=0)
+
+        spool.retry(second, send_at=20)
+        assert spool.take(now=10).id == first
+        spool.done(first)
+        assert not spool.busy(now=10)
+        assert spool.take(now=20).attempts == 2
+        spool.dead(second, 'error')
+        assert len(spool) == 0
+        dead, = spool.dead_letters()
+        assert (dead.id, dead.error, dead.attempts) == (second, 'error', 2)
+
+    def test_sqlite_survives_restart(self, tmp_path):
+        spool = SQLiteSpool(tmp_path / 'queue.db')
+        for index in range(3):
+            spool.put(notification(index), send_at=0)
+        spool.take(now=1)
+        spool.close()
+
+        server = StandInServer(players=10)
+        with SendQueue(async_stand_in_client(server), SQLiteSpool(tmp_path / 'queue.db')) as queue:
+            assert queue.join(timeout=5)
+        assert queue.sent == 3
+        assert len(server.sent_notifications) == 3
+
+
+class TestSendQueue:
+
+    def test_sends_in_background(self, spool):
+        server = StandInServer(players=100, latency=0.01)
+        sent = []
+        with SendQueue(async_stand_in_client(server), spool, concurrency=4,
+                       on_sent=lambda entry, response: sent.append(response.body['id'])) as queue:
+            ids = [queue.send_notification(notification(index)) for index in range(20)]
+            assert queue.join(timeout=5)
+        assert len(set(ids)) == 20
+        assert sorted(sent) == sorted(server.sent_notifications)
+        assert all(body['idempotency_key'] for body in server.sent_notifications.values())
+        assert 1 < server.max_in_flight <= 4
+
+    def test_retries_and_dead_letters(self):
+        attempts = []
+
+        async def handler(request):
+            attempts.append(request)
+            if len(attempts) < 3:
+                return httpx.Response(503, json={'errors': ['Unavailable']})
+            if b'invalid' in request.content:
+                return httpx.Response(400, json={'errors': ['Invalid']})
+            return httpx.Response(200, json={'id': 'notification-1'})
+
+        client = AsyncClient('app-id', 'api-key', options={'TRANSPORT': httpx.MockTransport(handler)})
+        errors = []
+        queue = SendQueue(client, concurrency=1, retry=RetryPolicy(backoff_base=0),
+                          on_error=lambda entry, error: errors.append(error.status_code))
+        queue.send_notification({'contents': {'en': 'Hi'}, 'external_id': 'key-1'})
+        assert queue.join(timeout=5)
+        assert (queue.sent, len(attempts)) == (1, 3)
+        assert all(b'key-1' in request.content for request in attempts)
+
+        queue.send_notification({'contents': {'en': 'invalid'}})
+        queue.close()
+        assert (queue.failed, errors) == (1, [400])
+        dead, = queue.spool.dead_letters()
+        assert dead.body['contents'] == {'en': 'invalid'}
+
+    def test_backpressure(self):
+        queue = SendQueue(async_stand_in_client(StandInServer(players=10)), max_pending=2)
+        later = time.time() + 60
+        queue.send_notification(notification(), send_at=later)
+        queue.send_notification(notification(), send_at=later)
+        with pytest.raises(SendQueueFull):
+            queue.send_notification(notification())
+        started = time.monotonic()
+        with pytest.raises(SendQueueFull):
+            queue.send_notification(notification(), timeout=0.05)
+        assert time.monotonic() - started >= 0.05
+        queue.close()
+        assert len(queue) == 2
+        with pytest.raises(RuntimeError):
+            queue.send_notification(notification())
+
+    def test_scheduled_send(self):
+        server = StandInServer(players=10)
+        with SendQueue(async_stand_in_client(server)) as queue:
+            queue.send_notification(notification(), send_at=time.time() + 0.2)
+            assert queue.join(timeout=5)
+            assert not server.sent_notifications
+            time.sleep(0.3)
+            assert queue.join(timeout=5)
+            assert len(server.sent_notifications) == 1
+
+    def test_workers_survive_unexpected_errors(self, caplog):
+        server = StandInServer(players=10)
+
+        def on_sent(entry, response):
+            raise RuntimeError('Callback failed')
+
+        with SendQueue(async_stand_in_client(server), concurrency=1, on_sent=on_sent) as queue:
+            queue.send_notification({'contents': {'en': 'Hi'}, 'data': {1: object()}})
+            queue.send_notification(notification())
+            assert queue.join(timeout=5)
+            queue.send_notification(notification(1))
+            assert queue.join(timeout=5)
+        assert (queue.sent, queue.failed, len(server.sent_notifications)) == (2, 1, 2)
+        dead, = queue.spool.dead_letters()
+        assert 'TypeError' in dead.error
+        assert 'Callback failed' in caplog.text
+
+    def test_failed_chunks(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            if b'player-3' in request.content:
+                return httpx.Response(400, json={'errors': ['Invalid player']})
+            return httpx.Response(200, json={'id': f'notification-{len(requests)}', 'recipients': 2})
+
+        client = AsyncClient('app-id', 'api-key', options={
+            'TRANSPORT': httpx.MockTransport(handler), 'MAX_NOTIFICATION_TARGETS': 2,
+        })
+        errors = []
+        with SendQueue(client, on_error=lambda entry, error: errors.append(error.status_code)) as queue:
+            queue.send_notification({'contents': {'en': 'Hi'},
+                                     'include_player_ids': [f'player-{index}' for index in range(4)]})
+            assert queue.join(timeout=5)
+        assert len(requests) == 2
+        assert (queue.sent, queue.failed, errors) == (0, 1, [400])
+        dead, = queue.spool.dead_letters()
+        assert dead.error.startswith('1 of 2 chunks failed')
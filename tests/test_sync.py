@@ -0,0 +1,114 @@
+import json
+
+import httpx
+import pytest
+
+from onesignal_sdk.client import Client
+from onesignal_sdk.sync import (
+    AsyncNotificationSync, JSONFileStateStore, MemoryStateStore, NotificationSync,
+)
+from onesignal_sdk.testing import StandInServer
+
+from .mocks import async_stand_in_client, stand_in_client
+
+PAGES = 'GET /notifications'
+
+
+def notifications_transport(notifications):
+    """Transport listing given notifications newest first, and serving each of them by id."""
+
+    def handler(request):
+        if request.url.path.endswith('/notifications'):
+            offset, limit = int(request.url.params['offset']), int(request.url.params['limit'])
+            listed = sorted(notifications.values(), key=lambda notification: -notification['queued_at'])
+            page = listed[offset:offset + limit]
+            return httpx.Response(200, json={'total_count': len(listed), 'notifications': page})
+        notification = notifications.get(request.url.path.rsplit('/', 1)[1])
+        if notification is None:
+            return httpx.Response(400, json={'errors': ['Could not find notification']})
+        return httpx.Response(200, json=notification)
+    return httpx.MockTransport(handler)
+
+
+class TestStateStores:
+
+    def test_json_file(self, tmp_path):
+        store = JSONFileStateStore(tmp_path / 'sync.json')
+        assert store.load('app-1') is None
+        store.save('app-1', {'queued_at': 1})
+        store.save('app-2', {'queued_at': 2})
+        assert JSONFileStateStore(tmp_path / 'sync.json').load('app-1') == {'queued_at': 1}
+        assert json.loads((tmp_path / 'sync.json').read_text()) == {'app-1': {'queued_at': 1},
+                                                                    'app-2': {'queued_at': 2}}
+
+
+class TestNotificationSync:
+
+    def test_pages_until_high_water_mark(self):
+        server = StandInServer(notifications=120)
+        notification_sync = NotificationSync(stand_in_client(server), page_size=50)
+        first = list(notification_sync.sync())
+        assert [notification['id'] for notification in first] == [server.notification(119 - i)['id']
+                                                                  for i in range(120)]
+        assert server.stats[PAGES] == 3
+
+        server.notifications += 5
+        assert [notification['contents']['en'] for notification in notification_sync.sync()] == [
+            f'Notification {index}' for index in range(124, 119, -1)]
+        assert server.stats[PAGES] == 4
+        assert list(notification_sync.sync()) == []
+        assert server.stats[PAGES] == 5
+
+        notification_sync.reset()
+        assert len(list(notification_sync.sync())) == 125
+
+    def test_state_is_saved_when_complete(self, tmp_path):
+        server = StandInServer(notifications=10)
+        store = JSONFileStateStore(tmp_path / 'sync.json')
+        iterator = NotificationSync(stand_in_client(server), store, page_size=5).sync()
+        next(iterator)
+        iterator.close()
+        assert store.load('app-id') is None
+
+        assert len(list(NotificationSync(stand_in_client(server), store, page_size=5).sync())) == 10
+        assert store.load('app-id')['queued_at'] == server.notification(9)['queued_at']
+        server.notifications += 1
+        assert len(list(NotificationSync(stand_in_client(server), store, page_size=5).sync())) == 1
+
+    def test_in_flight_and_same_second(self):
+        notifications = {
+            'a': {'id': 'a', 'queued_at': 100, 'completed_at': 160},
+            'b': {'id': 'b', 'queued_at': 200, 'completed_at': None, 'successful': 1},
+            'c': {'id': 'c', 'queued_at': 300, 'completed_at': 360},
+            'gone': {'id': 'gone', 'queued_at': 300, 'completed_at': None},
+        }
+        client = Client('app-id', 'api-key', options={'TRANSPORT': notifications_transport(notifications)})
+        store = MemoryStateStore()
+        notification_sync = NotificationSync(client, store, page_size=2)
+        assert sorted(notification['id'] for notification in notification_sync.sync()) == ['a', 'b', 'c', 'gone']
+        assert store.load('app-id') == {'queued_at': 300, 'ids': ['c', 'gone'], 'in_flight': ['b', 'gone']}
+
+        # Queued in the same second as the mark, after the previous sync.
+        notifications['d'] = {'id': 'd', 'queued_at': 300, 'completed_at': 360}
+        del notifications['gone']
+        notifications['b'] = {**notifications['b'], 'completed_at': 260, 'successful': 5}
+        synced = list(notification_sync.sync())
+        assert [(notification['id'], notification.get('successful')) for notification in synced] == [
+            ('d', None), ('b', 5)]
+        assert store.load('app-id') == {'queued_at': 300, 'ids': ['c', 'd', 'gone'], 'in_flight': []}
+        assert list(notification_sync.sync()) == []
+
+
+class TestAsyncNotificationSync:
+
+    @pytest.mark.asyncio
+    async def test_pages_until_high_water_mark(self):
+        server = StandInServer(notifications=60)
+        client = async_stand_in_client(server)
+        notification_sync = AsyncNotificationSync(client, page_size=50)
+        assert len([notification async for notification in notification_sync.sync()]) == 60
+        server.notifications += 2
+        synced = [notification async for notification in notification_sync.sync()]
+        assert [notification['id'] for notification in synced] == [server.notification(61)['id'],
+                                                                   server.notification(60)['id']]
+        assert server.stats[PAGES] == 3
@@ -0,0 +1,99 @@
+import gzip
+
+import httpx
+import pytest
+
+from onesignal_sdk.error import OneSignalHTTPError
+from onesignal_sdk.request import RateLimiter
+from onesignal_sdk.retry import RetryPolicy
+from onesignal_sdk.testing import StandInServer, player_id
+
+from .mocks import async_stand_in_client, stand_in_client
+
+
+class TestStandInServer:
+
+    def test_paginates_synthetic_players(self):
+        server = StandInServer(players=650)
+        devices = list(stand_in_client(server).iter_devices(max_workers=2))
+        assert [device['id'] for device in devices] == [player_id(index) for index in range(650)]
+        assert server.stats['GET /players'] == 3
+        assert devices[10] == server.player(10)
+
+    def test_endpoints(self):
+        server = StandInServer(players=10)
+        client = stand_in_client(server)
+        response = client.send_notification({'contents': {'en': 'Hi'}, 'include_player_ids': [player_id(1)]})
+        assert response.body['recipients'] == 1
+        assert client.view_notification(response.body['id']).body['contents'] == {'en': 'Hi'}
+        assert client.view_device(player_id(3)).body['id'] == player_id(3)
+        client.edit_device(player_id(3), {'language': 'tr', 'tags': {'a': '1'}})
+        assert client.view_device(player_id(3)).body['language'] == 'tr'
+        client.edit_tags('user-1', {'tags': {'level': '2'}})
+        assert server.tag_updates == {'user-1': {'level': '2'}}
+        outcomes = client.view_outcomes(['os__click.count', 'purchase.sum']).body['outcomes']
+        assert [outcome['aggregation'] for outcome in outcomes] == ['count', 'sum']
+        assert client.view_app('app-id').body['id'] == 'app-id'
+        with pytest.raises(OneSignalHTTPError):
+            client.view_device(player_id(10))
+
+    def test_csv_export(self):
+        server = StandInServer(players=3, export_not_ready=2)
+        players = list(stand_in_client(server).csv_export_stream({}, poll_interval=0.001))
+        assert [player['id'] for player in players] == [player_id(index) for index in range(3)]
+        assert server.stats['GET /exports/{name}'] == 3
+
+    def test_notification_history(self):
+        server = StandInServer(players=5)
+        client = stand_in_client(server)
+        notification_id = client.view_notifications({'limit': 1}).body['notifications'][0]['id']
+        url = client.notification_history(notification_id, {'events': 'sent'}).body['destination_url']
+        content = httpx.Client(transport=server.transport()).get(url).content
+        assert content.decode().splitlines()[0] == 'player_id'
+
+    def test_error_and_throttle_injection(self):
+        server = StandInServer(error_rate=0.5, throttle_rate=0.5)
+        with pytest.raises(OneSignalHTTPError) as error:
+            for _ in range(20):
+                stand_in_client(server).view_device(player_id(1))
+        assert error.value.status_code in (429, 500, 503)
+
+    def test_rate_limits(self):
+        server = StandInServer(rate_limits={'players': 2})
+        client = stand_in_client(server)
+        client.view_device(player_id(1))
+        response = client.view_device(player_id(1))
+        assert response.http_response.headers['X-RateLimit-Remaining'] == '0'
+        with pytest.raises(OneSignalHTTPError) as error:
+            client.view_device(player_id(1))
+        assert error.value.status_code == 429
+        assert 'Retry-After' in error.value.http_response.headers
+
+    def test_rate_limiter_adapts_to_headers(self):
+        server = StandInServer(rate_limits={'players': 5})
+        client = stand_in_client(server, RATE_LIMITER=RateLimiter({'players': 100}), RETRY_POLICY=RetryPolicy())
+        for _ in range(8):
+            client.view_device(player_id(1))
+        # The limiter pauses when the stand-in reports no remaining requests, so no request is rejected.
+        assert server.stats['GET /players/{id}'] == 8
+
+    def test_requires_auth(self):
+        server = StandInServer()
+        response = httpx.Client(transport=server.transport()).get('https://onesignal.com/api/v1/players')
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_async_client_latency_and_concurrency(self):
+        server = StandInServer(players=100, latency=0.01)
+        client = async_stand_in_client(server)
+        devices = [device async for device in client.iter_devices(page_size=10, concurrency=4)]
+        assert len(devices) == 100
+        assert server.max_in_flight > 1
+        await client.aclose()
+
+    def test_gzipped_export_is_valid(self):
+        server = StandInServer(players=2)
+        client = stand_in_client(server)
+        url = client.csv_export({}).body['csv_file_url']
+        content = gzip.decompress(httpx.Client(transport=server.transport()).get(url).content).decode()
+        assert content.splitlines()[0].startswith('id,identifier')